@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+
+"""Offline throughput benchmark of the report builders
+
+Replays synthesized (or recorded) route_v8 / match_route responses of increasing size and reports, per stage,
+the wall time, the peak resident and traced memory and the rows per second.
+
+    python benchmarks/bench_report_builders.py --sizes 100 1000 10000 100000 1000000
+    python benchmarks/bench_report_builders.py --output baseline.json
+    python benchmarks/bench_report_builders.py --baseline baseline.json --tolerance 0.25
+"""
+
+import os
+import sys
+import gc
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import flexpolyline
+import fixtures
+from extherepy import extUtils, extGpx, extParse
+
+def getMemoryStatus(reset_peak: bool = False) -> tuple:
+    '''This method reads the resident memory of the process (Linux only)
+
+    :param bool reset_peak: reset the peak resident memory first
+
+    :returns: resident memory and peak resident memory [MB], (nan, nan) if unavailable
+
+    :rtype: tuple
+    '''
+    try:
+        if reset_peak:
+            with open('/proc/self/clear_refs', 'w') as f:
+                f.write('5')
+        with open('/proc/self/status') as f:
+            status = dict(line.split(':', 1) for line in f if ':' in line)
+        return int(status['VmRSS'].split()[0])/1024, int(status['VmHWM'].split()[0])/1024
+    except (OSError, KeyError, ValueError):
+        return float('nan'), float('nan')
+
+def measure(function, *args, **kwargs) -> dict:
+    '''This method runs a stage measuring wall time, peak resident memory and peak traced memory
+
+    The stage is run twice: untraced for the wall time and the peak resident memory growth, then under 
+    tracemalloc for the peak allocated memory. tracemalloc counts buffers reserved but not touched 
+    (e.g. by orjson), the resident memory only what is actually used.
+
+    :param Callable function: stage
+
+    :returns: result: stage output, time[s], peak_rss[MB], peak_memory[MB]
+
+    :rtype: dict
+    '''
+    gc.collect()
+    rss, _ = getMemoryStatus(reset_peak=True)
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    elapsed = time.perf_counter()-start
+    _, peak_rss = getMemoryStatus()
+
+    gc.collect()
+    tracemalloc.start()
+    function(*args, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'result': result, 'time[s]': elapsed, 'peak_rss[MB]': peak_rss-rss, 'peak_memory[MB]': peak/2**20}
+
+def runStages(n_points: int, map_max_size: int, route_response: dict = None, rme_response: dict = None) -> list:
+    '''This method benchmarks the report builders for a given number of points
+
+    :param int n_points: number of polyline / trace points
+    :param int map_max_size: maximum number of points rendered with getPolylineMap
+    :param dict route_response: recorded route_v8 response (synthesized if None)
+    :param dict rme_response: recorded match_route response (synthesized if None)
+
+    :returns: stage results
+
+    :rtype: list
+    '''
+    route_response = route_response or fixtures.getRouteResponse(n_points)
+    rme_response = rme_response or fixtures.getRmeResponse(n_points)
+    routing_api = fixtures.ReplayRoutingApi(route_response)
+    rme_api = fixtures.ReplayRmeApi(rme_response)
+
+    results = []
+    def add(stage, measurement, rows):
+        results.append({'stage':            stage,
+                        'points':           n_points,
+                        'rows':             rows,
+                        'time[s]':          measurement['time[s]'],
+                        'peak_rss[MB]':     measurement['peak_rss[MB]'],
+                        'peak_memory[MB]':  measurement['peak_memory[MB]'],
+                        'rows/s':           rows/measurement['time[s]'] if measurement['time[s]'] else float('inf')})
+
+    # response parsing from the raw bytes: stdlib json (as HerePy) vs extParse.loads (orjson if installed)
+    route_content = json.dumps(route_response).encode('utf8')
+    rme_content = json.dumps(rme_response).encode('utf8')
+    polylines = [section['polyline'] for route in route_response['routes'] for section in route['sections']]
+    n_route_points = sum(len(extParse.decodePolyline(polyline)) for polyline in polylines)
+
+    measurement = measure(json.loads, route_content.decode('utf8'))
+    add('routing.parse(json)', measurement, n_route_points)
+    measurement = measure(extParse.loads, route_content)
+    add(f"routing.parse({'orjson' if extParse.orjson else 'json'})", measurement, n_route_points)
+    measurement = measure(json.loads, rme_content.decode('utf8'))
+    add('rme.parse(json)', measurement, len(rme_response['TracePoints']))
+    measurement = measure(extParse.loads, rme_content)
+    add(f"rme.parse({'orjson' if extParse.orjson else 'json'})", measurement, len(rme_response['TracePoints']))
+
+    # polyline decoding: flexpolyline (pure Python) vs extParse.decodePolyline (vectorized)
+    measurement = measure(lambda: [flexpolyline.decode(polyline) for polyline in polylines])
+    add('routing.decode(flexpolyline)', measurement, n_route_points)
+    measurement = measure(lambda: [extParse.decodePolyline(polyline) for polyline in polylines])
+    add('routing.decode(extParse)', measurement, n_route_points)
+
+    with tempfile.TemporaryDirectory() as directory:
+        gpx_file = os.path.join(directory, 'trace.gpx')
+        with open(gpx_file, 'w') as f:
+            f.write('<gpx/>')
+
+        measurement = measure(routing_api.getRouteReport, [(45, 9), (46, 10)], departure_time='2022-06-01T08:00:00', return_polyline=False)
+        add('routing.getRouteReport(spans)', measurement, len(measurement['result']))
+
+        measurement = measure(routing_api.getRouteReport, [(45, 9), (46, 10)], departure_time='2022-06-01T08:00:00', return_polyline=True)
+        route_profile_df = measurement['result']
+        add('routing.getRouteReport(polyline)', measurement, len(route_profile_df))
+
+        measurement = measure(rme_api.getRouteReport, gpx_file, return_GPS_trace=False)
+        add('rme.getRouteReport(spans)', measurement, len(measurement['result']))
+
+        measurement = measure(rme_api.getRouteReport, gpx_file, return_GPS_trace=True)
+        rme_profile_df = measurement['result']
+        add('rme.getRouteReport(trace)', measurement, len(rme_profile_df))
+
+        gpx_df = pd.DataFrame({'latitude':  rme_profile_df['GPS_latitude[deg]'],
+                               'longitude': rme_profile_df['GPS_longitude[deg]'],
+                               'time':      rme_profile_df['timestamp'].values.astype('datetime64[ms]').astype(np.int64)/1000,
+                               'altitude':  rme_profile_df['GPS_altitude[m]']})
+        measurement = measure(extUtils.dataframe2gpx, gpx_df, times_colname='time', alts_colname='altitude',
+                              output_file=os.path.join(directory, 'export.gpx'), return_xml=False)
+        add('extUtils.dataframe2gpx', measurement, len(gpx_df))
+
+        measurement = measure(lambda: sum(len(block['latitude']) for block in extGpx.iterGpxBlocks(os.path.join(directory, 'export.gpx'))))
+        add('extGpx.iterGpxBlocks', measurement, measurement['result'])
+
+        if n_points <= map_max_size:
+            measurement = measure(lambda: extUtils.getPolylineMap(route_profile_df, channel='trafficSpeed[km/h]').get_root().render())
+            add('extUtils.getPolylineMap', measurement, len(route_profile_df))
+    return results
+
+def compare(results: list, baseline: list, tolerance: float, min_slowdown: float = 0.01) -> list:
+    '''This method compares the stage times with a baseline
+
+    :param list results: stage results
+    :param list baseline: baseline stage results
+    :param float tolerance: allowed relative slowdown
+    :param float min_slowdown: slowdowns below this time are ignored as noise [s]
+
+    :returns: regressions
+
+    :rtype: list
+    '''
+    baseline_times = {(result['stage'], result['points']): result['time[s]'] for result in baseline}
+    regressions = []
+    for result in results:
+        baseline_time = baseline_times.get((result['stage'], result['points']))
+        if baseline_time and result['time[s]'] > max(baseline_time*(1+tolerance), baseline_time+min_slowdown):
+            regressions.append(f"{result['stage']} @ {result['points']} points: {result['time[s]']:.3f}s vs {baseline_time:.3f}s")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 100000], help='numbers of points')
+    parser.add_argument('--map-max-size', type=int, default=10000, help='maximum number of points rendered with getPolylineMap')
+    parser.add_argument('--route-response', help='recorded route_v8 response (.json) replayed instead of the synthesized ones')
+    parser.add_argument('--rme-response', help='recorded match_route response (.json) replayed instead of the synthesized ones')
+    parser.add_argument('--output', help='write the results to a .json file')
+    parser.add_argument('--baseline', help='compare the results with a .json file written with --output')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown against the baseline')
+    args = parser.parse_args()
+
+    route_response = fixtures.loadResponse(args.route_response) if args.route_response else None
+    rme_response = fixtures.loadResponse(args.rme_response) if args.rme_response else None
+
+    results = []
+    for n_points in args.sizes:
+        results += runStages(n_points, args.map_max_size, route_response, rme_response)
+        if route_response or rme_response:
+            break   # recorded responses have a fixed size
+
+    pd.set_option('display.width', 200)
+    print(pd.DataFrame(results).to_string(index=False, float_format=lambda value: f'{value:.4g}'))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f'[REGRESSION] {regression}')
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
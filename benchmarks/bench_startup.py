@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+
+"""Startup benchmark of the package
+
+Imports the package and each API class in a fresh interpreter and reports the import time (best of --repeat)
+and the optional dependencies loaded. The plotting/GPX/async dependencies must only be loaded on first use:
+a scenario loading a forbidden module fails the benchmark.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --output baseline.json
+    python benchmarks/bench_startup.py --baseline baseline.json --tolerance 0.25
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# optional dependencies watched in sys.modules
+WATCHED_MODULES = ['matplotlib', 'folium', 'branca', 'jinja2', 'geopy', 'gpxpy', 'aiohttp', 'pandas', 'herepy']
+
+# (scenario, statement, modules which must not be loaded)
+SCENARIOS = [
+    ('package',             'import extherepy',
+                            WATCHED_MODULES),
+    ('extRoutingApi',       'import extherepy; extherepy.extRoutingApi',
+                            ['matplotlib', 'folium', 'branca', 'jinja2', 'geopy', 'gpxpy', 'aiohttp']),
+    ('extRmeApi',           'import extherepy; extherepy.extRmeApi',
+                            ['matplotlib', 'folium', 'branca', 'jinja2', 'geopy', 'gpxpy', 'aiohttp']),
+    ('extGeocoderApi',      'import extherepy; extherepy.extGeocoderApi',
+                            ['matplotlib', 'folium', 'branca', 'jinja2', 'geopy', 'gpxpy', 'aiohttp']),
+    ('extAsyncRoutingApi',  'import extherepy; extherepy.extAsyncRoutingApi',
+                            ['matplotlib', 'folium', 'branca', 'jinja2', 'geopy', 'gpxpy', 'aiohttp']),
+    ('extUtils',            'from extherepy import extUtils',
+                            ['matplotlib', 'folium', 'branca', 'jinja2', 'geopy', 'gpxpy', 'aiohttp']),
+]
+
+PROBE = '''
+import sys, time, json
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter()-start
+print(json.dumps({{'time': elapsed, 'modules': [module for module in {watched!r} if module in sys.modules]}}))
+'''
+
+def measureStartup(statement: str, repeat: int) -> dict:
+    '''This method runs a statement in fresh interpreters measuring the import time
+
+    :param str statement: import statement
+    :param int repeat: number of interpreters, the best time is kept
+
+    :returns: result: time[s], loaded modules
+
+    :rtype: dict
+    '''
+    times = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', PROBE.format(statement=statement, watched=WATCHED_MODULES)],
+                                cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        probe = json.loads(output.strip().splitlines()[-1])
+        times.append(probe['time'])
+    return {'time[s]': min(times), 'modules': probe['modules']}
+
+def compare(results: list, baseline: list, tolerance: float, min_slowdown: float = 0.02) -> list:
+    '''This method compares the import times with a baseline
+
+    :param list results: scenario results
+    :param list baseline: baseline scenario results
+    :param float tolerance: allowed relative slowdown
+    :param float min_slowdown: allowed absolute slowdown [s]
+
+    :returns: regressions
+
+    :rtype: list
+    '''
+    baseline_times = {result['scenario']: result['time[s]'] for result in baseline}
+    regressions = []
+    for result in results:
+        baseline_time = baseline_times.get(result['scenario'])
+        if baseline_time and result['time[s]'] > max(baseline_time*(1+tolerance), baseline_time+min_slowdown):
+            regressions.append(f"{result['scenario']}: {result['time[s]']:.3f}s vs {baseline_time:.3f}s")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='number of fresh interpreters per scenario')
+    parser.add_argument('--budget', type=float, help='maximum import time [s] of any scenario')
+    parser.add_argument('--output', help='write the results to a .json file')
+    parser.add_argument('--baseline', help='compare the results with a .json file written with --output')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown against the baseline')
+    args = parser.parse_args()
+
+    results = []
+    failures = []
+    for scenario, statement, forbidden in SCENARIOS:
+        result = measureStartup(statement, args.repeat)
+        results.append({'scenario': scenario, 'time[s]': result['time[s]'], 'modules': ' '.join(result['modules'])})
+        for module in set(result['modules']) & set(forbidden):
+            failures.append(f'{scenario}: {module} loaded at import')
+        if args.budget and result['time[s]'] > args.budget:
+            failures.append(f"{scenario}: {result['time[s]']:.3f}s over the {args.budget:.3f}s budget")
+
+    pd.set_option('display.width', 200)
+    print(pd.DataFrame(results).to_string(index=False, float_format=lambda value: f'{value:.4g}'))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures += compare(results, json.load(f), args.tolerance)
+
+    for failure in failures:
+        print(f'[FAILED] {failure}')
+    if failures:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
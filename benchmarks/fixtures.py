@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+
+"""Synthesized and recorded HERE responses replayed by the benchmarks"""
+
+import os
+import sys
+import json
+import numpy as np
+import flexpolyline
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from extherepy import extRoutingApi, extRmeApi
+from extherepy import extParse
+
+def getRouteResponse(n_points: int,
+                     n_spans: int = None,
+                     n_sections: int = 1,
+                     seed: int = 0) -> dict:
+    '''This method synthesizes a route_v8 response (as_dict) with the span fields requested by extRoutingApi
+
+    :param int n_points: number of polyline points
+    :param int n_spans: number of spans (default one every 10 points)
+    :param int n_sections: number of sections
+    :param int seed: random seed
+
+    :returns: route_v8 response
+
+    :rtype: dict
+    '''
+    rng = np.random.default_rng(seed)
+    n_section_points = max(n_points//n_sections, 2)
+    n_spans = n_spans or max(n_section_points//10, 1)
+
+    sections = []
+    for section in range(n_sections):
+        latitudes = 45+np.cumsum(rng.normal(0, 1e-4, n_section_points))
+        longitudes = 9+np.cumsum(rng.normal(0, 1e-4, n_section_points))
+        altitudes = np.round(200+np.cumsum(rng.normal(0, 0.5, n_section_points)))
+        polyline = flexpolyline.encode(list(zip(latitudes, longitudes, altitudes)), 
+                                       precision=5, 
+                                       third_dim=flexpolyline.ALTITUDE, 
+                                       third_dim_precision=0)
+        offsets = np.r_[0, np.sort(rng.choice(np.arange(1, n_section_points), min(n_spans, n_section_points)-1, replace=False))]
+        spans = []
+        for span, offset in enumerate(offsets):
+            span_data = {'offset':          int(offset),
+                         'countryCode':     'ITA',
+                         'functionalClass': int(rng.integers(1, 6)),
+                         'length':          int(rng.integers(5, 500)),
+                         'duration':        int(rng.integers(1, 60)),
+                         'baseDuration':    int(rng.integers(1, 60)),
+                         'dynamicSpeedInfo': {'trafficSpeed': float(rng.uniform(5, 35)), 
+                                              'baseSpeed':    float(rng.uniform(5, 35))}}
+            if rng.random() > 0.2:
+                span_data['speedLimit'] = float(rng.uniform(8, 36))
+                span_data['maxSpeed'] = span_data['speedLimit']
+            if rng.random() > 0.2:
+                span_data['names'] = [{'value': f'Street {span}', 'language': 'it'}]
+            spans.append(span_data)
+        sections.append({'departure':   {'time': '2022-06-01T08:00:00+02:00'},
+                         'polyline':    polyline,
+                         'spans':       spans})
+    return {'routes': [{'sections': sections}]}
+
+def getRmeResponse(n_points: int,
+                   points_per_link: int = 5,
+                   seed: int = 0) -> dict:
+    '''This method synthesizes a match_route response (as_dict)
+
+    :param int n_points: number of trace points
+    :param int points_per_link: average number of trace points per route link
+    :param int seed: random seed
+
+    :returns: match_route response
+
+    :rtype: dict
+    '''
+    rng = np.random.default_rng(seed)
+    latitudes = 45+np.cumsum(rng.normal(0, 1e-4, n_points))
+    longitudes = 9+np.cumsum(rng.normal(0, 1e-4, n_points))
+    links = np.cumsum(rng.random(n_points) < 1/points_per_link)
+    timestamps = 1654063200000+np.cumsum(rng.integers(1000, 3000, n_points))
+    TracePoints = [{'routeLinkSeqNrMatched':    int(links[i]),
+                    'timestamp':                int(timestamps[i]),
+                    'lat':                      float(latitudes[i]),
+                    'lon':                      float(longitudes[i]),
+                    'latMatched':               float(latitudes[i]+1e-5),
+                    'lonMatched':               float(longitudes[i]-1e-5),
+                    'elevation':                float(200+0.1*i),
+                    'confidenceValue':          float(rng.uniform()),
+                    'speedMps':                 float(rng.uniform(0, 30))} for i in range(n_points)]
+    RouteLinks = [{'linkId':            int(1000+link),
+                   'confidence':        float(rng.uniform()),
+                   'functionalClass':   int(rng.integers(1, 6))} for link in range(int(links[-1])+1 if n_points else 0)]
+    return {'RouteLinks': RouteLinks, 'TracePoints': TracePoints, 'Warnings': []}
+
+def loadResponse(path: str) -> dict:
+    '''This method loads a recorded response (JSON body of a HERE call)
+
+    :param str path: path to the .json file
+
+    :returns: response
+
+    :rtype: dict
+    '''
+    with open(path) as f:
+        return json.load(f)
+
+class ReplayResponse(object):
+    '''
+    Stand-in of a HerePy response replaying a recorded/synthesized response.
+    '''
+    def __init__(self, response: dict):
+        self._response = json.dumps(response).encode('utf8')
+
+    def as_dict(self) -> dict:
+        return extParse.loads(self._response)
+
+class ReplayRoutingApi(extRoutingApi):
+    '''
+    extRoutingApi replaying a route_v8 response instead of calling HERE.
+    '''
+    def __init__(self, response: dict, **kwargs):
+        super(ReplayRoutingApi, self).__init__('replay', **kwargs)
+        self._response = ReplayResponse(response)
+
+    def route_v8(self, *args, **kwargs):
+        return self._response
+
+class ReplayRmeApi(extRmeApi):
+    '''
+    extRmeApi replaying a match_route response instead of calling HERE.
+    '''
+    def __init__(self, response: dict, **kwargs):
+        super(ReplayRmeApi, self).__init__('replay', **kwargs)
+        self._response = ReplayResponse(response)
+
+    def match_route(self, *args, **kwargs):
+        return self._response
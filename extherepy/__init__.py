@@ -11,7 +11,56 @@ __url__ = "https://github.com/pietromosca1994/extHerePy"
 __download_url__ = ""
 __description__ = "Extension of HerePy"
 
-from .ext_geocoder_api import extGeocoderApi
-from .ext_rme_api import extRmeApi
-from .ext_routing_api import extRoutingApi
-from .extUtils import *
\ No newline at end of file
+import importlib
+
+# public names and the submodule defining them, imported on first access (PEP 562) so that
+# importing the package or one API class does not load the dependencies of the others
+_LAZY_NAMES = {
+    'extGeocoderApi':           'ext_geocoder_api',
+    'extRmeApi':                'ext_rme_api',
+    'extRoutingApi':            'ext_routing_api',
+    'extAsyncClient':           'ext_async_api',
+    'extAsyncRoutingApi':       'ext_async_api',
+    'extAsyncRmeApi':           'ext_async_api',
+    'extAsyncGeocoderApi':      'ext_async_api',
+    'extResponseCache':         'extCache',
+    'extSession':               'extHttp',
+    'extHttpError':             'extHttp',
+    'extSpatialIndex':          'extSpatial',
+    'extLocalMatcher':          'extMatch',
+    'list_colors':              'extUtils',
+    'mps2kmph':                 'extUtils',
+    'kmph2mps':                 'extUtils',
+    'm2km':                     'extUtils',
+    'getColorIndex':            'extUtils',
+    'POLYLINE_COLOR_STEPS':     'extUtils',
+    'getStepColorIndex':        'extUtils',
+    'getSpanGroups':            'extUtils',
+    'getPolylineMap':           'extUtils',
+    'FLEET_ZOOM_LEVELS':        'extUtils',
+    'getFleetGeoJson':          'extUtils',
+    'getFleetMap':              'extUtils',
+    'plotSegmentsvsTime':       'extUtils',
+    'plotSegmentsvsDistance':   'extUtils',
+    'dataframe2gpx':            'extUtils',
+    'gpx2dataframe':            'extUtils',
+}
+
+_SUBMODULES = ['ext_geocoder_api', 'ext_rme_api', 'ext_routing_api', 'ext_async_api', 'extCache', 'extConcurrency',
+               'extDistance', 'extEnergy', 'extGpx', 'extHttp', 'extInstrumentation', 'extMatch', 'extParse', 'extPlot', 'extSimplify',
+               'extSpatial', 'extStorage', 'extStream', 'extUtils']
+
+__all__ = list(_LAZY_NAMES)
+
+def __getattr__(name: str):
+    if name in _LAZY_NAMES:
+        value = getattr(importlib.import_module('.'+_LAZY_NAMES[name], __name__), name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module('.'+name, __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_NAMES) | set(_SUBMODULES))
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+
+import sqlite3
+import threading
+import hashlib
+import json
+import time
+from typing import Callable, Dict
+from extherepy import extInstrumentation
+from extherepy import extParse
+
+# default time to live per API [s]
+DEFAULT_TTL = {
+    'route_v8':     15*60,              # traffic dependent, short lived
+    'match_route':  30*24*3600,         # map matching of a given trace
+    'free_form':    90*24*3600,         # geocodes are stable
+}
+
+class extResponseCache(object):
+    '''
+    Persistent cache of HERE API responses keyed on the normalized request parameters.
+    Responses are stored as JSON in an SQLite database, expire after a per API time to live
+    and the least recently used entries are evicted above max_entries.
+    '''
+
+    def __init__(self,
+                 path: str = ':memory:',
+                 ttl: Dict[str, float] = None,
+                 max_entries: int = 10000):
+        """Returns a extResponseCache instance.
+
+        :param str path: path to the SQLite database (':memory:' for a non persistent cache)
+        :param dict ttl: time to live per API [s], overrides DEFAULT_TTL
+        :param int max_entries: maximum number of cached responses
+        """
+        self.ttl = dict(DEFAULT_TTL)
+        if ttl:
+            self.ttl.update(ttl)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('''CREATE TABLE IF NOT EXISTS responses (
+                                        key TEXT PRIMARY KEY,
+                                        api TEXT NOT NULL,
+                                        created REAL NOT NULL,
+                                        accessed REAL NOT NULL,
+                                        response TEXT NOT NULL)''')
+        self._connection.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+        self._connection.commit()
+
+    @staticmethod
+    def getKey(api: str, params: dict) -> str:
+        '''This method returns the cache key of a request
+
+        :param str api: API name (e.g. 'route_v8')
+        :param dict params: request parameters
+
+        :returns: key: hash of the normalized request
+
+        :rtype: str
+        '''
+        request = json.dumps({'api': api, 'params': params}, sort_keys=True, default=str)
+        return hashlib.sha256(request.encode('utf-8')).hexdigest()
+
+    def get(self, api: str, params: dict) -> dict:
+        '''This method returns a cached response
+
+        :param str api: API name
+        :param dict params: request parameters
+
+        :returns: response: cached response, None if missing or expired
+
+        :rtype: dict
+        '''
+        key = self.getKey(api, params)
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute('SELECT created, response FROM responses WHERE key=?', (key,)).fetchone()
+            if row is not None and now-row[0] > self.ttl.get(api, float('inf')):
+                self._connection.execute('DELETE FROM responses WHERE key=?', (key,))
+                self._connection.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                extInstrumentation.count('cache.misses', api=api)
+                return None
+            self._connection.execute('UPDATE responses SET accessed=? WHERE key=?', (now, key))
+            self._connection.commit()
+            self.hits += 1
+        extInstrumentation.count('cache.hits', api=api)
+        return extParse.loads(row[1])
+
+    def set(self, api: str, params: dict, response: dict):
+        '''This method stores a response
+
+        :param str api: API name
+        :param dict params: request parameters
+        :param dict response: response (as_dict)
+        '''
+        key = self.getKey(api, params)
+        now = time.time()
+        with self._lock:
+            self._connection.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)',
+                                     (key, api, now, now, json.dumps(response)))
+            # evict the least recently used entries
+            self._connection.execute('''DELETE FROM responses WHERE key IN (
+                                            SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)''',
+                                     (self.max_entries,))
+            self._connection.commit()
+
+    def getOrFetch(self, api: str, params: dict, fetch: Callable[[], dict], cacheable: Callable[[dict], bool] = None) -> dict:
+        '''This method returns the cached response or fetches and stores it
+
+        :param str api: API name
+        :param dict params: request parameters
+        :param Callable fetch: function performing the request and returning the response as dict
+        :param Callable cacheable: function telling if a fetched response is stored (default all the responses)
+
+        :returns: response
+
+        :rtype: dict
+        '''
+        response = self.get(api, params)
+        if response is None:
+            response = fetch()
+            if cacheable is None or cacheable(response):
+                self.set(api, params, response)
+        return response
+
+    def clear(self):
+        '''This method removes all the cached responses
+        '''
+        with self._lock:
+            self._connection.execute('DELETE FROM responses')
+            self._connection.commit()
+
+    def getStats(self) -> dict:
+        '''This method returns the cache statistics
+
+        :returns: stats: hits, misses and number of entries
+
+        :rtype: dict
+        '''
+        with self._lock:
+            entries = self._connection.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries}
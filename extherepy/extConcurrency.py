@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+
+import threading
+import asyncio
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Tuple
+import requests
+from extherepy.extHttp import extHttpError, RETRYABLE_STATUS
+
+class extRateLimiter(object):
+    '''
+    Thread safe rate limiter spacing the calls at a fixed minimum interval.
+    '''
+
+    def __init__(self, rate: float = None):
+        """Returns a extRateLimiter instance.
+
+        :param float rate: maximum number of calls per second (None for no limit)
+        """
+        self._interval = 1/rate if rate else 0
+        self._lock = threading.Lock()
+        self._next_call = 0
+
+    def wait(self):
+        '''This method blocks until the next call is allowed
+        '''
+        if not self._interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            call = max(now, self._next_call)
+            self._next_call = call+self._interval
+        if call > now:
+            time.sleep(call-now)
+
+def mapConcurrent(function: Callable,
+                  items: list,
+                  max_workers: int = 8,
+                  rate_limit: float = None) -> List[Tuple[object, Exception]]:
+    '''This method applies a function to the items through a bounded thread pool
+
+    :param Callable function: function called on each item
+    :param list items: items
+    :param int max_workers: maximum number of concurrent calls
+    :param float rate_limit: maximum number of calls per second (None for no limit)
+
+    :returns: results: (result, error) for each item, in input order
+
+    :rtype: List[Tuple[object, Exception]]
+    '''
+    rate_limiter = extRateLimiter(rate_limit)
+
+    def call(item):
+        rate_limiter.wait()
+        try:
+            return function(item), None
+        except Exception as error:
+            return None, error
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(call, items))
+
+def isRetryable(error: Exception) -> bool:
+    '''This method tells whether a failed request is worth retrying
+
+    Connection errors, timeouts, rate limiting (429) and server errors (5xx, see extHttp.extHttpError) are transient.
+    Client errors (credentials, invalid request, no route found, ...) and parsing errors are not retried.
+    The HTTP status is only known when the requests are sent by extherepy (API with a session or a cache):
+    HerePy raises the errors of 429/5xx responses as a plain HEREError, which is not retried.
+
+    :param Exception error: error raised by the request
+
+    :returns: retryable
+
+    :rtype: bool
+    '''
+    if isinstance(error, extHttpError):
+        return error.status_code in RETRYABLE_STATUS
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+def callWithRetry(function: Callable,
+                  max_retries: int = 3,
+                  backoff: float = 1.0):
+    '''This method calls a function retrying transient errors with exponential backoff
+
+    :param Callable function: function performing the request
+    :param int max_retries: maximum number of retries
+    :param float backoff: initial retry delay [s], doubled at each retry (with random jitter)
+
+    :returns: result of the function
+    '''
+    for retry in range(max_retries+1):
+        try:
+            return function()
+        except Exception as error:
+            if retry==max_retries or not isRetryable(error):
+                raise
+            time.sleep(backoff*2**retry*random.uniform(0.5, 1.5))
+
+class extAsyncRateLimiter(object):
+    '''
+    Asyncio rate limiter spacing the calls at a fixed minimum interval.
+    '''
+
+    def __init__(self, rate: float = None):
+        """Returns a extAsyncRateLimiter instance.
+
+        :param float rate: maximum number of calls per second (None for no limit)
+        """
+        self._interval = 1/rate if rate else 0
+        self._next_call = 0
+
+    async def wait(self):
+        '''This method waits until the next call is allowed
+        '''
+        if not self._interval:
+            return
+        # no lock needed, the event loop runs one coroutine at a time
+        now = time.monotonic()
+        call = max(now, self._next_call)
+        self._next_call = call+self._interval
+        if call > now:
+            await asyncio.sleep(call-now)
+
+async def callWithRetryAsync(function: Callable,
+                             max_retries: int = 3,
+                             backoff: float = 1.0):
+    '''This method awaits a coroutine function retrying transient errors with exponential backoff (see callWithRetry)
+
+    :param Callable function: coroutine function performing the request
+    :param int max_retries: maximum number of retries
+    :param float backoff: initial retry delay [s], doubled at each retry (with random jitter)
+
+    :returns: result of the function
+    '''
+    for retry in range(max_retries+1):
+        try:
+            return await function()
+        except Exception as error:
+            if retry==max_retries or not isRetryable(error):
+                raise
+            await asyncio.sleep(backoff*2**retry*random.uniform(0.5, 1.5))
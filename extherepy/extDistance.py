@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+
+import numpy as np
+
+# WGS-84 ellipsoid
+WGS84_A = 6378137.0                 # semi-major axis [m]
+WGS84_F = 1/298.257223563           # flattening [-]
+WGS84_B = WGS84_A*(1-WGS84_F)       # semi-minor axis [m]
+EARTH_RADIUS = 6371008.8            # mean earth radius [m]
+
+DISTANCE_METHODS = ['geodesic', 'haversine', 'equirectangular']
+
+def _vincenty(lat1: np.array, lon1: np.array, lat2: np.array, lon2: np.array,
+              tolerance: float = 1e-12,
+              max_iterations: int = 200):
+    '''This method computes the ellipsoidal distance with the Vincenty inverse formula
+
+    :param numpy.array lat1: latitude of the first points [rad]
+    :param numpy.array lon1: longitude of the first points [rad]
+    :param numpy.array lat2: latitude of the second points [rad]
+    :param numpy.array lon2: longitude of the second points [rad]
+    :param float tolerance: convergence tolerance on lambda [rad]
+    :param int max_iterations: maximum number of iterations
+
+    :returns: distances: distances [m], converged: mask of the converged pairs
+
+    :rtype: Tuple[numpy.array, numpy.array]
+    '''
+    L = lon2-lon1
+    U1 = np.arctan((1-WGS84_F)*np.tan(lat1))
+    U2 = np.arctan((1-WGS84_F)*np.tan(lat2))
+    sinU1, cosU1 = np.sin(U1), np.cos(U1)
+    sinU2, cosU2 = np.sin(U2), np.cos(U2)
+
+    # the converged pairs are kept: the distance of a pair does not depend on the other pairs
+    lambda_ = L.copy()
+    converged = np.zeros(len(L), dtype=bool)
+    sin_sigma, cos_sigma, sigma, cos2_alpha, cos_2sigma_m = np.zeros((5, len(L)))
+    for _ in range(max_iterations):
+        sin_lambda, cos_lambda = np.sin(lambda_), np.cos(lambda_)
+        sin_sigma_k = np.hypot(cosU2*sin_lambda, cosU1*sinU2-sinU1*cosU2*cos_lambda)
+        cos_sigma_k = sinU1*sinU2+cosU1*cosU2*cos_lambda
+        sigma_k = np.arctan2(sin_sigma_k, cos_sigma_k)
+        coincident = sin_sigma_k == 0
+        sin_alpha = np.divide(cosU1*cosU2*sin_lambda, sin_sigma_k, out=np.zeros(len(L)), where=~coincident)
+        cos2_alpha_k = 1-sin_alpha**2
+        equatorial = cos2_alpha_k == 0
+        cos_2sigma_m_k = np.divide(2*sinU1*sinU2, cos2_alpha_k, out=np.zeros(len(L)), where=~equatorial)
+        cos_2sigma_m_k = np.where(equatorial, 0, cos_sigma_k-cos_2sigma_m_k)
+        C = WGS84_F/16*cos2_alpha_k*(4+WGS84_F*(4-3*cos2_alpha_k))
+        lambda_next = L+(1-C)*WGS84_F*sin_alpha*(sigma_k+C*sin_sigma_k*(cos_2sigma_m_k+C*cos_sigma_k*(-1+2*cos_2sigma_m_k**2)))
+        iterating = ~converged
+        for state, value in ((sin_sigma, sin_sigma_k), (cos_sigma, cos_sigma_k), (sigma, sigma_k), 
+                             (cos2_alpha, cos2_alpha_k), (cos_2sigma_m, cos_2sigma_m_k)):
+            np.copyto(state, value, where=iterating)
+        converged |= np.abs(lambda_next-lambda_) <= tolerance
+        np.copyto(lambda_, lambda_next, where=iterating)
+        if converged.all():
+            break
+
+    u2 = cos2_alpha*(WGS84_A**2-WGS84_B**2)/WGS84_B**2
+    A = 1+u2/16384*(4096+u2*(-768+u2*(320-175*u2)))
+    B = u2/1024*(256+u2*(-128+u2*(74-47*u2)))
+    delta_sigma = B*sin_sigma*(cos_2sigma_m+B/4*(cos_sigma*(-1+2*cos_2sigma_m**2)-
+                                               B/6*cos_2sigma_m*(-3+4*sin_sigma**2)*(-3+4*cos_2sigma_m**2)))
+    distances = WGS84_B*A*(sigma-delta_sigma)
+    return distances, converged
+
+def getDistances(latitudes_1: np.array,
+                 longitudes_1: np.array,
+                 latitudes_2: np.array,
+                 longitudes_2: np.array,
+                 method: str = 'geodesic') -> np.array:
+    '''This method computes the distances between two sets of geographic coordinates
+
+    :param numpy.array latitudes_1: latitude of the first points [deg]
+    :param numpy.array longitudes_1: longitude of the first points [deg]
+    :param numpy.array latitudes_2: latitude of the second points [deg]
+    :param numpy.array longitudes_2: longitude of the second points [deg]
+    :param str method: 'geodesic' (ellipsoidal, within 1 mm of geopy.distance.geodesic),
+                       'haversine' (spherical) or 'equirectangular' (flat earth approximation, fastest)
+
+    :returns: distances: distances [m]
+
+    :rtype: numpy.array
+    '''
+    if method not in DISTANCE_METHODS:
+        raise ValueError(f"[ERROR] distance method must be one of {DISTANCE_METHODS}")
+
+    lat1 = np.radians(np.asarray(latitudes_1, dtype=float))
+    lon1 = np.radians(np.asarray(longitudes_1, dtype=float))
+    lat2 = np.radians(np.asarray(latitudes_2, dtype=float))
+    lon2 = np.radians(np.asarray(longitudes_2, dtype=float))
+
+    if method == 'haversine':
+        h = np.sin((lat2-lat1)/2)**2+np.cos(lat1)*np.cos(lat2)*np.sin((lon2-lon1)/2)**2
+        return 2*EARTH_RADIUS*np.arcsin(np.sqrt(np.clip(h, 0, 1)))
+
+    if method == 'equirectangular':
+        x = (lon2-lon1)*np.cos((lat1+lat2)/2)
+        y = lat2-lat1
+        return EARTH_RADIUS*np.hypot(x, y)
+
+    distances, converged = _vincenty(lat1, lon1, lat2, lon2)
+    # nearly antipodal pairs do not converge with Vincenty, fall back to geopy (Karney)
+    if not converged.all():
+        from geopy import distance
+    for i in np.flatnonzero(~converged):
+        distances[i] = distance.geodesic(np.degrees((lat1[i], lon1[i])), np.degrees((lat2[i], lon2[i]))).m
+    return distances
+
+def getSegmentLengths(latitudes: np.array,
+                      longitudes: np.array,
+                      method: str = 'geodesic') -> np.array:
+    '''This method computes the length of the segments joining consecutive geographic coordinates
+
+    :param numpy.array latitudes: latitude of the points [deg]
+    :param numpy.array longitudes: longitude of the points [deg]
+    :param str method: distance method (see getDistances)
+
+    :returns: lengths: length of the segments [m], one element less than the points
+
+    :rtype: numpy.array
+    '''
+    latitudes = np.asarray(latitudes, dtype=float)
+    longitudes = np.asarray(longitudes, dtype=float)
+    return getDistances(latitudes[:-1], longitudes[:-1], latitudes[1:], longitudes[1:], method=method)
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Tuple, Union
+
+GRAVITY = 9.80665           # [m/s2]
+AIR_DENSITY = 1.225         # [kg/m3]
+J2KWH = 1/3.6e6
+
+# vehicle parameters and their defaults (a mid size electric car)
+VEHICLE_PARAMETERS = {'mass[kg]':                   1800.0,
+                      'dragCoefficient[-]':         0.28,
+                      'frontalArea[m2]':            2.3,
+                      'rollingResistance[-]':       0.009,
+                      'drivetrainEfficiency[-]':    0.9,     # energy source to wheel
+                      'regenEfficiency[-]':         0.6,     # wheel to energy source, 0 without regenerative braking
+                      'auxiliaryPower[W]':          0.0}
+
+# number of (vehicle, segment) elements computed at once by getEnergyTotals
+CHUNK_ELEMENTS = 2**22
+
+def getVehicleParameters(vehicles: Union[Dict, List[Dict], pd.DataFrame] = None) -> pd.DataFrame:
+    '''This method returns a vehicle parameter set per row, the missing parameters taking the VEHICLE_PARAMETERS defaults
+
+    :param vehicles: dict of scalars or arrays (broadcast against each other), list of dicts or dataframe of parameters
+                     (None for the defaults)
+
+    :returns: vehicles_df: parameters of each vehicle
+
+    :rtype: pandas.DataFrame
+    '''
+    if vehicles is None:
+        vehicles = {}
+    if isinstance(vehicles, dict):
+        # scalars and arrays are broadcast against each other (parameter sweeps)
+        vehicles = pd.DataFrame(dict(zip(vehicles, np.broadcast_arrays(*[np.atleast_1d(value) for value in vehicles.values()])))) if vehicles \
+                   else pd.DataFrame(index=[0])
+    elif not isinstance(vehicles, pd.DataFrame):
+        vehicles = pd.DataFrame(list(vehicles))
+    unknown = [column for column in vehicles.columns if column not in VEHICLE_PARAMETERS]
+    if unknown:
+        raise ValueError(f"[ERROR] Unknown vehicle parameters {unknown}, valid parameters are {list(VEHICLE_PARAMETERS)}")
+    vehicles_df = vehicles.assign(**{key: value for key, value in VEHICLE_PARAMETERS.items() if key not in vehicles.columns})
+    return vehicles_df[list(VEHICLE_PARAMETERS)].astype(float)
+
+def getSegmentKinematics(route_profile_df: pd.DataFrame, route_key: str = None) -> Dict[str, np.array]:
+    '''This method returns the segment kinematics of route profiles (getRouteReport of extRoutingApi or extRmeApi)
+
+    The speed of a segment is its mean speed (delta_distance/delta_time), the segments without duration
+    (last row of a report) keep the speed of the previous segment. The first segment of each route starts
+    at its own speed.
+
+    :param pandas.DataFrame route_profile_df: route profile with delta_distance[m], delta_time[s] and delta_altitude[m]
+    :param str route_key: route column of concatenated route profiles (e.g. 'itinerary' of getRouteReportBatch)
+
+    :returns: kinematics: distance [m], time [s], altitude [m], speed [m/s], previous_speed [m/s] and
+              first (first segment of a route) of each segment
+
+    :rtype: Dict[str, numpy.array]
+    '''
+    missing = [column for column in ['delta_distance[m]', 'delta_time[s]', 'delta_altitude[m]'] if column not in route_profile_df.columns]
+    if missing:
+        raise ValueError(f"[ERROR] route profile misses the columns {missing}")
+    distance = route_profile_df['delta_distance[m]'].values.astype(float)
+    time = route_profile_df['delta_time[s]'].values.astype(float)
+    altitude = np.nan_to_num(route_profile_df['delta_altitude[m]'].values.astype(float))
+    first = np.r_[True, route_profile_df[route_key].values[1:] != route_profile_df[route_key].values[:-1]] if route_key is not None and len(distance) \
+            else np.arange(len(distance)) == 0
+
+    # mean speed, carried forward over the segments without duration within a route
+    moving = time > 0
+    speed = np.divide(distance, time, out=np.zeros(len(distance)), where=moving)
+    last_moving = np.maximum.accumulate(np.where(moving | first, np.arange(len(distance)), 0)) if len(distance) else np.zeros(0, dtype=int)
+    speed = speed[last_moving]
+    previous_speed = np.where(first, speed, np.r_[speed[:1], speed[:-1]])
+    return {'distance': distance, 'time': time, 'altitude': altitude, 'speed': speed, 'previous_speed': previous_speed, 'first': first}
+
+def getEnergyProfile(route_profile_df: pd.DataFrame,
+                     vehicles: Union[Dict, List[Dict], pd.DataFrame] = None,
+                     route_key: str = None) -> Dict[str, np.array]:
+    '''This method computes the longitudinal dynamics of route profiles for many vehicles at once
+
+    The wheel energy of a segment is the sum of the rolling resistance, grade, aerodynamic drag and kinetic energy
+    change from the previous segment speed; the energy drawn from the source is the wheel energy divided by the
+    drivetrain efficiency when positive, multiplied by the regen efficiency when negative, plus the auxiliary power.
+    The vehicle parameters are broadcast against the segments: the arrays have one row per vehicle and one
+    column per segment.
+
+    :param pandas.DataFrame route_profile_df: route profile with delta_distance[m], delta_time[s] and delta_altitude[m]
+    :param vehicles: vehicle parameters (see getVehicleParameters)
+    :param str route_key: route column of concatenated route profiles, the consumption is accumulated per route
+
+    :returns: energy_profile: wheelPower[W], power[W] (drawn from the source), energy[kWh] and consumption[kWh]
+              (cumulative energy along the route) of each vehicle and segment
+
+    :rtype: Dict[str, numpy.array]
+    '''
+    vehicles_df = getVehicleParameters(vehicles)
+    kinematics = getSegmentKinematics(route_profile_df, route_key)
+    return _getEnergyProfile(vehicles_df, kinematics)
+
+def _getSegmentEnergy(vehicles_df: pd.DataFrame, kinematics: Dict[str, np.array]) -> Tuple[np.array, np.array]:
+    '''This method computes the wheel energy [J] and the energy drawn from the source [kWh] of vehicles over segment kinematics
+    '''
+    def parameter(key):
+        return vehicles_df[key].values[:, None]
+
+    mass = parameter('mass[kg]')
+    distance, time, speed = kinematics['distance'], kinematics['time'], kinematics['speed']
+    wheel_energy = mass*(GRAVITY*(parameter('rollingResistance[-]')*distance+kinematics['altitude'])
+                         +0.5*(speed**2-kinematics['previous_speed']**2)) \
+                   +0.5*AIR_DENSITY*parameter('dragCoefficient[-]')*parameter('frontalArea[m2]')*speed**2*distance
+    energy = np.where(wheel_energy > 0,
+                      wheel_energy/parameter('drivetrainEfficiency[-]'),
+                      wheel_energy*parameter('regenEfficiency[-]'))+parameter('auxiliaryPower[W]')*time
+    return wheel_energy, energy*J2KWH
+
+def _getEnergyProfile(vehicles_df: pd.DataFrame, kinematics: Dict[str, np.array]) -> Dict[str, np.array]:
+    '''This method computes the energy profile of vehicles over segment kinematics (see getEnergyProfile)
+    '''
+    wheel_energy, energy = _getSegmentEnergy(vehicles_df, kinematics)
+    time = kinematics['time']
+
+    # cumulative energy restarting at the first segment of each route
+    consumption = np.cumsum(energy, axis=1)
+    starts = np.flatnonzero(kinematics['first'])
+    if len(starts) > 1:
+        offsets = np.concatenate([np.zeros((len(vehicles_df), 1)), consumption[:, starts[1:]-1]], axis=1)
+        consumption -= np.repeat(offsets, np.diff(np.r_[starts, consumption.shape[1]]), axis=1)
+
+    return {'wheelPower[W]':    np.divide(wheel_energy, time, out=np.zeros(wheel_energy.shape), where=time > 0),
+            'power[W]':         np.divide(energy/J2KWH, time, out=np.zeros(energy.shape), where=time > 0),
+            'energy[kWh]':      energy,
+            'consumption[kWh]': consumption}
+
+def getEnergyReport(route_profile_df: pd.DataFrame,
+                    vehicle: Dict = None,
+                    route_key: str = None) -> pd.DataFrame:
+    '''This method adds the energy channels of one vehicle to a route profile
+
+    :param pandas.DataFrame route_profile_df: route profile with delta_distance[m], delta_time[s] and delta_altitude[m]
+    :param dict vehicle: vehicle parameters (see VEHICLE_PARAMETERS, None for the defaults)
+    :param str route_key: route column of concatenated route profiles, the consumption is accumulated per route
+
+    :returns: route_profile_df: route profile with power[kW], energy[kWh] and consumption[kWh]
+
+    :rtype: pandas.DataFrame
+    '''
+    vehicles_df = getVehicleParameters(vehicle)
+    if len(vehicles_df) != 1:
+        raise ValueError("[ERROR] Please provide the parameters of one vehicle, see getEnergyProfile for many vehicles")
+    energy_profile = getEnergyProfile(route_profile_df, vehicles_df, route_key)
+    return route_profile_df.assign(**{'power[kW]':          energy_profile['power[W]'][0]/1000,
+                                      'energy[kWh]':        energy_profile['energy[kWh]'][0],
+                                      'consumption[kWh]':   energy_profile['consumption[kWh]'][0]})
+
+def getEnergyTotals(route_profiles_df: pd.DataFrame,
+                    vehicles: Union[Dict, List[Dict], pd.DataFrame] = None,
+                    route_key: str = None) -> pd.DataFrame:
+    '''This method computes the energy of many routes for many vehicles (what-if sweeps)
+
+    The vehicles are processed in chunks of CHUNK_ELEMENTS (vehicle, segment) elements to bound the memory.
+
+    :param pandas.DataFrame route_profiles_df: route profiles, concatenated with a route_key column
+    :param vehicles: vehicle parameters (see getVehicleParameters)
+    :param str route_key: route column (None for a single route)
+
+    :returns: totals_df: vehicle (row of the vehicle parameters), route, distance[km], energy[kWh] and
+              consumption[kWh/100km] of each vehicle and route
+
+    :rtype: pandas.DataFrame
+    '''
+    vehicles_df = getVehicleParameters(vehicles)
+    kinematics = getSegmentKinematics(route_profiles_df, route_key)
+    starts = np.flatnonzero(kinematics['first'])
+    routes = route_profiles_df[route_key].values[starts] if route_key is not None else np.zeros(len(starts), dtype=int)
+    distance = np.zeros(len(starts))
+    energy = np.zeros((len(vehicles_df), len(starts)))
+    if len(starts):
+        distance = np.add.reduceat(kinematics['distance'], starts)/1000
+        chunk = max(1, CHUNK_ELEMENTS//len(kinematics['distance']))
+        for chunk_start in range(0, len(vehicles_df), chunk):
+            energy[chunk_start:chunk_start+chunk] = np.add.reduceat(_getSegmentEnergy(vehicles_df.iloc[chunk_start:chunk_start+chunk], kinematics)[1], starts, axis=1)
+    return pd.DataFrame({'vehicle':                 np.repeat(np.arange(len(vehicles_df)), len(starts)),
+                         'route':                   np.tile(routes, len(vehicles_df)),
+                         'distance[km]':            np.tile(distance, len(vehicles_df)),
+                         'energy[kWh]':             energy.ravel(),
+                         'consumption[kWh/100km]':  np.divide(100*energy, distance, out=np.zeros(energy.shape), where=distance > 0).ravel()})
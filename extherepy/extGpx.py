@@ -0,0 +1,301 @@
+#!/usr/bin/env python
+
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+from typing import Iterator, List, Tuple, Dict
+from contextlib import nullcontext
+import pandas as pd
+import numpy as np
+
+GPX_HEADER = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+              '<gpx xmlns="http://www.topografix.com/GPX/1/1" version="1.1" creator="extHerePy">\n')
+GPX_FOOTER = '</gpx>\n'
+
+def _getTag(element: ET.Element) -> str:
+    '''This method returns the tag of an element without namespace
+
+    :param xml.etree.ElementTree.Element element: xml element
+
+    :returns: tag
+
+    :rtype: str
+    '''
+    return element.tag.rsplit('}', 1)[-1]
+
+def iterGpxPoints(gpx_file) -> Iterator[Tuple[str, str, str, str]]:
+    '''This method incrementally parses the track points of a gpx file
+
+    :param gpx_file: path to .gpx file or file-like object
+
+    :returns: iterator of (latitude, longitude, elevation, time) as text, None when missing
+
+    :rtype: Iterator[Tuple[str, str, str, str]]
+    '''
+    parents = []
+    for event, element in ET.iterparse(gpx_file, events=('start', 'end')):
+        if event == 'start':
+            parents.append(element)
+            continue
+        parents.pop()
+        if _getTag(element) != 'trkpt':
+            continue
+        elevation = time = None
+        for child in element:
+            tag = _getTag(child)
+            if tag == 'ele':
+                elevation = child.text
+            elif tag == 'time':
+                time = child.text
+        yield element.get('lat'), element.get('lon'), elevation, time
+        # bound memory: the parsed point is emptied and detached from its trkseg
+        element.clear()
+        if parents:
+            parents[-1].remove(element)
+
+def iterGpxWindows(gpx_file,
+                   window_size: int = None,
+                   window_duration: float = None,
+                   overlap: int = 0) -> Iterator[Tuple[List[tuple], int]]:
+    '''This method splits the track points of a gpx file in overlapping windows
+
+    :param gpx_file: path to .gpx file or file-like object
+    :param int window_size: maximum number of points of a window
+    :param float window_duration: maximum duration of a window [s]
+    :param int overlap: number of points shared by consecutive windows
+
+    :returns: iterator of (points, number of points shared with the previous window)
+
+    :rtype: Iterator[Tuple[List[tuple], int]]
+    '''
+    if not window_size and not window_duration:
+        raise ValueError("[ERROR] Please provide window_size or window_duration")
+    if window_size and overlap >= window_size:
+        raise ValueError("[ERROR] overlap must be smaller than window_size")
+
+    window = []
+    window_overlap = 0
+    window_start = None
+    for point in iterGpxPoints(gpx_file):
+        point_time = pd.Timestamp(point[3]) if window_duration and point[3] is not None else None
+        if window and len(window) > window_overlap:
+            size_exceeded = window_size and len(window) >= window_size
+            duration_exceeded = window_start is not None and point_time is not None and (point_time-window_start).total_seconds() > window_duration
+            if size_exceeded or duration_exceeded:
+                yield window, window_overlap
+                window_overlap = min(overlap, len(window)-1)
+                window = window[len(window)-window_overlap:] if window_overlap else []
+                window_start = None
+                if window_duration:
+                    window_start = pd.Timestamp(window[0][3]) if window and window[0][3] is not None else point_time
+        if window_start is None:
+            window_start = point_time
+        window.append(point)
+
+    if len(window) > window_overlap:
+        yield window, window_overlap
+
+def getGpxContent(points: List[tuple]) -> str:
+    '''This method writes track points in a gpx document
+
+    The coordinates are written as floats (as writeGpx does), so that no text of the input ends in the attributes.
+
+    :param List[tuple] points: track points (latitude, longitude, elevation, time) as text
+
+    :returns: gpx_content: gpx document
+
+    :rtype: str
+    '''
+    lines = [GPX_HEADER, '<trk>\n<trkseg>\n']
+    for latitude, longitude, elevation, time in points:
+        try:
+            lines.append(f'<trkpt lat="{float(latitude)!r}" lon="{float(longitude)!r}">')
+        except (TypeError, ValueError):
+            raise ValueError(f"[ERROR] invalid track point coordinates {latitude!r}, {longitude!r}")
+        if elevation is not None:
+            lines.append(f'<ele>{escape(elevation)}</ele>')
+        if time is not None:
+            lines.append(f'<time>{escape(time)}</time>')
+        lines.append('</trkpt>\n')
+    lines.append('</trkseg>\n</trk>\n')
+    lines.append(GPX_FOOTER)
+    return ''.join(lines)
+
+def _getGroupStarts(groups: np.array) -> np.array:
+    '''This method flags the rows starting a new run of group values
+
+    :param numpy.array groups: group value of each row
+
+    :returns: starts: True where the group differs from the previous row
+
+    :rtype: numpy.array
+    '''
+    starts = np.ones(len(groups), dtype=bool)
+    if len(groups) > 1:
+        starts[1:] = pd.Series(groups).ne(pd.Series(groups).shift()).values[1:]
+    return starts
+
+def writeGpx(output_file: str,
+             latitudes: np.array,
+             longitudes: np.array,
+             elevations: np.array = None,
+             times: np.array = None,
+             tracks: np.array = None,
+             segments: np.array = None,
+             chunk_size: int = 100000,
+             return_xml: bool = False) -> str:
+    '''This method streams track points to a gpx file in chunks
+
+    A new track (segment) is started at each change of the track (segment) value between consecutive points.
+
+    :param output_file: path to the .gpx file or writable file-like object
+    :param numpy.array latitudes: latitude of the points [deg]
+    :param numpy.array longitudes: longitude of the points [deg]
+    :param numpy.array elevations: elevation of the points [m], NaN for missing
+    :param numpy.array times: time of the points (datetime64, UTC), NaT for missing
+    :param numpy.array tracks: track of the points, the value is written as track name
+    :param numpy.array segments: segment of the points
+    :param int chunk_size: number of points formatted and written at once
+    :param bool return_xml: return the gpx document as string
+
+    :returns: gpx_content: gpx document if return_xml, else None
+
+    :rtype: str
+    '''
+    n_points = len(latitudes)
+    latitudes = np.asarray(latitudes, dtype=float)
+    longitudes = np.asarray(longitudes, dtype=float)
+
+    if times is not None:
+        times = np.asarray(times, dtype='datetime64[ns]')
+        # keep the sub-second precision only when present
+        unit = 's' if (times[~np.isnat(times)].astype(np.int64) % 10**9 == 0).all() else 'ms'
+    if tracks is not None:
+        tracks = np.asarray(tracks)
+    new_track = _getGroupStarts(tracks) if tracks is not None else np.zeros(n_points, dtype=bool)
+    new_segment = _getGroupStarts(np.asarray(segments)) | new_track if segments is not None else new_track.copy()
+    if n_points:
+        new_track[0] = new_segment[0] = True
+
+    xml_chunks = [] if return_xml else None
+    with open(output_file, 'w') if not hasattr(output_file, 'write') else nullcontext(output_file) as f:
+        def write(text):
+            f.write(text)
+            if xml_chunks is not None:
+                xml_chunks.append(text)
+
+        write(GPX_HEADER)
+        for start in range(0, n_points, chunk_size):
+            end = min(start+chunk_size, n_points)
+            points = [f'<trkpt lat="{latitude!r}" lon="{longitude!r}">' for latitude, longitude in
+                      zip(latitudes[start:end].tolist(), longitudes[start:end].tolist())]
+            if elevations is not None:
+                chunk_elevations = np.asarray(elevations[start:end], dtype=float)
+                points = [point+f'<ele>{elevation!r}</ele>' if elevation == elevation else point
+                          for point, elevation in zip(points, chunk_elevations.tolist())]
+            if times is not None:
+                chunk_times = np.datetime_as_string(times[start:end], unit=unit)
+                points = [point+f'<time>{time}Z</time>' if time != 'NaT' else point
+                          for point, time in zip(points, chunk_times.tolist())]
+
+            lines = []
+            for i, point in enumerate(points, start):
+                if new_segment[i]:
+                    if i > 0:
+                        lines.append('</trkseg>\n')
+                    if new_track[i]:
+                        if i > 0:
+                            lines.append('</trk>\n')
+                        lines.append(f'<trk><name>{escape(str(tracks[i]))}</name>\n' if tracks is not None else '<trk>\n')
+                    lines.append('<trkseg>\n')
+                lines.append(point+'</trkpt>\n')
+            write(''.join(lines))
+        if n_points:
+            write('</trkseg>\n</trk>\n')
+        write(GPX_FOOTER)
+
+    if xml_chunks is not None:
+        return ''.join(xml_chunks)
+
+def writeGpxDataFrame(output_file,
+                      input_df: pd.DataFrame,
+                      lats_colname: str = 'latitude',
+                      longs_colname: str = 'longitude',
+                      times_colname: str = None,
+                      alts_colname: str = None,
+                      track_colname: str = None,
+                      segment_colname: str = None,
+                      chunk_size: int = 100000,
+                      return_xml: bool = False) -> str:
+    '''This method streams the columns of a dataframe to a gpx file (see writeGpx)
+
+    :param output_file: path to the .gpx file or writable file-like object
+    :param pandas.DataFrame input_df: track points
+    :param str lats_colname: latitude column [deg]
+    :param str longs_colname: longitude column [deg]
+    :param str times_colname: time column, unixtime [s] or datetime
+    :param str alts_colname: elevation column [m]
+    :param str track_colname: a new track is started at each change of this column
+    :param str segment_colname: a new track segment is started at each change of this column
+    :param int chunk_size: number of points written at once
+    :param bool return_xml: return the gpx document as string
+
+    :returns: gpx_content: gpx document if return_xml, else None
+
+    :rtype: str
+    '''
+    times = None
+    if times_colname:
+        times = input_df[times_colname]
+        if pd.api.types.is_numeric_dtype(times):
+            times = pd.to_datetime(times.values, unit='s')      # timestamp accepted is in unixtime
+        elif isinstance(times.dtype, pd.DatetimeTZDtype):
+            times = times.dt.tz_convert('UTC').dt.tz_localize(None)
+        times = np.asarray(times, dtype='datetime64[ns]')
+
+    return writeGpx(output_file,
+                    input_df[lats_colname].values,
+                    input_df[longs_colname].values,
+                    elevations=input_df[alts_colname].values if alts_colname else None,
+                    times=times,
+                    tracks=input_df[track_colname].values if track_colname else None,
+                    segments=input_df[segment_colname].values if segment_colname else None,
+                    chunk_size=chunk_size,
+                    return_xml=return_xml)
+
+def _getColumnBlock(latitudes: list, longitudes: list, elevations: list, times: list) -> Dict[str, np.array]:
+    '''This method converts parsed track points to columns
+
+    :param list latitudes: latitude of the points as text
+    :param list longitudes: longitude of the points as text
+    :param list elevations: elevation of the points as text, None for missing
+    :param list times: time of the points as text, None for missing
+
+    :returns: block: latitude [deg], longitude [deg], elevation [m] and time (datetime64[ms], UTC) columns
+
+    :rtype: Dict[str, numpy.array]
+    '''
+    time = pd.to_datetime(pd.Series(times, dtype=object), utc=True, format='ISO8601')
+    return {'latitude':     np.array(latitudes, dtype=float),
+            'longitude':    np.array(longitudes, dtype=float),
+            'elevation':    np.array([np.nan if elevation is None else elevation for elevation in elevations], dtype=float),
+            'time':         time.dt.tz_localize(None).values.astype('datetime64[ms]')}
+
+def iterGpxBlocks(gpx_file, block_size: int = 100000) -> Iterator[Dict[str, np.array]]:
+    '''This method incrementally parses a gpx file in blocks of columns with bounded memory
+
+    :param gpx_file: path to .gpx file or file-like object
+    :param int block_size: maximum number of points per block
+
+    :returns: iterator of blocks with latitude [deg], longitude [deg], elevation [m] and time (datetime64[ms], UTC) columns
+
+    :rtype: Iterator[Dict[str, numpy.array]]
+    '''
+    columns = ([], [], [], [])
+    for point in iterGpxPoints(gpx_file):
+        for column, value in zip(columns, point):
+            column.append(value)
+        if len(columns[0]) >= block_size:
+            yield _getColumnBlock(*columns)
+            columns = ([], [], [], [])
+    if columns[0]:
+        yield _getColumnBlock(*columns)
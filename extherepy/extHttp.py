@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+
+import gzip
+import zlib
+import base64
+import time
+import threading
+import functools
+import inspect
+from collections import namedtuple, deque
+from urllib.parse import urlparse
+from typing import Dict, List
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import pandas as pd
+from extherepy import extInstrumentation
+from extherepy import extParse
+import herepy
+from herepy import RoutingApi, RmeApi, GeocoderApi
+from herepy.utils import Utils
+from herepy.error import HEREError, UnauthorizedError
+from herepy.models import RmeResponse, GeocoderResponse
+from herepy.routing_api import error_from_routing_service_error
+
+# HERE request built from the HerePy parameters, parse(status, content) turns the HTTP response into a HerePy response
+PreparedRequest = namedtuple('PreparedRequest', ['method', 'url', 'headers', 'body', 'parse'])
+
+# private request methods of HerePy overridden by the ext APIs to send the requests through extSession/extAsyncClient,
+# getRoutingRequest/getRmeRequest/getGeocoderRequest reproduce them as they are from herepy 3.5.8 to 3.6.5
+HEREPY_REQUEST_METHODS = {
+    RoutingApi:     ('_RoutingApi__get', ['self', 'base_url', 'data', 'key', 'response_cls', 'manipulation_key', 'keys_for_manipulation', 'headers']),
+    RmeApi:         ('_RmeApi__get', ['self', 'data']),
+    GeocoderApi:    ('_GeocoderApi__get', ['self', 'data']),
+}
+
+@functools.lru_cache(maxsize=None)
+def checkHerePyRequests(api_cls: type):
+    '''This method checks that HerePy still sends the requests of an API through the private method overridden by the ext APIs
+
+    HerePy has no public seam to send its requests through another client, the sessions, the caches and the async APIs
+    rely on its private __get methods: they are refused when the installed HerePy no longer has them.
+
+    :param type api_cls: HerePy API class (RoutingApi, RmeApi or GeocoderApi)
+    '''
+    name, parameters = HEREPY_REQUEST_METHODS[api_cls]
+    method = api_cls.__dict__.get(name)
+    if method is None or list(inspect.signature(method).parameters) != parameters:
+        raise ImportError(f"[ERROR] herepy {herepy.__version__} does not send the {api_cls.__name__} requests through {name}, "
+                          "sessions, caches and async APIs require herepy>=3.5.8,<=3.6.5")
+
+# transient HTTP statuses: rate limiting and server errors
+RETRYABLE_STATUS = [429, 500, 502, 503, 504]
+
+class extHttpError(HEREError):
+    '''
+    HEREError of a rate limited (429) or server error (5xx) response, keeping the HTTP status.
+    '''
+
+    def __init__(self, status_code: int, message: str):
+        """Returns a extHttpError instance.
+
+        :param int status_code: HTTP status of the response
+        :param str message: error message
+        """
+        super(extHttpError, self).__init__(message)
+        self.status_code = status_code
+
+def parseResponse(request: PreparedRequest, status: int, content: bytes):
+    '''This method turns the HTTP response into a HerePy response
+
+    The errors of the 429/5xx responses (HEREError, or ValueError on a non JSON gateway page) are raised as extHttpError.
+
+    :param PreparedRequest request: request
+    :param int status: HTTP status
+    :param bytes content: response content
+
+    :returns: HerePy response
+    '''
+    try:
+        return request.parse(status, content)
+    except Exception as error:
+        if status in RETRYABLE_STATUS:
+            raise extHttpError(status, f"[ERROR] HTTP {status}: {error}") from error
+        raise
+
+def getRoutingRequest(base_url: str,
+                      data: dict,
+                      response_cls: type,
+                      manipulation_key: str = None,
+                      keys_for_manipulation: List[str] = None,
+                      headers: Dict[str, str] = None) -> PreparedRequest:
+    '''This method prepares a routing request as HerePy RoutingApi does
+
+    :param str base_url: endpoint
+    :param dict data: query parameters
+    :param type response_cls: HerePy response class
+    :param str manipulation_key: replacement of keys_for_manipulation in the url (repeated via parameters)
+    :param List[str] keys_for_manipulation: keys replaced in the url
+    :param Dict[str, str] headers: request headers
+
+    :returns: request
+
+    :rtype: PreparedRequest
+    '''
+    url = Utils.build_url(base_url, extra_params=data)
+    if manipulation_key and keys_for_manipulation:
+        for k in keys_for_manipulation:
+            url = url.replace(k, manipulation_key)
+
+    def parse(status, content):
+        json_data = extParse.loads(content)
+        if status == requests.codes.OK:
+            return response_cls.new_from_jsondict(json_data)
+        raise error_from_routing_service_error(json_data)
+    return PreparedRequest('GET', url, headers, None, parse)
+
+def getRmeRequest(base_url: str, data: dict, compress: bool = False) -> PreparedRequest:
+    '''This method prepares a match_route request as HerePy RmeApi does
+
+    :param str base_url: endpoint
+    :param dict data: query parameters, the gpx document in 'file' (zipped, base64)
+    :param bool compress: POST the gpx document gzip compressed in the body instead of the url
+
+    :returns: request
+
+    :rtype: PreparedRequest
+    '''
+    def parse(status, content):
+        try:
+            json_data = extParse.loads(content)
+            if json_data.get('TracePoints') != None:
+                return RmeResponse.new_from_jsondict(json_data)
+            raise HEREError(json_data.get('Details', 'Error occurred on function match_route'))
+        except ValueError as err:
+            raise HEREError('Error occurred on function match_route ' + str(err))
+
+    if compress:
+        gpx_content = zlib.decompress(base64.b64decode(data['file']))
+        params = {key: value for key, value in data.items() if key != 'file'}
+        return PreparedRequest('POST',
+                               Utils.build_url(base_url, extra_params=params),
+                               {'Content-Type': 'application/octet-stream', 'Content-Encoding': 'gzip'},
+                               gzip.compress(gpx_content),
+                               parse)
+    return PreparedRequest('GET', Utils.build_url(base_url, extra_params=data), None, None, parse)
+
+def getGeocoderRequest(base_url: str, data: dict) -> PreparedRequest:
+    '''This method prepares a geocoding request as HerePy GeocoderApi does
+
+    :param str base_url: endpoint
+    :param dict data: query parameters
+
+    :returns: request
+
+    :rtype: PreparedRequest
+    '''
+    def parse(status, content):
+        try:
+            json_data = extParse.loads(content)
+            if json_data.get('items') != None:
+                return GeocoderResponse.new_from_jsondict(json_data)
+            elif json_data.get('error') == 'Unauthorized':
+                raise UnauthorizedError(json_data['error_description'])
+            raise HEREError(json_data.get('Details', 'Error occurred on function free_form'))
+        except ValueError as err:
+            raise HEREError('Error occurred on function free_form ' + str(err))
+    return PreparedRequest('GET', Utils.build_url(base_url, extra_params=data), None, None, parse)
+
+def sendRequest(request: PreparedRequest, timeout: float):
+    '''This method sends a HERE request on a new connection, as HerePy does
+
+    The response bytes are parsed directly (see extParse.loads).
+
+    :param PreparedRequest request: request
+    :param float timeout: timeout of the request [s]
+
+    :returns: HerePy response
+    '''
+    response = requests.request(request.method, request.url, headers=request.headers, data=request.body, timeout=timeout)
+    return parseResponse(request, response.status_code, response.content)
+
+class extSession(object):
+    '''
+    Pooled HTTP session shared by the ext* APIs, with keep-alive connections, gzip compression,
+    transparent retries of rate limited (429) and server errors (5xx) and per call timing.
+    The batch methods of the APIs with a session leave the retries to it (callWithRetry is skipped).
+    '''
+
+    def __init__(self,
+                 pool_size: int = 10,
+                 max_retries: int = 3,
+                 backoff: float = 0.5,
+                 compress_requests: bool = False,
+                 max_timings: int = 10000):
+        """Returns a extSession instance.
+
+        :param int pool_size: number of pooled connections per host
+        :param int max_retries: maximum number of retries of connection errors and 429/5xx responses
+        :param float backoff: retry backoff factor [s], the delays are backoff*2**retry (Retry-After is honoured)
+        :param bool compress_requests: upload the gpx documents of match_route gzip compressed in the body of a POST
+        :param int max_timings: number of calls kept in the timing log
+        """
+        retry = Retry(total=max_retries,
+                      connect=max_retries,
+                      read=max_retries,
+                      status=max_retries,
+                      backoff_factor=backoff,
+                      status_forcelist=RETRYABLE_STATUS,
+                      allowed_methods=['GET', 'POST'],
+                      respect_retry_after_header=True,
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self._session = requests.Session()
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+        self._session.headers.update({'Accept-Encoding': 'gzip, deflate'})
+        self.compress_requests = compress_requests
+        self._timings = deque(maxlen=max_timings)
+        self._lock = threading.Lock()
+
+    def request(self, request: PreparedRequest, timeout: float):
+        '''This method sends a HERE request through the pooled connections
+
+        :param PreparedRequest request: request
+        :param float timeout: timeout of the request [s]
+
+        :returns: HerePy response
+        '''
+        url = urlparse(request.url)
+        request_size = len(request.url)+len(request.body or b'')
+        start = time.perf_counter()
+        status = None
+        content = b''
+        try:
+            with extInstrumentation.stage('http.request', endpoint=url.netloc+url.path, method=request.method) as request_stage:
+                response = self._session.request(request.method, request.url, headers=request.headers, data=request.body, timeout=timeout)
+                status, content = response.status_code, response.content
+                request_stage.set(status=status, request_size=request_size, response_size=len(content))
+            return parseResponse(request, status, content)
+        finally:
+            with self._lock:
+                self._timings.append({'endpoint':           url.netloc+url.path,
+                                      'method':             request.method,
+                                      'status':             status,
+                                      'time[s]':            time.perf_counter()-start,
+                                      'request_size[B]':    request_size,
+                                      'response_size[B]':   len(content)})
+            extInstrumentation.count('http.request_size[B]', request_size)
+            extInstrumentation.count('http.response_size[B]', len(content))
+
+    def getTimings(self) -> pd.DataFrame:
+        '''This method returns the timing log of the calls
+
+        :returns: timings_df: endpoint, method, status (None if the call failed), time[s] (retries included),
+                  request_size[B] and response_size[B] (decompressed) of each call
+
+        :rtype: pandas.DataFrame
+        '''
+        with self._lock:
+            timings = list(self._timings)
+        return pd.DataFrame(timings, columns=['endpoint', 'method', 'status', 'time[s]', 'request_size[B]', 'response_size[B]'])
+
+    def close(self):
+        '''This method closes the pooled connections
+        '''
+        self._session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
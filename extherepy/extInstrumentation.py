@@ -0,0 +1,297 @@
+#!/usr/bin/env python
+
+import time
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Dict
+import pandas as pd
+
+# handlers receiving the events, a tuple replaced on change so that emitting needs no lock
+_handlers = ()
+# handlers also notified when a stage starts (see addHandler)
+_stage_starters = ()
+_handlers_lock = threading.Lock()
+# innermost open stage of the current thread/task
+_current_stage = contextvars.ContextVar('extherepy_stage', default=None)
+
+def addHandler(handler: Callable[[dict], None]):
+    '''This method registers an event handler, enabling the instrumentation
+
+    The handler is called with a dict for each event:
+        kind:       'stage' (timed block) or 'counter'
+        name:       e.g. 'routing.decode', 'cache.hits'
+        value:      duration [s] of a stage, increment of a counter
+        start:      start of a stage, unixtime [ns] (time of the event for a counter)
+        parent:     name of the enclosing stage (None at top level)
+        attributes: dict of attributes (api, sizes, ...)
+
+    Events emitted in worker processes (e.g. the parsing pool of getRouteReportBatch) do not reach the handlers.
+    A handler with a startStage method is also called with the stage event (value None) when the stage starts,
+    in the thread/task running the stage, e.g. to open a span enclosing the nested stages.
+
+    :param Callable handler: function called with each event, it must be thread safe and fast
+    '''
+    global _handlers, _stage_starters
+    with _handlers_lock:
+        _handlers = _handlers+(handler,)
+        if hasattr(handler, 'startStage'):
+            _stage_starters = _stage_starters+(handler,)
+
+def removeHandler(handler: Callable[[dict], None]):
+    '''This method unregisters an event handler, the instrumentation is disabled when no handler is left
+
+    :param Callable handler: handler registered with addHandler
+    '''
+    global _handlers, _stage_starters
+    with _handlers_lock:
+        _handlers = tuple(registered for registered in _handlers if registered is not handler)
+        _stage_starters = tuple(registered for registered in _stage_starters if registered is not handler)
+
+def isEnabled() -> bool:
+    '''This method tells whether any handler is registered
+
+    :returns: enabled
+
+    :rtype: bool
+    '''
+    return bool(_handlers)
+
+@contextmanager
+def instrumented(handler: Callable[[dict], None]):
+    '''This method registers a handler for the duration of a with block
+
+    :param Callable handler: function called with each event (see addHandler)
+    '''
+    addHandler(handler)
+    try:
+        yield handler
+    finally:
+        removeHandler(handler)
+
+def _emit(event: dict):
+    for handler in _handlers:
+        handler(event)
+
+class _NullStage(object):
+    '''
+    Stage returned when the instrumentation is disabled.
+    '''
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+_NULL_STAGE = _NullStage()
+
+class _Stage(object):
+    '''
+    Timed block emitting a stage event on exit.
+    '''
+    def __init__(self, name: str, attributes: dict):
+        self._name = name
+        self._attributes = attributes
+
+    def __enter__(self):
+        self._parent = _current_stage.get()
+        self._token = _current_stage.set(self._name)
+        self._start = time.time_ns()
+        self._starters = _stage_starters
+        for handler in self._starters:
+            handler.startStage({'kind':         'stage',
+                                'name':         self._name,
+                                'value':        None,
+                                'start':        self._start,
+                                'parent':       self._parent,
+                                'attributes':   self._attributes})
+        self._perf_start = time.perf_counter()
+        return self
+
+    def __exit__(self, error_type, error, traceback):
+        duration = time.perf_counter()-self._perf_start
+        _current_stage.reset(self._token)
+        if error_type is not None:
+            self._attributes['error'] = error_type.__name__
+        event = {'kind':          'stage',
+                 'name':          self._name,
+                 'value':         duration,
+                 'start':         self._start,
+                 'parent':        self._parent,
+                 'attributes':    self._attributes}
+        _emit(event)
+        # a started stage is ended even if its handler was removed meanwhile
+        for handler in self._starters:
+            if handler not in _handlers:
+                handler(event)
+        return False
+
+    def set(self, **attributes):
+        '''This method adds attributes to the stage event
+        '''
+        self._attributes.update(attributes)
+
+def stage(name: str, **attributes):
+    '''This method times a block of code
+
+        with extInstrumentation.stage('routing.decode') as decode_stage:
+            ...
+            decode_stage.set(points=n_points)
+
+    :param str name: stage name
+    :param attributes: stage attributes
+
+    :returns: stage context manager, a shared no-op one when the instrumentation is disabled
+    '''
+    if not _handlers:
+        return _NULL_STAGE
+    return _Stage(name, attributes)
+
+def count(name: str, value: float = 1, **attributes):
+    '''This method increments a counter
+
+    :param str name: counter name
+    :param float value: increment
+    :param attributes: counter attributes
+    '''
+    if not _handlers:
+        return
+    _emit({'kind':          'counter',
+           'name':          name,
+           'value':         value,
+           'start':         time.time_ns(),
+           'parent':        _current_stage.get(),
+           'attributes':    attributes})
+
+class extRecorder(object):
+    '''
+    Event handler aggregating the stages (calls, total/mean/max time) and the counters (total).
+    '''
+
+    def __init__(self):
+        """Returns a extRecorder instance.
+        """
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event: dict):
+        key = (event['kind'], event['name'])
+        with self._lock:
+            stats = self._stats.setdefault(key, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += event['value']
+            stats[2] = max(stats[2], event['value'])
+
+    def getStats(self) -> pd.DataFrame:
+        '''This method returns the aggregated events
+
+        :returns: stats_df: kind, name, calls, total (time [s] of a stage, sum of a counter), mean and max, by total
+
+        :rtype: pandas.DataFrame
+        '''
+        with self._lock:
+            rows = [(kind, name, calls, total, total/calls, maximum) for (kind, name), (calls, total, maximum) in self._stats.items()]
+        stats_df = pd.DataFrame(rows, columns=['kind', 'name', 'calls', 'total', 'mean', 'max'])
+        return stats_df.sort_values(['kind', 'total'], ascending=[False, False], ignore_index=True)
+
+    def reset(self):
+        '''This method clears the aggregated events
+        '''
+        with self._lock:
+            self._stats = {}
+
+def getLoggingHandler(logger: logging.Logger = None, level: int = logging.DEBUG) -> Callable[[dict], None]:
+    '''This method returns a handler logging each event
+
+    :param logging.Logger logger: logger (the 'extherepy' logger if None)
+    :param int level: logging level
+
+    :returns: handler
+
+    :rtype: Callable
+    '''
+    logger = logger or logging.getLogger('extherepy')
+
+    def handler(event):
+        if not logger.isEnabledFor(level):
+            return
+        attributes = ' '.join(f'{key}={value}' for key, value in event['attributes'].items())
+        if event['kind'] == 'stage':
+            logger.log(level, f"[STAGE] {event['name']} {event['value']*1000:.3f}ms {attributes}".rstrip())
+        else:
+            logger.log(level, f"[COUNTER] {event['name']} +{event['value']} {attributes}".rstrip())
+    return handler
+
+def _getSpanAttributes(attributes: dict) -> dict:
+    '''This method converts event attributes to OpenTelemetry attribute values
+
+    :param dict attributes: event attributes
+
+    :returns: attributes, the values that are not bool, int, float or str as str
+
+    :rtype: dict
+    '''
+    return {key: value if isinstance(value, (bool, int, float, str)) else str(value) for key, value in attributes.items()}
+
+class _extOpenTelemetryHandler(object):
+    '''
+    Event handler recording the stages as OpenTelemetry spans (the counters as events of the current span).
+    The span of a stage is started with the stage and made current, so the nested stages, counters and 
+    HTTP calls are recorded under it, and the enclosing span of the caller is its parent.
+    '''
+
+    def __init__(self, tracer):
+        """Returns a _extOpenTelemetryHandler instance.
+
+        :param opentelemetry.trace.Tracer tracer: tracer
+        """
+        from opentelemetry import trace, context
+        self._trace = trace
+        self._context = context
+        self._tracer = tracer
+        # (stage name, span, context token) of the open stages of the current thread/task
+        self._open_spans = contextvars.ContextVar('extherepy_open_spans', default=())
+
+    def startStage(self, event: dict):
+        '''This method starts the span of a stage as a child of the current span
+        '''
+        span = self._tracer.start_span(event['name'], start_time=event['start'], attributes=_getSpanAttributes(event['attributes']))
+        token = self._context.attach(self._trace.set_span_in_context(span))
+        self._open_spans.set(self._open_spans.get()+((event['name'], span, token),))
+
+    def __call__(self, event: dict):
+        attributes = _getSpanAttributes(event['attributes'])
+        if event['kind'] != 'stage':
+            attributes['value'] = event['value']
+            self._trace.get_current_span().add_event(event['name'], attributes=attributes, timestamp=event['start'])
+            return
+        open_spans = self._open_spans.get()
+        if not open_spans or open_spans[-1][0] != event['name']:
+            # stage started before the handler was registered
+            span = self._tracer.start_span(event['name'], start_time=event['start'], attributes=attributes)
+            span.end(end_time=event['start']+int(event['value']*1e9))
+            return
+        _, span, token = open_spans[-1]
+        self._open_spans.set(open_spans[:-1])
+        self._context.detach(token)
+        span.set_attributes(attributes)
+        if 'error' in attributes:
+            span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, attributes['error']))
+        span.end(end_time=time.time_ns())     # same clock as the start, nested spans end within their parent
+
+def getOpenTelemetryHandler(tracer) -> Callable[[dict], None]:
+    '''This method returns a handler recording the stages as OpenTelemetry spans (the counters as events of the current span)
+
+    The span of a stage is started with the stage, as a child of the current span.
+
+    :param opentelemetry.trace.Tracer tracer: tracer, e.g. opentelemetry.trace.get_tracer('extherepy')
+
+    :returns: handler
+
+    :rtype: Callable
+    '''
+    return _extOpenTelemetryHandler(tracer)
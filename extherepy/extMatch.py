@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Tuple, Union
+from extherepy import extUtils
+from extherepy import extDistance
+from extherepy.extSpatial import extSpatialIndex
+
+# number of candidate segments of each trace point (closest first)
+MAX_CANDIDATES = 8
+
+class extLocalMatcher(object):
+    '''
+    Offline map matching of GPS traces on the geometry of previous reports (see extRmeApi.getRouteReport).
+
+    The reference routes are previous Route Match reports with return_GPS_trace=True (matched trace points) or
+    routing reports with return_polyline=True, indexed with extSpatialIndex. A trace is matched on the reference
+    route explaining it best, scoring each trace point as in an HMM map matcher (Newson and Krumm): a Gaussian
+    emission probability of its distance to the route and an exponential transition probability of the difference
+    between the GPS step and the along-route step from the previous point.
+    '''
+
+    def __init__(self,
+                 route_profiles: Union[pd.DataFrame, list],
+                 route_key: str = None,
+                 gps_accuracy: float = 5.0,
+                 route_tolerance: float = 20.0,
+                 max_distance: float = 50.0):
+        """Returns a extLocalMatcher instance.
+
+        :param route_profiles: reference route profile dataframe, list of dataframes or one dataframe with a route_key column
+        :param str route_key: route column of a single dataframe
+        :param float gps_accuracy: standard deviation of the GPS position [m] (emission probability)
+        :param float route_tolerance: scale of the difference between GPS and along-route steps [m] (transition probability)
+        :param float max_distance: maximum distance between a trace point and the reference route [m]
+        """
+        if isinstance(route_profiles, pd.DataFrame):
+            route_profiles = [route_profile_df for _, route_profile_df in route_profiles.groupby(route_key, sort=False)] if route_key is not None else [route_profiles]
+        # positional rows: the index of a result is the row of its reference route
+        route_profiles = [route_profile_df.reset_index(drop=True) for route_profile_df in route_profiles if len(route_profile_df)]
+        self._spatial_index = extSpatialIndex(route_profiles)
+        self._offsets = np.cumsum([0]+[len(route_profile_df) for route_profile_df in route_profiles])
+        self._functional_class = np.concatenate([route_profile_df['functionalClass'].values.astype(np.int64) if 'functionalClass' in route_profile_df.columns
+                                                 else np.full(len(route_profile_df), -1) for route_profile_df in route_profiles])
+        self.gps_accuracy = gps_accuracy
+        self.route_tolerance = route_tolerance
+        self.max_distance = max_distance
+
+    def match(self, trace: Dict[str, np.array]) -> Tuple[Dict[str, np.array], float]:
+        '''This method matches a trace on the reference routes
+
+        The reference route with the highest emission probabilities is selected, then the most likely sequence of
+        candidate segments (the MAX_CANDIDATES closest of each trace point) is decoded with the Viterbi algorithm.
+        A trace point farther than max_distance from the route is not matched and restarts the sequence.
+        The confidence of a trace point is the product of its emission and transition probabilities.
+
+        :param dict trace: latitude [deg], longitude [deg], elevation [m] and time (datetime64[ms]) columns (see extGpx.iterGpxBlocks)
+
+        :returns: route_profile: trace point profile columns (as extRmeApi, None if no reference route is close to the trace),
+                  confidence: mean confidence of the trace points (0 to 1)
+
+        :rtype: Tuple[Dict[str, numpy.array], float]
+        '''
+        latitudes = np.asarray(trace['latitude'], dtype=float)
+        longitudes = np.asarray(trace['longitude'], dtype=float)
+        n_points = len(latitudes)
+        candidates_df = self._spatial_index.queryRadius(latitudes, longitudes, self.max_distance, per_route=False)
+        if n_points == 0 or len(candidates_df) == 0:
+            return None, 0.0
+
+        # reference route with the highest emission probabilities (closest segment of each trace point)
+        query = candidates_df['query'].values
+        routes = candidates_df['route'].values.astype(np.int64)
+        _, closest = np.unique(query*len(self._offsets)+routes, return_index=True)
+        emission = np.exp(-0.5*(candidates_df['distance[m]'].values[closest]/self.gps_accuracy)**2)
+        route = np.argmax(np.bincount(routes[closest], weights=emission))
+
+        # candidates of the route (sorted by distance), MAX_CANDIDATES per trace point in a padded matrix
+        candidates_df = candidates_df[routes == route]
+        query = candidates_df['query'].values
+        rank = np.arange(len(query))-np.searchsorted(query, query)
+        kept = rank < MAX_CANDIDATES
+        query, rank, candidates_df = query[kept], rank[kept], candidates_df[kept]
+
+        def matrix(key, fill):
+            values = np.full((n_points, MAX_CANDIDATES), fill, dtype=float)
+            values[query, rank] = candidates_df[key].values
+            return values
+        log_emission = -0.5*(matrix('distance[m]', np.inf)/self.gps_accuracy)**2
+        distance_i = matrix('distance_i[m]', np.nan)
+        matched = np.isfinite(log_emission[:, 0])
+
+        # Viterbi: transition log probability of the difference between the GPS step and the along-route step
+        gps_steps = extDistance.getSegmentLengths(latitudes, longitudes, method='equirectangular')
+        scores = log_emission.copy()
+        backtrack = np.zeros((n_points, MAX_CANDIDATES), dtype=np.int64)
+        log_transition = np.zeros((n_points, MAX_CANDIDATES))
+        columns = np.arange(MAX_CANDIDATES)
+        for point in np.flatnonzero(matched[1:] & matched[:-1])+1:
+            transition = -np.abs(gps_steps[point-1]-(distance_i[point][None, :]-distance_i[point-1][:, None]))/self.route_tolerance
+            total = np.nan_to_num(scores[point-1][:, None]+transition, nan=-np.inf)
+            backtrack[point] = np.argmax(total, axis=0)
+            log_transition[point] = transition[backtrack[point], columns]
+            scores[point] = total[backtrack[point], columns]+log_emission[point]
+
+        # most likely candidates, backtracked from the end of each matched run
+        candidate = np.zeros(n_points, dtype=np.int64)
+        for point in range(n_points-1, -1, -1):
+            if point == n_points-1 or not matched[point+1]:
+                candidate[point] = np.argmax(scores[point])
+            else:
+                candidate[point] = backtrack[point+1][candidate[point+1]]
+        confidence_value = np.where(matched, np.exp(log_emission[np.arange(n_points), candidate]+log_transition[np.arange(n_points), candidate]), 0.0)
+        selected = np.full(n_points, -1, dtype=np.int64)
+        selected[query[rank == candidate[query]]] = np.flatnonzero(rank == candidate[query])
+        selected_df = candidates_df.iloc[selected[matched]]
+
+        def column(key, fill):
+            values = np.full(n_points, fill, dtype=float)
+            values[matched] = selected_df[key].values
+            return values
+
+        # spans numbered along the trace, a new span at each change of the reference span
+        reference_spans = column('span', np.nan)
+        span = np.cumsum(np.r_[False, (reference_spans[1:] != reference_spans[:-1]) & ~np.isnan(reference_spans[1:])])
+        span_confidence = np.bincount(span, weights=confidence_value)/np.bincount(span)
+
+        # GPS speed of the step reaching each trace point
+        timestamps = np.asarray(trace['time']).astype('datetime64[ms]')
+        delta_time = np.diff(timestamps.astype(np.int64))/1000
+        speed = np.divide(gps_steps, delta_time, out=np.zeros(len(delta_time)), where=delta_time > 0)
+        speed = np.r_[speed[:1], speed] if len(speed) else np.zeros(n_points)
+
+        route_profile = {'span': span,
+                         'routelink': span,
+                         'tracepoint': np.arange(n_points),
+                         'timestamp': extUtils.getUtcTimestamps(timestamps),
+                         'GPS_latitude[deg]': latitudes,
+                         'GPS_longitude[deg]': longitudes,
+                         'latitude[deg]': np.where(matched, column('latitude[deg]', np.nan), latitudes),       # GPS coordinates away from the route
+                         'longitude[deg]': np.where(matched, column('longitude[deg]', np.nan), longitudes),
+                         'GPS_altitude[m]': np.asarray(trace['elevation'], dtype=float),
+                         'confidenceValue[-]': confidence_value,
+                         'confidence[-]': span_confidence[span],
+                         'functionalClass': np.where(matched, self._functional_class[self._offsets[route]+np.maximum(column('index', 0).astype(np.int64), 0)], -1),
+                         'GPS_vehicleSpeed[km/h]': extUtils.mps2kmph(np.round(speed, 1))}
+        return route_profile, float(confidence_value.mean())
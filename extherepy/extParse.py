@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+
+import json
+import numpy as np
+from typing import Union
+
+# optional fast JSON parser, parsing the response bytes without decoding them to str first
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# flexpolyline alphabet (URL safe base64), value of the characters '-' (45) to 'z' (122)
+_FLEXPOLYLINE_VALUES = [62, -1, -1, 52, 53, 54, 55, 56, 57, 58, 59, 60, 61, -1, -1, -1, -1, -1, -1, -1,
+                        0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21,
+                        22, 23, 24, 25, -1, -1, -1, -1, 63, -1, 26, 27, 28, 29, 30, 31, 32, 33, 34, 35,
+                        36, 37, 38, 39, 40, 41, 42, 43, 44, 45, 46, 47, 48, 49, 50, 51]
+_DECODING_TABLE = np.full(256, -1, dtype=np.int64)
+_DECODING_TABLE[45:45+len(_FLEXPOLYLINE_VALUES)] = _FLEXPOLYLINE_VALUES
+FLEXPOLYLINE_VERSION = 1
+
+def loads(content: Union[bytes, str]):
+    '''This method parses a JSON document (orjson if installed, json otherwise)
+
+    :param content: JSON document, bytes are parsed without being decoded first
+
+    :returns: document
+
+    :rtype: dict
+    '''
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+def decodePolyline(polyline: str) -> np.array:
+    '''This method decodes a flexible polyline in one vectorized pass (same values as flexpolyline.decode)
+
+    The characters are mapped to their 6 bit values, grouped in variable length unsigned integers
+    (the 0x20 bit flags a continuation), zigzag decoded and accumulated per dimension.
+
+    :param str polyline: flexible polyline
+
+    :returns: coordinates: latitude, longitude and (if encoded) third dimension of each point, contiguous float64
+
+    :rtype: numpy.array
+    '''
+    values = _DECODING_TABLE[np.frombuffer(polyline.encode('ascii'), dtype=np.uint8)]
+    last = (values & 0x20) == 0
+    if len(values) == 0 or (values < 0).any() or not last[-1]:
+        raise ValueError("[ERROR] Invalid flexible polyline encoding")
+
+    # unsigned integers: each character contributes 5 bits shifted by its position in the integer
+    starts = np.flatnonzero(np.r_[True, last[:-1]])
+    integer = np.cumsum(last)-last
+    shift = 5*(np.arange(len(values))-starts[integer])
+    if shift.max() > 60:
+        raise ValueError("[ERROR] Invalid flexible polyline encoding")
+    unsigned = np.add.reduceat((values & 0x1F).astype(np.uint64) << shift.astype(np.uint64), starts)
+
+    # header: version, then precision (4 bits), third dimension (3 bits) and its precision (4 bits)
+    if len(unsigned) < 2 or unsigned[0] != FLEXPOLYLINE_VERSION:
+        raise ValueError("[ERROR] Invalid flexible polyline format version")
+    header = int(unsigned[1])
+    precision = header & 15
+    third_dim = (header >> 4) & 7
+    third_dim_precision = (header >> 7) & 15
+    dims = 3 if third_dim else 2
+
+    deltas = unsigned[2:]
+    if len(deltas) % dims:
+        raise ValueError("[ERROR] Invalid flexible polyline encoding, premature ending reached")
+    signed = (deltas >> np.uint64(1)).astype(np.int64) ^ -(deltas & np.uint64(1)).astype(np.int64)
+    coordinates = np.cumsum(signed.reshape(-1, dims), axis=0)
+    factors = np.array([10.0**precision, 10.0**precision, 10.0**third_dim_precision][:dims])
+    return coordinates/factors
@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+
+import os
+import re
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED, ALL_COMPLETED
+from typing import Dict, Iterable, List, Tuple, Union
+
+# maximum number of x ticks of a segment chart, the ticks are thinned to every n-th segment start above it
+MAX_TICKS = 60
+# maximum number of segments drawn with edges (above it the edges would cover the bars)
+MAX_EDGED_SEGMENTS = 500
+# x axis of the segment charts: start column, width column, scale and label
+SEGMENT_AXES = {'time':     ('time_i[s]', 'delta_time[s]', 1, 'Time [s]'),
+                'distance': ('distance_i[m]', 'delta_distance[m]', 1e-3, 'Distance [km]')}
+FILE_FORMATS = ['png', 'svg']
+
+def getSegmentTicks(starts: np.array, max_ticks: int = MAX_TICKS) -> np.array:
+    '''This method thins the segment starts to at most max_ticks ticks (every n-th segment start)
+
+    :param numpy.array starts: segment starts
+    :param int max_ticks: maximum number of ticks
+
+    :returns: ticks
+
+    :rtype: numpy.array
+    '''
+    step = max(1, int(np.ceil(len(starts)/max_ticks)))
+    return np.asarray(starts)[::step]
+
+def drawSegments(ax,
+                 starts: np.array,
+                 widths: np.array,
+                 heights: np.array,
+                 xlabel: str,
+                 ylabel: str,
+                 max_ticks: int = MAX_TICKS):
+    '''This method draws the segments of a route profile as one collection of bars on matplotlib axes
+
+    :param matplotlib.axes.Axes ax: axes
+    :param numpy.array starts: start of each segment
+    :param numpy.array widths: width of each segment
+    :param numpy.array heights: value of each segment
+    :param str xlabel: x label
+    :param str ylabel: y label
+    :param int max_ticks: maximum number of x ticks (segment starts)
+
+    :returns: ax
+
+    :rtype: matplotlib.axes.Axes
+    '''
+    from matplotlib.collections import PolyCollection
+
+    starts = np.asarray(starts, dtype=float)
+    ends = starts+np.asarray(widths, dtype=float)
+    heights = np.asarray(heights, dtype=float)
+    drawn = ~np.isnan(heights)
+    zeros = np.zeros(drawn.sum())
+    vertices = np.stack([np.column_stack([starts[drawn], zeros]),
+                         np.column_stack([starts[drawn], heights[drawn]]),
+                         np.column_stack([ends[drawn], heights[drawn]]),
+                         np.column_stack([ends[drawn], zeros])], axis=1)
+    ax.add_collection(PolyCollection(vertices,
+                                     facecolors='C0',
+                                     edgecolors='black',
+                                     linewidths=0.5 if len(vertices) <= MAX_EDGED_SEGMENTS else 0))
+    ax.autoscale_view()
+    ax.set_xticks(getSegmentTicks(starts, max_ticks))
+    ax.tick_params(axis='x', labelrotation=90)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    return ax
+
+def getSegmentColumns(route_profile_df: pd.DataFrame, channel: str, x_axis: str = 'time') -> Dict[str, np.array]:
+    '''This method returns the columns of a segment chart (only the arrays to draw)
+
+    :param pandas.DataFrame route_profile_df: route profile dataframe
+    :param str channel: channel to plot
+    :param str x_axis: 'time' or 'distance'
+
+    :returns: columns: starts, widths, heights, xlabel and ylabel (see drawSegments)
+
+    :rtype: dict
+    '''
+    if x_axis not in SEGMENT_AXES:
+        raise ValueError(f"[ERROR] x_axis must be one of {list(SEGMENT_AXES)}")
+    start_channel, width_channel, scale, xlabel = SEGMENT_AXES[x_axis]
+    return {'starts':   route_profile_df[start_channel].values*scale,
+            'widths':   route_profile_df[width_channel].values*scale,
+            'heights':  route_profile_df[channel].values,
+            'xlabel':   xlabel,
+            'ylabel':   channel}
+
+def getSegmentsFigure(route_profile_df: pd.DataFrame,
+                      channel: str,
+                      x_axis: str = 'time',
+                      figsize: Tuple[float, float] = (30, 5),
+                      max_ticks: int = MAX_TICKS):
+    '''This method plots a route channel vs time or distance on a new figure, without the pyplot state
+
+    The figure is not registered in pyplot: it is released with its last reference and can be built in any thread.
+
+    :param pandas.DataFrame route_profile_df: route profile dataframe
+    :param str channel: channel to plot
+    :param str x_axis: 'time' or 'distance'
+    :param Tuple(float) figsize: figure size [in]
+    :param int max_ticks: maximum number of x ticks (segment starts)
+
+    :returns: figure
+
+    :rtype: matplotlib.figure.Figure
+    '''
+    return _getSegmentsFigure(getSegmentColumns(route_profile_df, channel, x_axis), figsize, max_ticks)
+
+def _getSegmentsFigure(columns: Dict[str, np.array], figsize: Tuple[float, float], max_ticks: int):
+    '''This method draws segment chart columns (see getSegmentColumns) on a new figure
+    '''
+    from matplotlib.figure import Figure
+    figure = Figure(figsize=figsize)
+    drawSegments(figure.add_subplot(), max_ticks=max_ticks, **columns)
+    figure.tight_layout()
+    return figure
+
+def _renderSegments(columns: Dict[str, np.array],
+                    output_file: str,
+                    figsize: Tuple[float, float],
+                    dpi: int,
+                    max_ticks: int) -> str:
+    '''This method renders segment chart columns to a file (process pool task)
+    '''
+    _getSegmentsFigure(columns, figsize, max_ticks).savefig(output_file, dpi=dpi)
+    return output_file
+
+def getChartFileName(report: str, channel: str, x_axis: str, file_format: str) -> str:
+    '''This method returns the file name of a chart
+
+    :param str report: report name
+    :param str channel: channel
+    :param str x_axis: 'time' or 'distance'
+    :param str file_format: 'png' or 'svg'
+
+    :returns: file_name: <report>_<channel>_vs_<x_axis>.<file_format>, with the channel units made file safe
+
+    :rtype: str
+    '''
+    return f"{report}_{re.sub(r'[^0-9A-Za-z.-]+', '_', channel).strip('_')}_vs_{x_axis}.{file_format}"
+
+def renderReports(route_profiles: Union[Dict[str, pd.DataFrame], Iterable[Tuple[str, pd.DataFrame]]],
+                  output_dir: str,
+                  channels: List[str],
+                  x_axis: str = 'distance',
+                  file_format: str = 'png',
+                  processes: int = None,
+                  figsize: Tuple[float, float] = (30, 5),
+                  dpi: int = 100,
+                  max_ticks: int = MAX_TICKS) -> pd.DataFrame:
+    '''This method renders the segment charts of many route profiles to files in a process pool
+
+    The route profiles are consumed lazily and only the arrays of a chart are sent to the pool, at most
+    2 charts per process being in flight: an iterator of reports is rendered with bounded memory.
+
+    :param route_profiles: dict or iterable of (report name, route profile dataframe)
+    :param str output_dir: output directory (created if missing)
+    :param List[str] channels: channels to plot, one chart per report and channel
+    :param str x_axis: 'time' or 'distance'
+    :param str file_format: 'png' or 'svg'
+    :param int processes: number of rendering processes (None for the number of CPUs, 0 to render in the calling thread)
+    :param Tuple(float) figsize: figure size [in]
+    :param int dpi: resolution of the png files
+    :param int max_ticks: maximum number of x ticks (segment starts)
+
+    :returns: charts_df: report, channel, file and error (None if rendered) of each chart, in completion order
+
+    :rtype: pandas.DataFrame
+    '''
+    if file_format not in FILE_FORMATS:
+        raise ValueError(f"[ERROR] file_format must be one of {FILE_FORMATS}")
+    if x_axis not in SEGMENT_AXES:
+        raise ValueError(f"[ERROR] x_axis must be one of {list(SEGMENT_AXES)}")
+    if isinstance(route_profiles, dict):
+        route_profiles = route_profiles.items()
+    os.makedirs(output_dir, exist_ok=True)
+
+    charts = []
+    max_in_flight = 2*((os.cpu_count() or 1) if processes is None else max(processes, 1))
+    with (ProcessPoolExecutor(processes) if processes != 0 else ThreadPoolExecutor(1)) as executor:
+        pending = {}
+        def collect(return_when):
+            done, _ = wait(pending, return_when=return_when)
+            for future in done:
+                report, channel, output_file = pending.pop(future)
+                charts.append({'report': report, 'channel': channel, 'file': output_file, 'error': future.exception()})
+
+        for report, route_profile_df in route_profiles:
+            for channel in channels:
+                output_file = os.path.join(output_dir, getChartFileName(report, channel, x_axis, file_format))
+                try:
+                    columns = getSegmentColumns(route_profile_df, channel, x_axis)
+                except Exception as error:
+                    charts.append({'report': report, 'channel': channel, 'file': output_file, 'error': error})
+                    continue
+                if len(pending) >= max_in_flight:
+                    collect(FIRST_COMPLETED)
+                future = executor.submit(_renderSegments, columns, output_file, figsize, dpi, max_ticks)
+                pending[future] = (report, channel, output_file)
+        if pending:
+            collect(ALL_COMPLETED)
+    return pd.DataFrame(charts, columns=['report', 'channel', 'file', 'error'])
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+
+import heapq
+import numpy as np
+
+SIMPLIFY_METHODS = ['douglas-peucker', 'visvalingam']
+EARTH_RADIUS = 6371008.8            # mean earth radius [m]
+
+def project(latitudes: np.array, longitudes: np.array) -> tuple:
+    '''This method projects geographic coordinates on a local equirectangular plane
+
+    :param numpy.array latitudes: latitude of the points [deg]
+    :param numpy.array longitudes: longitude of the points [deg]
+
+    :returns: x, y: projected coordinates [m]
+
+    :rtype: Tuple[numpy.array, numpy.array]
+    '''
+    latitudes = np.radians(np.asarray(latitudes, dtype=float))
+    longitudes = np.radians(np.asarray(longitudes, dtype=float))
+    latitude_0 = np.mean(latitudes) if len(latitudes) else 0
+    return EARTH_RADIUS*longitudes*np.cos(latitude_0), EARTH_RADIUS*latitudes
+
+def _getDouglasPeuckerImportance(x: np.array, y: np.array, min_importance: float = 0) -> np.array:
+    '''This method computes the Douglas-Peucker importance of the points, i.e. their distance from the
+    simplified polyline at the moment they are added
+
+    :param numpy.array x: projected x [m]
+    :param numpy.array y: projected y [m]
+    :param float min_importance: the ranges below this importance are not refined (their points get 0) [m]
+
+    :returns: importance [m]
+
+    :rtype: numpy.array
+    '''
+    n_points = len(x)
+    importance = np.zeros(n_points)
+    importance[[0, -1]] = np.inf
+    stack = [(0, n_points-1, np.inf)]
+    while stack:
+        start, end, bound = stack.pop()
+        if end-start < 2 or bound <= min_importance:
+            continue
+        dx, dy = x[end]-x[start], y[end]-y[start]
+        px, py = x[start+1:end]-x[start], y[start+1:end]-y[start]
+        length2 = dx*dx+dy*dy
+        if length2 > 0:
+            # distance from the segment
+            t = np.clip((px*dx+py*dy)/length2, 0, 1)
+            distances = np.hypot(px-t*dx, py-t*dy)
+        else:
+            distances = np.hypot(px, py)
+        split = int(np.argmax(distances))
+        # bounded by the parent so that thresholding matches the recursive algorithm
+        importance[start+1+split] = min(distances[split], bound)
+        stack.append((start, start+1+split, importance[start+1+split]))
+        stack.append((start+1+split, end, importance[start+1+split]))
+    return importance
+
+def _getVisvalingamImportance(x: np.array, y: np.array) -> np.array:
+    '''This method computes the Visvalingam-Whyatt importance of the points, i.e. their effective area when removed
+
+    :param numpy.array x: projected x [m]
+    :param numpy.array y: projected y [m]
+
+    :returns: importance [m2]
+
+    :rtype: numpy.array
+    '''
+    n_points = len(x)
+    importance = np.full(n_points, np.inf)
+    if n_points < 3:
+        return importance
+
+    def area(previous, point, following):
+        return abs((x[previous]-x[point])*(y[following]-y[point])-(x[following]-x[point])*(y[previous]-y[point]))/2
+
+    previous = np.arange(-1, n_points-1)
+    following = np.arange(1, n_points+1)
+    areas = np.zeros(n_points)
+    x_0, y_0, x_1, y_1, x_2, y_2 = x[:-2], y[:-2], x[1:-1], y[1:-1], x[2:], y[2:]
+    areas[1:-1] = np.abs((x_0-x_1)*(y_2-y_1)-(x_2-x_1)*(y_0-y_1))/2
+    heap = [(areas[point], point) for point in range(1, n_points-1)]
+    heapq.heapify(heap)
+    removed = np.zeros(n_points, dtype=bool)
+    max_area = 0
+    while heap:
+        point_area, point = heapq.heappop(heap)
+        if removed[point] or point_area != areas[point]:
+            continue    # stale entry
+        removed[point] = True
+        max_area = max(max_area, point_area)    # effective area is monotone
+        importance[point] = max_area
+        before, after = previous[point], following[point]
+        following[before], previous[after] = after, before
+        for neighbour in (before, after):
+            if 0 < neighbour < n_points-1:
+                areas[neighbour] = area(previous[neighbour], neighbour, following[neighbour])
+                heapq.heappush(heap, (areas[neighbour], neighbour))
+    return importance
+
+def getImportance(latitudes: np.array,
+                  longitudes: np.array,
+                  method: str = 'douglas-peucker',
+                  min_importance: float = 0) -> np.array:
+    '''This method computes the importance of the points of a polyline, simplifying with a tolerance keeps 
+    the points whose importance exceeds it
+
+    :param numpy.array latitudes: latitude of the points [deg]
+    :param numpy.array longitudes: longitude of the points [deg]
+    :param str method: 'douglas-peucker' (importance [m]) or 'visvalingam' (importance [m2])
+    :param float min_importance: 'douglas-peucker' only, importances below it are not resolved (faster)
+
+    :returns: importance, infinite for the end points
+
+    :rtype: numpy.array
+    '''
+    if method not in SIMPLIFY_METHODS:
+        raise ValueError(f"[ERROR] simplification method must be one of {SIMPLIFY_METHODS}")
+    x, y = project(latitudes, longitudes)
+    if len(x) < 3:
+        return np.full(len(x), np.inf)
+    if method == 'douglas-peucker':
+        return _getDouglasPeuckerImportance(x, y, min_importance)
+    return _getVisvalingamImportance(x, y)
+
+def simplifyPolyline(latitudes: np.array,
+                     longitudes: np.array,
+                     tolerance: float = None,
+                     target_points: int = None,
+                     method: str = 'douglas-peucker',
+                     keep: np.array = None) -> np.array:
+    '''This method simplifies a polyline returning the mask of the points to keep
+
+    :param numpy.array latitudes: latitude of the points [deg]
+    :param numpy.array longitudes: longitude of the points [deg]
+    :param float tolerance: 'douglas-peucker' maximum distance [m] / 'visvalingam' minimum effective area [m2]
+    :param int target_points: number of points to keep (used if tolerance is None)
+    :param str method: 'douglas-peucker' or 'visvalingam'
+    :param numpy.array keep: mask of the points that must be kept (e.g. color transitions)
+
+    :returns: mask of the kept points
+
+    :rtype: numpy.array
+    '''
+    if tolerance is None and target_points is None:
+        raise ValueError("[ERROR] Please provide tolerance or target_points")
+
+    importance = getImportance(latitudes, longitudes, method, min_importance=tolerance or 0)
+    if keep is not None:
+        importance[np.asarray(keep, dtype=bool)] = np.inf
+
+    if tolerance is not None:
+        return importance > tolerance
+    mask = np.zeros(len(importance), dtype=bool)
+    mask[np.argsort(-importance, kind='stable')[:max(target_points, 2)]] = True
+    mask |= np.isinf(importance)     # forced points are always kept
+    return mask
@@ -0,0 +1,306 @@
+#!/usr/bin/env python
+
+import numpy as np
+import pandas as pd
+from typing import Callable, Tuple, Union
+from extherepy.extDistance import EARTH_RADIUS, getDistances
+
+# number of children of each node of the bounding box hierarchy
+NODE_SIZE = 8
+# number of queries descending the hierarchy together (bounds the memory of the candidate pairs)
+QUERY_CHUNK = 4096
+
+class extSpatialIndex(object):
+    '''
+    Spatial index over route profiles (see getRouteReport) answering batched nearest segment, radius and bounding box queries.
+
+    The segments joining consecutive rows of each route are projected on a plane (equirectangular projection centred
+    on the indexed routes) and grouped in a packed bounding box hierarchy: each node bounds NODE_SIZE consecutive
+    nodes of the level below, so the nodes follow the routes. The queries descend the hierarchy together, pruning
+    the nodes farther than the current bound. The projection only prunes the candidates: the bounds are padded
+    with the scale distortion of the projection over the latitudes of the routes and queries, and the distances
+    of the candidate segments are refined on the sphere (haversine), so the routes may be far apart.
+    The results give, for each query, the route, the row and span of the segment start, the along-route
+    distance_i[m] and the coordinates of the closest point of the segment.
+    '''
+
+    def __init__(self,
+                 route_profiles: Union[pd.DataFrame, list],
+                 route_key: str = None,
+                 latitude_channel: str = 'latitude[deg]',
+                 longitude_channel: str = 'longitude[deg]'):
+        """Returns a extSpatialIndex instance.
+
+        :param route_profiles: route profile dataframe, list of route profile dataframes or one dataframe with a route_key column
+        :param str route_key: route column of a single dataframe (e.g. 'itinerary' of getRouteReportBatch)
+        :param str latitude_channel: latitude column
+        :param str longitude_channel: longitude column
+        """
+        if isinstance(route_profiles, pd.DataFrame):
+            route_profiles = list(route_profiles.groupby(route_key, sort=False)) if route_key is not None else [(0, route_profiles)]
+        else:
+            route_profiles = list(enumerate(route_profiles))
+        route_profiles = [(route, route_profile_df) for route, route_profile_df in route_profiles if len(route_profile_df)]
+        if not route_profiles:
+            raise ValueError("[ERROR] Please provide at least one non empty route profile")
+        for _, route_profile_df in route_profiles:
+            missing = [column for column in [latitude_channel, longitude_channel, 'span', 'distance_i[m]'] if column not in route_profile_df.columns]
+            if missing:
+                raise ValueError(f"[ERROR] route profiles miss the columns {missing}")
+
+        # rows of all the routes
+        self._routes = np.array([route for route, _ in route_profiles], dtype=object)
+        lengths = np.array([len(route_profile_df) for _, route_profile_df in route_profiles])
+        latitudes = np.radians(np.concatenate([route_profile_df[latitude_channel].values for _, route_profile_df in route_profiles]).astype(float))
+        longitudes = np.radians(np.concatenate([route_profile_df[longitude_channel].values for _, route_profile_df in route_profiles]).astype(float))
+        self._index = np.concatenate([route_profile_df.index.values for _, route_profile_df in route_profiles])
+        self._span = np.concatenate([route_profile_df['span'].values for _, route_profile_df in route_profiles])
+        self._distance_i = np.concatenate([route_profile_df['distance_i[m]'].values for _, route_profile_df in route_profiles]).astype(float)
+        self._latitudes, self._longitudes = latitudes, longitudes
+
+        # equirectangular projection [m]
+        self._latitude0 = latitudes.mean()
+        self._longitude0 = longitudes.mean()
+        self._x, self._y = self._project(latitudes, longitudes)
+
+        # segments joining consecutive rows of a route (a degenerate segment for a single row route)
+        self._row_route = np.repeat(np.arange(len(lengths)), lengths)
+        n_segments = np.where(lengths > 1, lengths-1, lengths)
+        self._segment_route = np.repeat(np.arange(len(lengths)), n_segments)
+        self._segment_start = np.repeat(np.cumsum(lengths)-lengths, n_segments)+np.arange(n_segments.sum())-np.repeat(np.cumsum(n_segments)-n_segments, n_segments)
+        self._segment_end = self._segment_start+(lengths[self._segment_route] > 1)
+
+        # hierarchy levels: x_min, y_min, x_max, y_max of the nodes, from the segments up to at most NODE_SIZE roots
+        x0, y0 = self._x[self._segment_start], self._y[self._segment_start]
+        x1, y1 = self._x[self._segment_end], self._y[self._segment_end]
+        self._levels = [(np.minimum(x0, x1), np.minimum(y0, y1), np.maximum(x0, x1), np.maximum(y0, y1))]
+        while len(self._levels[-1][0]) > NODE_SIZE:
+            x_min, y_min, x_max, y_max = self._levels[-1]
+            groups = np.arange(0, len(x_min), NODE_SIZE)
+            self._levels.append((np.minimum.reduceat(x_min, groups), np.minimum.reduceat(y_min, groups),
+                                 np.maximum.reduceat(x_max, groups), np.maximum.reduceat(y_max, groups)))
+
+    def __len__(self) -> int:
+        return len(self._segment_start)
+
+    def _project(self, latitudes: np.array, longitudes: np.array) -> Tuple[np.array, np.array]:
+        '''This method projects geographic coordinates [rad] on the plane of the index [m]
+        '''
+        return EARTH_RADIUS*(longitudes-self._longitude0)*np.cos(self._latitude0), EARTH_RADIUS*(latitudes-self._latitude0)
+
+    def _getScales(self, latitudes: np.array) -> Tuple[float, float]:
+        '''This method bounds the scale of the projected distances over the latitudes of the routes and of the queries
+
+        The projection keeps the north-south distances and scales the east-west ones by cos(latitude0)/cos(latitude).
+
+        :param numpy.array latitudes: latitude of the query points [rad]
+
+        :returns: scale_min, scale_max: projected distance / distance on the sphere bounds
+
+        :rtype: Tuple[float, float]
+        '''
+        absolute_latitudes = np.abs(np.r_[self._latitudes, latitudes])
+        crosses_equator = np.r_[self._latitudes, latitudes].min() < 0 < np.r_[self._latitudes, latitudes].max()
+        cos_min = max(np.cos(absolute_latitudes.max()), 1e-9)
+        cos_max = 1.0 if crosses_equator else np.cos(absolute_latitudes.min())
+        cos_latitude0 = np.cos(self._latitude0)
+        return min(1.0, cos_latitude0/cos_max), max(1.0, cos_latitude0/cos_min)
+
+    def _projectDegrees(self, latitudes, longitudes) -> Tuple[np.array, np.array]:
+        '''This method projects geographic coordinates [deg] on the plane of the index [m]
+        '''
+        return self._project(*self._toRadians(latitudes, longitudes))
+
+    def _toRadians(self, latitudes, longitudes) -> Tuple[np.array, np.array]:
+        '''This method converts geographic coordinates [deg] to arrays [rad]
+        '''
+        return np.radians(np.atleast_1d(np.asarray(latitudes, dtype=float))), np.radians(np.atleast_1d(np.asarray(longitudes, dtype=float)))
+
+    def _traverse(self, queries: np.array, keep: Callable) -> Tuple[np.array, np.array]:
+        '''This method descends the hierarchy with a batch of queries
+
+        :param numpy.array queries: queries
+        :param keep: keep(level, query, node) returning the mask of the (query, node) pairs to descend
+
+        :returns: query, segment of the pairs kept at the segment level
+
+        :rtype: Tuple[numpy.array, numpy.array]
+        '''
+        n_roots = len(self._levels[-1][0])
+        query, node = np.repeat(queries, n_roots), np.tile(np.arange(n_roots), len(queries))
+        for level in range(len(self._levels)-1, -1, -1):
+            kept = keep(level, query, node)
+            query, node = query[kept], node[kept]
+            if level:
+                query = np.repeat(query, NODE_SIZE)
+                node = (node[:, None]*NODE_SIZE+np.arange(NODE_SIZE)).ravel()
+                valid = node < len(self._levels[level-1][0])
+                query, node = query[valid], node[valid]
+        return query, node
+
+    def _getBoxDistance(self, x: np.array, y: np.array, level: int, node: np.array) -> np.array:
+        '''This method computes the distance between points and node bounding boxes (0 inside the box)
+        '''
+        x_min, y_min, x_max, y_max = self._levels[level]
+        return np.hypot(np.maximum(np.maximum(x_min[node]-x, x-x_max[node]), 0),
+                        np.maximum(np.maximum(y_min[node]-y, y-y_max[node]), 0))
+
+    def _getSegmentDistance(self, latitudes: np.array, longitudes: np.array, segment: np.array) -> Tuple[np.array, np.array]:
+        '''This method computes the distance on the sphere between points and segments
+
+        The closest point of the segment is found on a plane tangent at the point, its distance is the haversine distance.
+
+        :param numpy.array latitudes: latitude of each point [rad]
+        :param numpy.array longitudes: longitude of each point [rad]
+        :param numpy.array segment: segment of each point
+
+        :returns: distance [m], position of the closest point along the segment (0 start, 1 end)
+
+        :rtype: Tuple[numpy.array, numpy.array]
+        '''
+        start, end = self._segment_start[segment], self._segment_end[segment]
+        cos_latitudes = np.cos(latitudes)
+        x0, y0 = (self._longitudes[start]-longitudes)*cos_latitudes, self._latitudes[start]-latitudes
+        dx, dy = (self._longitudes[end]-self._longitudes[start])*cos_latitudes, self._latitudes[end]-self._latitudes[start]
+        squared_length = dx*dx+dy*dy
+        fraction = np.clip(np.divide(-x0*dx-y0*dy, squared_length, out=np.zeros(len(segment)), where=squared_length > 0), 0, 1)
+        closest_latitudes, closest_longitudes = self._interpolate(segment, fraction)
+        return getDistances(np.degrees(latitudes), np.degrees(longitudes), closest_latitudes, closest_longitudes, method='haversine'), fraction
+
+    def _interpolate(self, segment: np.array, fraction: np.array) -> Tuple[np.array, np.array]:
+        '''This method returns the geographic coordinates [deg] of the points at a fraction of segments
+        '''
+        start, end = self._segment_start[segment], self._segment_end[segment]
+        return (np.degrees(self._latitudes[start]+fraction*(self._latitudes[end]-self._latitudes[start])),
+                np.degrees(self._longitudes[start]+fraction*(self._longitudes[end]-self._longitudes[start])))
+
+    def _getResults(self, query: np.array, segment: np.array, distance: np.array, fraction: np.array) -> pd.DataFrame:
+        '''This method builds the results of (query, segment) pairs
+        '''
+        start, end = self._segment_start[segment], self._segment_end[segment]
+        latitudes, longitudes = self._interpolate(segment, fraction)
+        return pd.DataFrame({'query':           query,
+                             'route':           self._routes[self._segment_route[segment]],
+                             'index':           self._index[start],
+                             'span':            self._span[start],
+                             'distance_i[m]':   self._distance_i[start]+fraction*(self._distance_i[end]-self._distance_i[start]),
+                             'distance[m]':     distance,
+                             'latitude[deg]':   latitudes,
+                             'longitude[deg]':  longitudes})
+
+    def queryNearest(self, latitudes, longitudes, max_distance: float = None) -> pd.DataFrame:
+        '''This method finds the closest route segment of each query point
+
+        The distance to the first vertex of each visited node bounds the distance of the closest segment,
+        the nodes whose bounding box is farther than this bound (padded with the projection scale) are pruned.
+
+        :param latitudes: latitude of each query point [deg]
+        :param longitudes: longitude of each query point [deg]
+        :param float max_distance: maximum distance [m] (None for no limit), the farther queries are not returned
+
+        :returns: nearest_df: query (position of the query point), route, index (row of the segment start), span,
+                  distance_i[m] (along-route distance of the closest point), distance[m] (from the query point) and
+                  latitude[deg]/longitude[deg] of the closest point
+
+        :rtype: pandas.DataFrame
+        '''
+        latitudes, longitudes = self._toRadians(latitudes, longitudes)
+        x, y = self._project(latitudes, longitudes)
+        scale_min, scale_max = self._getScales(latitudes)
+        # a projected distance d is at most d/scale_min on the sphere, whose segments are at most scale_max*d/scale_min away on the plane
+        padding = scale_max/scale_min
+        max_distance = np.inf if max_distance is None else max_distance
+        bound = np.full(len(x), np.inf)
+        best_distance = np.full(len(x), np.inf)
+        best_segment = np.zeros(len(x), dtype=np.int64)
+        best_fraction = np.zeros(len(x))
+
+        def keep(level, query, node):
+            # the first vertex of a node is a point of a route: its distance bounds the closest segment distance
+            row = self._segment_start[node*NODE_SIZE**level]
+            np.minimum.at(bound, query, np.hypot(x[query]-self._x[row], y[query]-self._y[row]))
+            box_distance = self._getBoxDistance(x[query], y[query], level, node)
+            return (box_distance <= bound[query]*padding) & (box_distance <= max_distance*scale_max)
+
+        for chunk_start in range(0, len(x), QUERY_CHUNK):
+            query, segment = self._traverse(np.arange(chunk_start, min(chunk_start+QUERY_CHUNK, len(x))), keep)
+            distance, fraction = self._getSegmentDistance(latitudes[query], longitudes[query], segment)
+            order = np.lexsort((distance, query))
+            first = order[np.r_[True, query[order][1:] != query[order][:-1]]] if len(order) else order
+            best_distance[query[first]] = distance[first]
+            best_segment[query[first]] = segment[first]
+            best_fraction[query[first]] = fraction[first]
+
+        found = np.flatnonzero(best_distance <= max_distance)
+        return self._getResults(found, best_segment[found], best_distance[found], best_fraction[found])
+
+    def queryRadius(self, latitudes, longitudes, radius: float, per_route: bool = True) -> pd.DataFrame:
+        '''This method finds the route segments within a radius of each query point
+
+        :param latitudes: latitude of each query point [deg]
+        :param longitudes: longitude of each query point [deg]
+        :param float radius: radius [m]
+        :param bool per_route: return only the closest segment of each route (the routes passing within the radius)
+
+        :returns: radius_df: query, route, index (row of the segment start), span, distance_i[m] (along-route distance
+                  of the closest point), distance[m] and latitude[deg]/longitude[deg] of the closest point, sorted by
+                  query and distance
+
+        :rtype: pandas.DataFrame
+        '''
+        latitudes, longitudes = self._toRadians(latitudes, longitudes)
+        x, y = self._project(latitudes, longitudes)
+        # the segments within the radius on the sphere are within radius*scale_max on the plane
+        _, scale_max = self._getScales(latitudes)
+
+        def keep(level, query, node):
+            return self._getBoxDistance(x[query], y[query], level, node) <= radius*scale_max
+
+        results = []
+        for chunk_start in range(0, max(len(x), 1), QUERY_CHUNK):
+            query, segment = self._traverse(np.arange(chunk_start, min(chunk_start+QUERY_CHUNK, len(x))), keep)
+            distance, fraction = self._getSegmentDistance(latitudes[query], longitudes[query], segment)
+            within = distance <= radius
+            query, segment, distance, fraction = query[within], segment[within], distance[within], fraction[within]
+
+            order = np.lexsort((distance, query))
+            query, segment, distance, fraction = query[order], segment[order], distance[order], fraction[order]
+            if per_route:
+                _, first = np.unique(query.astype(np.int64)*len(self._routes)+self._segment_route[segment], return_index=True)
+                first = np.sort(first)
+                query, segment, distance, fraction = query[first], segment[first], distance[first], fraction[first]
+            results.append((query, segment, distance, fraction))
+        return self._getResults(*[np.concatenate(column) for column in zip(*results)])
+
+    def queryBoundingBox(self, south, west, north, east) -> pd.DataFrame:
+        '''This method finds the route rows (polyline points or spans) within bounding boxes
+
+        :param south: southern latitude of each box [deg]
+        :param west: western longitude of each box [deg]
+        :param north: northern latitude of each box [deg]
+        :param east: eastern longitude of each box [deg]
+
+        :returns: box_df: query (position of the box), route, index, span and distance_i[m] of each row in the box
+
+        :rtype: pandas.DataFrame
+        '''
+        x0, y0 = self._projectDegrees(south, west)
+        x1, y1 = self._projectDegrees(north, east)
+        x0, x1 = np.minimum(x0, x1), np.maximum(x0, x1)
+
+        def keep(level, query, node):
+            x_min, y_min, x_max, y_max = self._levels[level]
+            return (x_min[node] <= x1[query]) & (x_max[node] >= x0[query]) & (y_min[node] <= y1[query]) & (y_max[node] >= y0[query])
+
+        query, segment = self._traverse(np.arange(len(x0)), keep)
+
+        # unique (box, row) pairs of the rows inside the box
+        query, row = np.r_[query, query], np.r_[self._segment_start[segment], self._segment_end[segment]]
+        inside = (self._x[row] >= x0[query]) & (self._x[row] <= x1[query]) & (self._y[row] >= y0[query]) & (self._y[row] <= y1[query])
+        pairs = np.unique(query[inside].astype(np.int64)*len(self._x)+row[inside])
+        query, row = pairs//len(self._x), pairs%len(self._x)
+        return pd.DataFrame({'query':           query,
+                             'route':           self._routes[self._row_route[row]],
+                             'index':           self._index[row],
+                             'span':            self._span[row],
+                             'distance_i[m]':   self._distance_i[row]})
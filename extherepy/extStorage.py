@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+
+import numpy as np
+import pandas as pd
+from typing import List
+
+# columns stored as categories
+CATEGORY_COLUMNS = ['place', 'countrycode']
+
+# fixed integer dtypes, independent of the values: profiles written on different runs share one schema
+INTEGER_DTYPES = {'route':              np.int8,
+                  'section':            np.int16,
+                  'functionalClass':    np.int8,
+                  'span':               np.int32,
+                  'routelink':          np.int32,
+                  'tracepoint':         np.int32,
+                  'points':             np.int32,
+                  'length[m]':          np.int32,
+                  'duration[s]':        np.int32,
+                  'baseDuration[s]':    np.int32,
+                  'itinerary':          np.int32}
+
+# columns keeping float64 (geographic coordinates and cumulative channels)
+FLOAT64_COLUMNS = ['latitude[deg]', 'longitude[deg]', 'GPS_latitude[deg]', 'GPS_longitude[deg]',
+                   'distance_i[m]', 'distance_f[m]', 'time_i[s]', 'time_f[s]']
+
+def compactDataFrame(route_profile_df: pd.DataFrame) -> pd.DataFrame:
+    '''This method converts a route profile to compact dtypes
+
+    Names and country codes become categoricals, the integer columns of INTEGER_DTYPES (ids, functionalClass, ...)
+    take their fixed integer type (the other integer columns are kept) and the other float channels (speeds, 
+    altitudes, deltas, ...) become float32. Geographic coordinates and cumulative distance/time keep float64.
+    The dtypes do not depend on the values, so the batches of a Parquet dataset share the same schema.
+
+    :param pandas.DataFrame route_profile_df: route profile
+
+    :returns: route_profile_df: compact route profile
+
+    :rtype: pandas.DataFrame
+    '''
+    columns = {}
+    for column in route_profile_df.columns:
+        values = route_profile_df[column]
+        if column in CATEGORY_COLUMNS:
+            values = values.astype('category')
+        elif pd.api.types.is_bool_dtype(values):
+            pass
+        elif pd.api.types.is_integer_dtype(values) and column in INTEGER_DTYPES:
+            dtype = INTEGER_DTYPES[column]
+            if len(values) and (values.min() < np.iinfo(dtype).min or values.max() > np.iinfo(dtype).max):
+                raise ValueError(f"[ERROR] {column} values out of the {np.dtype(dtype).name} range")
+            values = values.astype(dtype)
+        elif pd.api.types.is_float_dtype(values) and column not in FLOAT64_COLUMNS:
+            values = values.astype(np.float32)
+        columns[column] = values
+    return pd.DataFrame(columns, index=route_profile_df.index)
+
+def _requirePyarrow():
+    '''This method checks that the optional pyarrow dependency is installed
+    '''
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("[ERROR] Parquet/Arrow export requires pyarrow, please install it (pip install pyarrow)")
+
+def _getArrowSchema(route_profile_df: pd.DataFrame):
+    '''This method returns the Arrow schema of a route profile, the categories having int32 dictionary indices
+
+    The dictionary index type of a categorical follows the number of categories: it is fixed so that the batches 
+    of a Parquet dataset share the same schema.
+    '''
+    import pyarrow
+    schema = pyarrow.Schema.from_pandas(route_profile_df, preserve_index=False)
+    for i, field in enumerate(schema):
+        if pyarrow.types.is_dictionary(field.type):
+            schema = schema.set(i, field.with_type(pyarrow.dictionary(pyarrow.int32(), field.type.value_type)))
+    return schema
+
+def writeParquet(route_profile_df: pd.DataFrame,
+                 path: str,
+                 partition_cols: List[str] = None,
+                 compact: bool = True,
+                 compression: str = 'zstd'):
+    '''This method writes route profiles to a Parquet dataset
+
+    A 'date' partition column is derived from the 'timestamp' column when requested and missing.
+
+    :param pandas.DataFrame route_profile_df: route profiles
+    :param str path: path to the .parquet file or to the dataset directory when partitioned
+    :param List[str] partition_cols: partition columns, e.g. ['itinerary', 'date']
+    :param bool compact: convert to compact dtypes before writing (see compactDataFrame)
+    :param str compression: Parquet compression codec
+    '''
+    _requirePyarrow()
+    if partition_cols and 'date' in partition_cols and 'date' not in route_profile_df.columns:
+        route_profile_df = route_profile_df.assign(date=pd.to_datetime(route_profile_df['timestamp']).dt.strftime('%Y-%m-%d'))
+    if compact:
+        route_profile_df = compactDataFrame(route_profile_df)
+    route_profile_df.to_parquet(path,
+                                engine='pyarrow',
+                                partition_cols=partition_cols,
+                                compression=compression,
+                                index=False,
+                                schema=_getArrowSchema(route_profile_df))
+
+def readParquet(path: str,
+                columns: List[str] = None,
+                filters: list = None) -> pd.DataFrame:
+    '''This method reads route profiles from a Parquet file or dataset
+
+    :param str path: path to the .parquet file or dataset directory
+    :param List[str] columns: columns to read (None for all)
+    :param list filters: pyarrow row filters, e.g. [('itinerary', '=', 3)]
+
+    :returns: route_profile_df: route profiles
+
+    :rtype: pandas.DataFrame
+    '''
+    _requirePyarrow()
+    return pd.read_parquet(path, engine='pyarrow', columns=columns, filters=filters)
+
+def toArrow(route_profile_df: pd.DataFrame, compact: bool = True):
+    '''This method converts route profiles to an Arrow table
+
+    :param pandas.DataFrame route_profile_df: route profiles
+    :param bool compact: convert to compact dtypes first (see compactDataFrame)
+
+    :returns: table
+
+    :rtype: pyarrow.Table
+    '''
+    _requirePyarrow()
+    import pyarrow
+    if compact:
+        route_profile_df = compactDataFrame(route_profile_df)
+    return pyarrow.Table.from_pandas(route_profile_df, schema=_getArrowSchema(route_profile_df), preserve_index=False)
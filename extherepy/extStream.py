@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+BLOCK_OUTPUTS = ['dataframe', 'arrow']
+
+class extAccumulator(object):
+    '''
+    Cumulative sums carried across the blocks of a streamed report (distance_i/distance_f, time_i/time_f, ...).
+    The sums are computed sequentially from the carried total, giving the same values as one cumsum over the whole report.
+    '''
+
+    def __init__(self):
+        """Returns a extAccumulator instance.
+        """
+        self._totals = {}
+
+    def accumulate(self, key: str, delta: np.array) -> Tuple[np.array, np.array]:
+        '''This method accumulates the deltas of a block
+
+        :param str key: accumulated channel
+        :param numpy.array delta: delta of each row, one row per column if 2D
+
+        :returns: initial, final: cumulative sum before and after each row
+
+        :rtype: Tuple[numpy.array, numpy.array]
+        '''
+        delta = np.asarray(delta)
+        total = self._totals.get(key, np.zeros(delta.shape[:-1]+(1,), dtype=delta.dtype))
+        cumulative = np.cumsum(np.concatenate([total, delta], axis=-1), axis=-1)
+        self._totals[key] = cumulative[..., -1:]
+        return cumulative[..., :-1], cumulative[..., 1:]
+
+def iterColumnBlocks(chunks: Iterable[Dict[str, np.array]],
+                     block_size: int) -> Iterator[Tuple[Dict[str, np.array], Optional[Dict[str, np.array]]]]:
+    '''This method regroups chunks of columns in blocks of block_size rows, with the first row of the next block
+
+    The derived channels of the last row of a block (distance, time, altitude to the next row) need the next row:
+    each block is yielded with the first row of the next block (None for the last block).
+
+    :param Iterable chunks: chunks of columns (same keys), of any size
+    :param int block_size: number of rows per block (the last block can be smaller)
+
+    :returns: iterator of (block, next_row)
+
+    :rtype: Iterator[Tuple[Dict[str, numpy.array], Dict[str, numpy.array]]]
+    '''
+    if block_size < 1:
+        raise ValueError("[ERROR] block_size must be positive")
+    pending = None
+    for chunk in chunks:
+        if len(next(iter(chunk.values()))) == 0:
+            continue
+        pending = chunk if pending is None else {key: concatColumn([pending[key], chunk[key]]) for key in pending}
+        while len(next(iter(pending.values()))) > block_size:
+            yield {key: column[:block_size] for key, column in pending.items()}, {key: column[block_size:block_size+1] for key, column in pending.items()}
+            pending = {key: column[block_size:] for key, column in pending.items()}
+    if pending is not None:
+        yield pending, None
+
+def concatColumn(columns: list):
+    '''This method concatenates the chunks of a column (numpy arrays, or pandas arrays such as tz-aware timestamps)
+
+    :param list columns: chunks of the column
+
+    :returns: column
+
+    :rtype: Union[numpy.array, pandas.api.extensions.ExtensionArray]
+    '''
+    if all(isinstance(column, np.ndarray) for column in columns):
+        return np.concatenate(columns)
+    return pd.concat([pd.Series(column, copy=False) for column in columns], ignore_index=True).array
+
+def getNextDelta(values: np.array, next_row_value: Optional[np.array]) -> np.array:
+    '''This method computes the difference between each row and the next one (0 for the last row of the report)
+
+    :param numpy.array values: values of the block
+    :param numpy.array next_row_value: value of the first row of the next block (None for the last block)
+
+    :returns: delta: next value minus value of each row, 0 where a value is missing
+
+    :rtype: numpy.array
+    '''
+    values = np.asarray(values)
+    delta = np.diff(values if next_row_value is None else np.concatenate([values, next_row_value]))
+    if next_row_value is None and len(values):
+        delta = np.append(delta, 0)
+    return np.where(np.isnan(delta), 0, delta) if delta.dtype.kind == 'f' else delta
+
+def getBlockOutput(block_df: pd.DataFrame, output: str = 'dataframe'):
+    '''This method converts a report block to the requested output
+
+    :param pandas.DataFrame block_df: report block
+    :param str output: 'dataframe' or 'arrow' (pyarrow.RecordBatch, requires the optional pyarrow package)
+
+    :returns: block
+
+    :rtype: Union[pandas.DataFrame, pyarrow.RecordBatch]
+    '''
+    if output == 'dataframe':
+        return block_df
+    if output == 'arrow':
+        from extherepy.extStorage import _requirePyarrow
+        _requirePyarrow()
+        import pyarrow as pa
+        return pa.RecordBatch.from_pandas(block_df, preserve_index=False)
+    raise ValueError(f"[ERROR] output must be one of {BLOCK_OUTPUTS}")
+
+def iterDataFrameBlocks(route_profile_df: pd.DataFrame, block_size: int) -> Iterator[pd.DataFrame]:
+    '''This method slices a report in blocks of block_size rows
+
+    :param pandas.DataFrame route_profile_df: report
+    :param int block_size: number of rows per block
+
+    :returns: iterator of blocks
+
+    :rtype: Iterator[pandas.DataFrame]
+    '''
+    if block_size < 1:
+        raise ValueError("[ERROR] block_size must be positive")
+    for start in range(0, len(route_profile_df), block_size):
+        yield route_profile_df.iloc[start:start+block_size]
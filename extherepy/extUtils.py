@@ -1,11 +1,12 @@
 from herepy.utils import Utils
 import numpy as np
-import folium
-from branca import colormap as cm
 import pandas as pd
-import matplotlib.pyplot as plt
 import os
-import gpxpy.gpx 
+import json
+import functools
+from typing import Tuple
+from extherepy import extGpx
+from extherepy import extSimplify
 
 # colormap list
 list_colors = [
@@ -65,23 +66,130 @@ def kmph2mps(kmph: np.array) -> np.array:
     '''  
     return kmph/3.6
 
+def getUtcTimestamps(epoch_ms: np.array) -> pd.api.extensions.ExtensionArray:
+    '''Methods for converting unixtime [ms] (or naive datetime64 in UTC) to tz-aware UTC timestamps
+
+    :param numpy.array epoch_ms: unixtime [ms] or datetime64 in UTC
+
+    :returns: timestamps: datetime64[ms, UTC]
+
+    :rtype: pandas.arrays.DatetimeArray
+    '''
+    return pd.array(np.asarray(epoch_ms).astype('datetime64[ms]'), dtype=pd.DatetimeTZDtype('ms', 'UTC'))
+
+def getEpochMilliseconds(timestamps) -> np.array:
+    '''Methods for converting timestamps (tz-aware, or naive in UTC) to unixtime [ms]
+
+    :param timestamps: timestamps (pandas.Series, pandas.arrays.DatetimeArray or numpy.array of datetime64)
+
+    :returns: epoch_ms: unixtime [ms]
+
+    :rtype: numpy.array
+    '''
+    return pd.DatetimeIndex(timestamps).as_unit('ms').asi8
+
+def getSpanGroups(span: np.array) -> Tuple[np.array, np.array, np.array, np.array]:
+    '''This method groups the rows of a profile by span, in order of first occurrence
+
+    The aggregates of a column are computed with ufunc.reduceat(column[order], starts), e.g. np.maximum.reduceat.
+
+    :param numpy.array span: span of each row
+
+    :returns: first: first row of each span, order: rows sorted by span, starts: first position in order of each span,
+              counts: number of rows of each span
+
+    :rtype: Tuple[numpy.array, numpy.array, numpy.array, numpy.array]
+    '''
+    _, first, inverse = np.unique(span, return_index=True, return_inverse=True)
+    rank = np.empty(len(first), dtype=np.int64)
+    rank[np.argsort(first, kind='stable')] = np.arange(len(first))
+    group = rank[inverse.ravel()]
+    order = np.argsort(group, kind='stable')
+    counts = np.bincount(group, minlength=len(first))
+    return np.sort(first), order, np.cumsum(counts)-counts, counts
+
+def getColorIndex(values: np.array, channel_min: float, channel_max: float) -> np.array:
+    '''This method quantizes channel values to the nearest color of list_colors
+
+    :param numpy.array values: channel values
+    :param float channel_min: value of the first color
+    :param float channel_max: value of the last color
+
+    :returns: index of the color in list_colors
+
+    :rtype: numpy.array
+    '''
+    span = channel_max-channel_min
+    if span == 0:
+        return np.zeros(len(values), dtype=int)
+    return np.clip(np.round((np.asarray(values, dtype=float)-channel_min)/span*(len(list_colors)-1)), 0, len(list_colors)-1).astype(int)
+
+# number of colors of the polylines drawn by getPolylineMap (folium.ColorLine default)
+POLYLINE_COLOR_STEPS = 12
+
+def getStepColormap(channel_min: float, channel_max: float) -> 'branca.colormap.StepColormap':
+    '''This method returns the step colormap of the polyline and fleet maps (and of their legend)
+
+    :param float channel_min: value of the first color
+    :param float channel_max: value of the last color
+
+    :returns: step colormap of POLYLINE_COLOR_STEPS colors, as drawn by folium.ColorLine
+
+    :rtype: branca.colormap.StepColormap
+    '''
+    from branca import colormap as cm
+
+    colormap=cm.LinearColormap(colors=list_colors,
+                               index=np.linspace(int(channel_min), int(channel_max), len(list_colors)),
+                               vmin=channel_min,
+                               vmax=channel_max)
+    return colormap.to_step(POLYLINE_COLOR_STEPS)
+
+def getStepColorIndex(values: np.array, step_colormap: 'branca.colormap.StepColormap') -> np.array:
+    '''This method quantizes channel values to the colors of a step colormap, as the colormap itself does
+
+    :param numpy.array values: channel values
+    :param branca.colormap.StepColormap step_colormap: step colormap
+
+    :returns: index of the color in step_colormap.colors
+
+    :rtype: numpy.array
+    '''
+    index = np.searchsorted(np.asarray(step_colormap.index, dtype=float), np.asarray(values, dtype=float), side='right')-1
+    return np.clip(index, 0, len(step_colormap.colors)-1)
+
 def getPolylineMap(route_profile_df: pd.DataFrame, 
                     latitude_channel: str = 'latitude[deg]',
                     longitude_channel: str = 'longitude[deg]',
                     channel: str = None,
                     channel_min: float = None,
-                    channel_max: float = None) -> folium.Map:
+                    channel_max: float = None,
+                    tolerance: float = None,
+                    max_points: int = None,
+                    simplify_method: str = 'douglas-peucker',
+                    merge_colors: bool = False) -> 'folium.Map':
 
     '''This method create a geographic plot
 
+    Large routes can be reduced with a level of detail (tolerance or max_points): the polyline is simplified
+    (see extSimplify) keeping the points where the plotted color changes. With merge_colors the runs of consecutive 
+    points of the same color are drawn as one multi-polyline per color instead of one line per segment.
+
     :param pandas.Dataframe route_profile_df: route profile information
     :param string channel: channel to be plotted
+    :param float tolerance: simplification tolerance, 'douglas-peucker' [m] / 'visvalingam' [m2]
+    :param int max_points: maximum number of plotted points (used if tolerance is None)
+    :param str simplify_method: 'douglas-peucker' or 'visvalingam'
+    :param bool merge_colors: draw one polyline per run of points of the same color
 
     :returns: map
 
     :rtype: folium.Map
     '''  
 
+    # plotting dependencies are loaded on first use
+    import folium
+
     # get folium map 
     north=  route_profile_df[latitude_channel].max()
     south=  route_profile_df[latitude_channel].min()
@@ -90,8 +198,6 @@ def getPolylineMap(route_profile_df: pd.DataFrame,
 
     m = folium.Map(location=tuple([north, east]))
     m.fit_bounds([[south, west], [north, east]])
-    x_y_coordinates = route_profile_df[[latitude_channel, longitude_channel]]
-    polyline = [tuple(x) for x in x_y_coordinates.to_numpy()]
 
     # create colormap
     if (channel_max==None):
@@ -100,17 +206,272 @@ def getPolylineMap(route_profile_df: pd.DataFrame,
     if (channel_min==None):
         channel_min=route_profile_df[channel].min()
 
-    colormap=cm.LinearColormap(colors=list_colors,
-                               index=np.linspace(int(channel_min), int(channel_max), len(list_colors)),
-                               vmin=channel_min,
-                               vmax=channel_max)
-    m.add_child(colormap)
+    # the legend, the polyline colors, the kept color transitions and the merged runs all use the steps drawn by folium.ColorLine
+    step_colormap = getStepColormap(channel_min, channel_max)
+    m.add_child(step_colormap)
+
+    latitudes = route_profile_df[latitude_channel].values
+    longitudes = route_profile_df[longitude_channel].values
+    values = route_profile_df[channel].values
+    color_index = getStepColorIndex(values, step_colormap)
+
+    # level of detail
+    if (tolerance is not None) or (max_points is not None and max_points < len(latitudes)):
+        color_change = np.zeros(len(color_index), dtype=bool)
+        color_change[1:] = color_index[1:] != color_index[:-1]
+        color_change[:-1] |= color_change[1:]       # keep both ends of a color transition
+        mask = extSimplify.simplifyPolyline(latitudes, longitudes, 
+                                            tolerance=tolerance, 
+                                            target_points=max_points, 
+                                            method=simplify_method, 
+                                            keep=color_change)
+        latitudes, longitudes, values, color_index = latitudes[mask], longitudes[mask], values[mask], color_index[mask]
+
+    if merge_colors:
+        run_starts = np.flatnonzero(np.r_[True, color_index[1:] != color_index[:-1]])
+        run_ends = np.r_[run_starts[1:], len(color_index)-1]
+        # one multi-polyline per color, each run is joined to the first point of the next run
+        color_runs = {}
+        for run_start, run_end in zip(run_starts, run_ends):
+            if run_end > run_start:
+                # colored as folium.ColorLine colors the segment starting at run_start
+                color_runs.setdefault(step_colormap(values[run_start]), []).append(
+                    np.column_stack((latitudes[run_start:run_end+1], longitudes[run_start:run_end+1])).tolist())
+        for color, runs in color_runs.items():
+            folium.PolyLine(runs, 
+                            color=color, 
+                            weight=10, 
+                            opacity=0.8).add_to(m)
+    else:
+        polyline = list(zip(latitudes.tolist(), longitudes.tolist()))
+        folium.ColorLine(positions=polyline,
+                            colors=values,
+                            colormap=step_colormap,
+                            weight=10,
+                            opacity=0.8).add_to(m)
+    return m
+
+# levels of detail of the fleet maps (minimum zoom, simplification tolerance [m])
+FLEET_ZOOM_LEVELS = [(0, 1000), (7, 200), (10, 50), (13, 10), (16, 0)]
+
+@functools.lru_cache(maxsize=None)
+def _getZoomLevelsClass() -> type:
+    '''This method defines the _ZoomLevels map element on first use (branca/jinja2 are loaded lazily)
+
+    :returns: _ZoomLevels
+
+    :rtype: type
+    '''
+    from branca.element import MacroElement
+    from jinja2 import Template
+
+    class _ZoomLevels(MacroElement):
+        '''
+        Shows each layer of a map only within its zoom range.
+        '''
+        _template = Template("""
+            {% macro script(this, kwargs) %}
+            (function() {
+                var map = {{ this._parent.get_name() }};
+                var levels = [{% for layer, min_zoom, max_zoom in this.levels %}[{{ layer.get_name() }}, {{ min_zoom }}, {{ max_zoom }}],{% endfor %}];
+                function update() {
+                    var zoom = map.getZoom();
+                    levels.forEach(function(level) {
+                        if (zoom >= level[1] && zoom < level[2]) {
+                            if (!map.hasLayer(level[0])) { map.addLayer(level[0]); }
+                        } else if (map.hasLayer(level[0])) {
+                            map.removeLayer(level[0]);
+                        }
+                    });
+                }
+                map.on('zoomend', update);
+                update();
+            })();
+            {% endmacro %}
+            """)
+
+        def __init__(self, levels: list):
+            super(_ZoomLevels, self).__init__()
+            self._name = 'ZoomLevels'
+            self.levels = levels
+    return _ZoomLevels
+
+@functools.lru_cache(maxsize=None)
+def _getGeoJsonLinkClass() -> type:
+    '''This method defines the _GeoJsonLink map element on first use (branca/jinja2 are loaded lazily)
+
+    :returns: _GeoJsonLink
+
+    :rtype: type
+    '''
+    from branca.element import MacroElement
+    from jinja2 import Template
+
+    class _GeoJsonLink(MacroElement):
+        '''
+        GeoJSON layer loaded by the browser from its url (nothing is inlined), the features are colored
+        with their color property and show their route as tooltip.
+        '''
+        _template = Template("""
+            {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = L.geoJson(null, {
+                style: function(feature) {
+                    return {color: feature.properties.color, weight: {{ this.weight }}, opacity: {{ this.opacity }}};
+                },
+                onEachFeature: function(feature, layer) {
+                    layer.bindTooltip(String(feature.properties.route));
+                }
+            });
+            fetch({{ this.url|tojson }})
+                .then(function(response) { return response.json(); })
+                .then(function(data) { {{ this.get_name() }}.addData(data); });
+            {% endmacro %}
+            """)
+
+        def __init__(self, url: str, weight: float = 4, opacity: float = 0.8):
+            super(_GeoJsonLink, self).__init__()
+            self._name = 'GeoJsonLink'
+            self.url = url
+            self.weight = weight
+            self.opacity = opacity
+    return _GeoJsonLink
+
+def getFleetGeoJson(route_profiles: list,
+                    channel: str,
+                    channel_min: float,
+                    channel_max: float,
+                    tolerance: float = 0,
+                    latitude_channel: str = 'latitude[deg]',
+                    longitude_channel: str = 'longitude[deg]',
+                    precision: int = 6,
+                    importances: list = None) -> dict:
+    '''This method converts route profiles to a GeoJSON feature collection with one MultiLineString per route and color
+
+    :param list route_profiles: (route, route_profile_df) pairs
+    :param string channel: channel to be plotted
+    :param float channel_min: value of the first color
+    :param float channel_max: value of the last color
+    :param float tolerance: Douglas-Peucker simplification tolerance [m] (0 for none)
+    :param int precision: number of decimals of the coordinates
+    :param list importances: precomputed Douglas-Peucker importance of the points of each route (see extSimplify.getImportance)
+
+    :returns: feature collection, colored with the step colormap of the map legend (see getStepColormap)
+
+    :rtype: dict
+    '''
+    step_colormap = getStepColormap(channel_min, channel_max)
+    features = []
+    for id, (route, route_profile_df) in enumerate(route_profiles):
+        latitudes = route_profile_df[latitude_channel].values
+        longitudes = route_profile_df[longitude_channel].values
+        values = route_profile_df[channel].values
+        if tolerance:
+            if importances is not None:
+                mask = importances[id] > tolerance
+            else:
+                mask = extSimplify.simplifyPolyline(latitudes, longitudes, tolerance=tolerance)
+            latitudes, longitudes, values = latitudes[mask], longitudes[mask], values[mask]
+        color_index = getStepColorIndex(values, step_colormap)
+
+        # each segment takes the color of its first point
+        coordinates = np.round(np.column_stack((longitudes, latitudes)), precision)
+        run_starts = np.flatnonzero(np.r_[True, color_index[1:] != color_index[:-1]])
+        run_ends = np.r_[run_starts[1:], len(color_index)-1]
+        color_runs = {}
+        for run_start, run_end in zip(run_starts, run_ends):
+            if run_end > run_start:
+                color_runs.setdefault(step_colormap(values[run_start]), []).append(coordinates[run_start:run_end+1].tolist())
+        for color, runs in color_runs.items():
+            features.append({'type':        'Feature',
+                             'geometry':    {'type': 'MultiLineString', 'coordinates': runs},
+                             'properties':  {'route': str(route), 'color': color}})
+    return {'type': 'FeatureCollection', 'features': features}
+
+def getFleetMap(route_profiles,
+                channel: str,
+                route_key: str = None,
+                channel_min: float = None,
+                channel_max: float = None,
+                latitude_channel: str = 'latitude[deg]',
+                longitude_channel: str = 'longitude[deg]',
+                zoom_levels: list = FLEET_ZOOM_LEVELS,
+                output_dir: str = None,
+                output_url: str = None) -> 'folium.Map':
+    '''This method creates a geographic plot of many routes
+
+    The routes are drawn as GeoJSON layers (one MultiLineString per route and color) sharing one step colormap
+    (see getStepColormap). Each zoom level shows its own layer, simplified with the level tolerance, so the map 
+    stays loadable for thousands of routes. With output_dir the layers are written to GeoJSON files loaded by the 
+    browser when the map is shown (the map must then be served over HTTP), nothing is inlined in the map.
+
+    :param route_profiles: list of route profile dataframes or one dataframe with a route_key column
+    :param string channel: channel to be plotted
+    :param str route_key: route column of a single dataframe (e.g. 'itinerary' of getRouteReportBatch)
+    :param float channel_min: value of the first color (default minimum over the routes)
+    :param float channel_max: value of the last color (default maximum over the routes)
+    :param list zoom_levels: (minimum zoom, simplification tolerance [m]) of each level of detail
+    :param str output_dir: directory where the GeoJSON layers (fleet_z<zoom>.geojson) are written and loaded from
+    :param str output_url: url of output_dir from the map page (default output_dir, for a map saved in the working directory)
+
+    :returns: map
+
+    :rtype: folium.Map
+    '''
+    import folium
 
-    folium.ColorLine(positions=polyline,
-                        colors=route_profile_df[channel],
-                        colormap=colormap,
-                        weight=10,
-                        opacity=0.8).add_to(m)
+    if isinstance(route_profiles, pd.DataFrame):
+        if route_key is None:
+            raise Exception("[ERROR] Please provide the route_key of the dataframe")
+        route_profiles = list(route_profiles.groupby(route_key, sort=False))
+    else:
+        route_profiles = list(enumerate(route_profiles))
+
+    # shared colormap
+    if (channel_max==None):
+        channel_max=max(route_profile_df[channel].max() for _, route_profile_df in route_profiles)
+    if (channel_min==None):
+        channel_min=min(route_profile_df[channel].min() for _, route_profile_df in route_profiles)
+    step_colormap = getStepColormap(channel_min, channel_max)
+
+    north = max(route_profile_df[latitude_channel].max() for _, route_profile_df in route_profiles)
+    south = min(route_profile_df[latitude_channel].min() for _, route_profile_df in route_profiles)
+    east = max(route_profile_df[longitude_channel].max() for _, route_profile_df in route_profiles)
+    west = min(route_profile_df[longitude_channel].min() for _, route_profile_df in route_profiles)
+
+    m = folium.Map(location=((north+south)/2, (east+west)/2), prefer_canvas=True)
+    m.fit_bounds([[south, west], [north, east]])
+    m.add_child(step_colormap)
+
+    # the importance of the points is computed once per route and thresholded per level
+    zoom_levels = sorted(zoom_levels)
+    min_tolerance = min([tolerance for _, tolerance in zoom_levels if tolerance] or [0])
+    importances = [extSimplify.getImportance(route_profile_df[latitude_channel].values,
+                                             route_profile_df[longitude_channel].values,
+                                             min_importance=min_tolerance) for _, route_profile_df in route_profiles]
+
+    levels = []
+    for level, (min_zoom, tolerance) in enumerate(zoom_levels):
+        max_zoom = zoom_levels[level+1][0] if level+1 < len(zoom_levels) else 100
+        geojson = getFleetGeoJson(route_profiles, channel, channel_min, channel_max, 
+                                  tolerance=tolerance,
+                                  latitude_channel=latitude_channel,
+                                  longitude_channel=longitude_channel,
+                                  importances=importances)
+        if output_dir:
+            # the layer is loaded by reference
+            os.makedirs(output_dir, exist_ok=True)
+            with open(os.path.join(output_dir, f'fleet_z{min_zoom}.geojson'), 'w') as f:
+                json.dump(geojson, f)
+            layer = _getGeoJsonLinkClass()(f"{(output_url or output_dir).rstrip('/')}/fleet_z{min_zoom}.geojson")
+        else:
+            layer = folium.GeoJson(geojson,
+                                   name=f'zoom {min_zoom}-{max_zoom}',
+                                   style_function=lambda feature: {'color': feature['properties']['color'], 'weight': 4, 'opacity': 0.8},
+                                   tooltip=folium.GeoJsonTooltip(fields=['route']),
+                                   control=False)
+        m.add_child(layer)
+        levels.append((layer, min_zoom, max_zoom))
+    m.add_child(_getZoomLevelsClass()(levels))
     return m
 
 def m2km(m: np.array) -> np.array:
@@ -128,6 +489,9 @@ def plotSegmentsvsTime(route_profile_df: pd.DataFrame,
                 channel: str):
     '''Methods for plotting a route channel vs time
 
+    The segments are drawn as one collection of bars with at most extPlot.MAX_TICKS ticks, see extPlot for 
+    figures outside pyplot and batch rendering to files.
+
     :param pandas.DataFrame route_profile_df: route profile dataframe
     :param str: channel to plot 
 
@@ -135,22 +499,19 @@ def plotSegmentsvsTime(route_profile_df: pd.DataFrame,
 
     :rtype: matplotlib.pyplot
     ''' 
-    plt.figure(figsize=(30,5))
-    plt.bar(x=route_profile_df['time_i[s]'], 
-            height=route_profile_df[channel], 
-            width=route_profile_df['delta_time[s]'],
-            align='edge',
-            linewidth=0.5,
-            edgecolor='black')
-    plt.xlabel('Time [s]')
-    plt.ylabel(channel)
-    plt.xticks(route_profile_df['time_i[s]'], rotation='vertical')
+    import matplotlib.pyplot as plt
+    from extherepy import extPlot
+    figure = plt.figure(figsize=(30,5))
+    extPlot.drawSegments(figure.add_subplot(), **extPlot.getSegmentColumns(route_profile_df, channel, 'time'))
     return plt
 
 def plotSegmentsvsDistance(route_profile_df: pd.DataFrame, 
                 channel: str):
     '''Methods for plotting a route channel vs distance
 
+    The segments are drawn as one collection of bars with at most extPlot.MAX_TICKS ticks, see extPlot for 
+    figures outside pyplot and batch rendering to files.
+
     :param pandas.DataFrame route_profile_df: route profile dataframe
     :param str: channel to plot 
 
@@ -158,30 +519,31 @@ def plotSegmentsvsDistance(route_profile_df: pd.DataFrame,
 
     :rtype: matplotlib.pyplot
     '''               
-    plt.figure(figsize=(30,5))
-    plt.bar(x=m2km(route_profile_df['distance_i[m]'].values), 
-            height=route_profile_df[channel], 
-            width=m2km(route_profile_df['delta_distance[m]'].values),
-            align='edge',
-            linewidth=0.5,
-            edgecolor='black')
-    plt.xlabel('Distance [km]')
-    plt.ylabel(channel)
-    plt.xticks(m2km(route_profile_df['distance_i[m]'].values), rotation='vertical')
+    import matplotlib.pyplot as plt
+    from extherepy import extPlot
+    figure = plt.figure(figsize=(30,5))
+    extPlot.drawSegments(figure.add_subplot(), **extPlot.getSegmentColumns(route_profile_df, channel, 'distance'))
     return plt
 
-def dataframe2gpx(input_df, lats_colname='latitude', longs_colname='longitude', times_colname=None, alts_colname=None, output_file=None):
+def dataframe2gpx(input_df, lats_colname='latitude', longs_colname='longitude', times_colname=None, alts_colname=None, output_file=None,
+                  track_colname=None, segment_colname=None, return_xml=True, chunk_size=100000):
     '''Methods for converting a dataframe in a gpx file 
 
+    The columns are exported as whole arrays and the points are streamed to the output file in chunks.
+
     :param str lats_colname
     :param str longs_colname
-    :param str times_colname
+    :param str times_colname: timestamps in unixtime [s]
     :param str alts_colname
     :param str output_file
+    :param str track_colname: a new track is started at each change of this column
+    :param str segment_colname: a new track segment is started at each change of this column
+    :param bool return_xml: return the gpx document as string (set to False for large exports)
+    :param int chunk_size: number of points written at once
 
-    :returns: None 
+    :returns: gpx document if return_xml else None
 
-    :rtype: None
+    :rtype: str
     '''    
     if not output_file:
         raise Exception("[ERROR] Please provide an output file")
@@ -190,24 +552,35 @@ def dataframe2gpx(input_df, lats_colname='latitude', longs_colname='longitude',
     if output_extension != ".gpx":
         raise TypeError(f"[ERROR] output file must be a gpx file")
 
-    gpx = gpxpy.gpx.GPX()
-
-    # Create first track in our GPX:
-    gpx_track = gpxpy.gpx.GPXTrack()
-    gpx.tracks.append(gpx_track)
-
-    # Create first segment in our GPX track:
-    gpx_segment = gpxpy.gpx.GPXTrackSegment()
-    gpx_track.segments.append(gpx_segment)
-
-    # Create points:
-    for idx in input_df.index:
-
-        gpx_segment.points.append(gpxpy.gpx.GPXTrackPoint(input_df.loc[idx, lats_colname],
-                                                            input_df.loc[idx, longs_colname],
-                                                            time=pd.Timestamp(input_df.loc[idx, times_colname], unit='s') if times_colname else None, # timestamp accepted is in unixtime
-                                                            elevation=input_df.loc[idx, alts_colname] if alts_colname else None))
-    
-    with open(output_file, 'w') as f:
-        f.write(gpx.to_xml())
-    return gpx.to_xml()
\ No newline at end of file
+    return extGpx.writeGpxDataFrame(output_file,
+                                    input_df,
+                                    lats_colname=lats_colname,
+                                    longs_colname=longs_colname,
+                                    times_colname=times_colname,
+                                    alts_colname=alts_colname,
+                                    track_colname=track_colname,
+                                    segment_colname=segment_colname,
+                                    chunk_size=chunk_size,
+                                    return_xml=return_xml)
+
+def gpx2dataframe(gpx_file, lats_colname='latitude', longs_colname='longitude', times_colname='time', alts_colname='altitude', block_size=100000):
+    '''Methods for converting a gpx file in a dataframe (reverse of dataframe2gpx)
+
+    :param gpx_file: path to .gpx file or file-like object
+    :param str lats_colname
+    :param str longs_colname
+    :param str times_colname: timestamps in unixtime [s]
+    :param str alts_colname
+    :param int block_size: number of points parsed at once
+
+    :returns: track points 
+
+    :rtype: pandas.DataFrame
+    '''
+    blocks = list(extGpx.iterGpxBlocks(gpx_file, block_size=block_size))
+    columns = {name: np.concatenate([block[name] for block in blocks]) if blocks else np.array([]) for name in ['latitude', 'longitude', 'elevation']}
+    times = np.concatenate([block['time'] for block in blocks]) if blocks else np.array([], dtype='datetime64[ms]')
+    return pd.DataFrame({lats_colname: columns['latitude'],
+                         longs_colname: columns['longitude'],
+                         times_colname: np.where(np.isnat(times), np.nan, times.astype(np.int64)/1000),
+                         alts_colname: columns['elevation']})
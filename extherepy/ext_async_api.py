@@ -0,0 +1,496 @@
+#!/usr/bin/env python
+
+import io
+import asyncio
+import functools
+import contextvars
+from collections import deque
+from datetime import datetime
+from urllib.parse import urlparse, urlunparse
+from typing import List, Union, IO, Callable
+import requests
+import numpy as np
+import pandas as pd
+from herepy import RoutingApi, RmeApi, GeocoderApi
+from extherepy import extGpx
+from extherepy import extStorage
+from extherepy import extInstrumentation
+from extherepy.extCache import extResponseCache
+from extherepy.extHttp import PreparedRequest, parseResponse, checkHerePyRequests, getRoutingRequest, getRmeRequest, getGeocoderRequest
+from extherepy.extConcurrency import extAsyncRateLimiter, callWithRetryAsync
+from extherepy.ext_routing_api import ROUTE_RETURN_FIELDS, ROUTE_SPAN_FIELDS, _getRoutingParams, _getRouteReport, _concatRouteReports
+from extherepy.extMatch import extLocalMatcher
+from extherepy.ext_rme_api import RME_PDE_LAYERS, _getGpxInput, _getGpxContent, _getRmeCacheParams, _getRmeColumns, _getRmeReport, \
+                                  _getWindowCut, _getWindowProfile, _extWindowStitcher, _getLocalRmeColumns
+from extherepy.ext_geocoder_api import _normalizePlace, _getUniquePlaces, _getCoordinatesDataFrame, _hasLocation
+
+def _importAiohttp():
+    '''This method imports the optional aiohttp dependency
+    '''
+    try:
+        import aiohttp
+    except ImportError:
+        raise ImportError("[ERROR] the async clients require aiohttp, please install it (pip install aiohttp)")
+    return aiohttp
+
+class extAsyncClient(object):
+    '''
+    Pooled aiohttp client shared by the async ext* APIs, with keep-alive connections, a concurrency semaphore
+    and per host rate limiting.
+    '''
+
+    def __init__(self,
+                 max_connections: int = 100,
+                 max_connections_per_host: int = 10,
+                 max_concurrency: int = 32,
+                 rate_limit: float = None,
+                 keepalive_timeout: float = 30,
+                 base_url: str = None):
+        """Returns a extAsyncClient instance.
+
+        :param int max_connections: size of the connection pool
+        :param int max_connections_per_host: size of the connection pool per host
+        :param int max_concurrency: maximum number of requests in flight
+        :param float rate_limit: maximum number of requests per second per host (None for no limit)
+        :param float keepalive_timeout: idle time after which a pooled connection is closed [s]
+        :param str base_url: scheme and host replacing the HERE ones, e.g. 'http://127.0.0.1:8080' for a mock server
+        """
+        self._max_connections = max_connections
+        self._max_connections_per_host = max_connections_per_host
+        self._keepalive_timeout = keepalive_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._rate_limit = rate_limit
+        self._rate_limiters = {}
+        self._base_url = urlparse(base_url) if base_url else None
+        self._session = None
+
+    def _getSession(self):
+        '''This method returns the pooled session, opening it on first use
+
+        :returns: session
+
+        :rtype: aiohttp.ClientSession
+        '''
+        aiohttp = _importAiohttp()
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self._max_connections,
+                                             limit_per_host=self._max_connections_per_host,
+                                             keepalive_timeout=self._keepalive_timeout)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def request(self, request: PreparedRequest, timeout: float):
+        '''This method sends a HERE request
+
+        Connection errors and timeouts are raised as their requests counterparts, so that the retry policy
+        of the blocking APIs applies (see extConcurrency.isRetryable).
+
+        :param PreparedRequest request: request (see extHttp)
+        :param float timeout: timeout of the request [s]
+
+        :returns: HerePy response
+        '''
+        aiohttp = _importAiohttp()
+        url = request.url
+        if self._base_url is not None:
+            url = urlunparse(urlparse(url)._replace(scheme=self._base_url.scheme, netloc=self._base_url.netloc))
+        host = urlparse(url).netloc
+        rate_limiter = self._rate_limiters.setdefault(host, extAsyncRateLimiter(self._rate_limit))
+
+        async with self._semaphore:
+            await rate_limiter.wait()
+            try:
+                with extInstrumentation.stage('http.request', endpoint=host+urlparse(url).path, method=request.method) as request_stage:
+                    async with self._getSession().request(request.method, url, headers=request.headers, data=request.body, 
+                                                          timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                        status = response.status
+                        content = await response.read()
+                    request_stage.set(status=status, response_size=len(content))
+            except asyncio.TimeoutError as error:
+                raise requests.Timeout(f"[ERROR] request to {host} timed out") from error
+            except aiohttp.ClientError as error:
+                raise requests.ConnectionError(f"[ERROR] request to {host} failed: {error}") from error
+        return parseResponse(request, status, content)
+
+    async def close(self):
+        '''This method closes the pooled connections
+        '''
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+async def _getOrFetchAsync(cache: extResponseCache, api: str, params: dict, fetch: Callable, cacheable: Callable = None) -> dict:
+    '''This method returns the cached response or awaits the request and stores it (see extResponseCache.getOrFetch)
+
+    The cache lookups and stores (blocking SQLite I/O) run in the default executor, off the event loop.
+
+    :param extResponseCache cache: response cache (None for no cache)
+    :param str api: HERE API
+    :param dict params: request parameters
+    :param Callable fetch: coroutine function performing the request and returning the HerePy response
+    :param Callable cacheable: function telling if a fetched response is stored (default all the responses)
+
+    :returns: response
+
+    :rtype: dict
+    '''
+    if cache is None:
+        return (await fetch()).as_dict()
+    response = await _runInExecutor(cache.get, api, params)
+    if response is None:
+        response = (await fetch()).as_dict()
+        if cacheable is None or cacheable(response):
+            await _runInExecutor(cache.set, api, params, response)
+    return response
+
+async def _runInExecutor(function: Callable, *args):
+    '''This method runs a blocking function (report building) in the default executor of the event loop
+
+    The function runs in a copy of the caller context, so its instrumentation stages keep their parent.
+
+    :param Callable function: blocking function
+    :param args: arguments of the function
+
+    :returns: result of the function
+    '''
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(contextvars.copy_context().run, function, *args))
+
+class _extRoutingRequestBuilder(RoutingApi):
+    '''
+    RoutingApi building the requests instead of sending them.
+    '''
+    def _RoutingApi__get(self, base_url, data, key, response_cls, manipulation_key=None, keys_for_manipulation=None, headers=None):
+        return getRoutingRequest(base_url, data, response_cls, manipulation_key, keys_for_manipulation, headers)
+
+class _extRmeRequestBuilder(RmeApi):
+    '''
+    RmeApi building the requests instead of sending them.
+    '''
+    def _RmeApi__get(self, data):
+        return getRmeRequest(self._base_url, data)
+
+class _extGeocoderRequestBuilder(GeocoderApi):
+    '''
+    GeocoderApi building the requests instead of sending them.
+    '''
+    def _GeocoderApi__get(self, data):
+        return getGeocoderRequest(self._base_url, data)
+
+class _extAsyncApi(object):
+    '''
+    Base class of the async APIs: the requests are built by HerePy and sent through a extAsyncClient.
+    '''
+    _builder_cls = None
+    _herepy_cls = None
+
+    def __init__(self, api_key: str = None, timeout: int = None, cache: extResponseCache = None, client: extAsyncClient = None):
+        """Returns an async API instance.
+
+        :param str api_key: HERE Api Key
+        :param int timeout: Timeout limit for requests
+        :param extResponseCache cache: optional response cache
+        :param extAsyncClient client: pooled client, shared between APIs (a private one if None)
+        """
+        checkHerePyRequests(self._herepy_cls)
+        self._builder = self._builder_cls(api_key, timeout)
+        self._timeout = self._builder._timeout
+        self._cache = cache
+        self._owns_client = client is None
+        self._client = client if client is not None else extAsyncClient()
+
+    async def close(self):
+        '''This method closes the private client (a shared client is closed by its owner)
+        '''
+        if self._owns_client:
+            await self._client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+class extAsyncRoutingApi(_extAsyncApi):
+    '''
+    Async counterpart of extRoutingApi.
+    '''
+    _builder_cls = _extRoutingRequestBuilder
+    _herepy_cls = RoutingApi
+
+    async def route_v8(self, **kwargs):
+        '''This method requests a route (see herepy.RoutingApi.route_v8)
+
+        :returns: RoutingResponseV8
+        '''
+        return await self._client.request(self._builder.route_v8(**kwargs), self._timeout)
+
+    async def _getRouteResponse(self,
+                                waypoints: List[tuple],
+                                departure_time: str,
+                                return_fields: List[str] = ROUTE_RETURN_FIELDS,
+                                span_fields: List[str] = ROUTE_SPAN_FIELDS) -> dict:
+        '''This method requests a route_v8 route with the span information used by the route report
+
+        :param List[Tuple(float)] waypoints: route waypoints
+        :param str departure_time: time of departure
+        :param List[str] return_fields: route_v8 return fields
+        :param List[str] span_fields: route_v8 span fields
+
+        :returns: routing_response_dict: route_v8 response
+
+        :rtype: dict
+        '''
+        routing_params = _getRoutingParams(waypoints, departure_time, return_fields, span_fields)
+        return await _getOrFetchAsync(self._cache, 'route_v8', routing_params, lambda: self.route_v8(**routing_params))
+
+    async def getRouteReport(self,
+                             waypoints: List[tuple],
+                             departure_time: str = None,
+                             return_polyline: bool = False,
+                             distance_method: str = 'geodesic',
+                             compact: bool = False) -> pd.DataFrame:
+        '''This method returns a route report (see extRoutingApi.getRouteReport)
+
+        :param List[Tuple(float)] waypoints: route waypoints
+        :param str departure_time: time of departure (None for now)
+        :param bool return_polyline: return polyline
+        :param str distance_method: polyline distance method 'geodesic', 'haversine' or 'equirectangular' (see extDistance)
+        :param bool compact: return compact dtypes (see extStorage.compactDataFrame)
+
+        :returns: route_profile_df: Route Profile Info
+
+        :rtype: pandas.DataFrame
+        '''
+        departure_time = departure_time or datetime.now().strftime('%Y-%m-%dT%H:%M:%S')
+        routing_response_dict = await self._getRouteResponse(waypoints, departure_time)
+        route_profile_df = await _runInExecutor(_getRouteReport, routing_response_dict, return_polyline, distance_method)
+        return extStorage.compactDataFrame(route_profile_df) if compact else route_profile_df
+
+    async def getRouteReportBatch(self,
+                                  itineraries: List[List[tuple]],
+                                  departure_times: List[str] = None,
+                                  return_polyline: bool = False,
+                                  distance_method: str = 'geodesic',
+                                  max_retries: int = 3,
+                                  backoff: float = 1.0,
+                                  compact: bool = False) -> pd.DataFrame:
+        '''This method computes the route reports of many itineraries concurrently (see extRoutingApi.getRouteReportBatch)
+
+        The concurrency and the rate are bounded by the client.
+
+        :param List[List[Tuple(float)]] itineraries: waypoints of each itinerary
+        :param List[str] departure_times: time of departure of each itinerary (None for now)
+        :param bool return_polyline: return polyline
+        :param str distance_method: polyline distance method 'geodesic', 'haversine' or 'equirectangular' (see extDistance)
+        :param int max_retries: maximum number of retries of a failing request
+        :param float backoff: initial retry delay [s], doubled at each retry
+        :param bool compact: return compact dtypes (see extStorage.compactDataFrame)
+
+        :returns: route_profiles_df: Route Profile Info of all the itineraries with an itinerary key,
+                  the errors of the failed itineraries are reported in route_profiles_df.attrs['errors']
+
+        :rtype: pandas.DataFrame
+        '''
+        if departure_times is None:
+            departure_times = [datetime.now().strftime('%Y-%m-%dT%H:%M:%S')]*len(itineraries)
+        if len(departure_times) != len(itineraries):
+            raise ValueError("[ERROR] departure_times must have the same length of itineraries")
+
+        async def report(itinerary):
+            try:
+                routing_response_dict = await callWithRetryAsync(lambda: self._getRouteResponse(itineraries[itinerary], departure_times[itinerary]),
+                                                                 max_retries=max_retries,
+                                                                 backoff=backoff)
+                return itinerary, await _runInExecutor(_getRouteReport, routing_response_dict, return_polyline, distance_method), None
+            except Exception as error:
+                return itinerary, None, error
+
+        route_reports = await asyncio.gather(*[report(itinerary) for itinerary in range(len(itineraries))])
+        return _concatRouteReports(route_reports, compact)
+
+class extAsyncRmeApi(_extAsyncApi):
+    '''
+    Async counterpart of extRmeApi.
+    '''
+    _builder_cls = _extRmeRequestBuilder
+    _herepy_cls = RmeApi
+
+    async def match_route(self, gpx_file_content: str, route_mode: str = 'car', pde_layers: List[str] = []):
+        '''This method matches a gpx document (see herepy.RmeApi.match_route)
+
+        :returns: RmeResponse
+        '''
+        return await self._client.request(self._builder.match_route(gpx_file_content, route_mode, pde_layers), self._timeout)
+
+    async def _getRmeResponse(self, gpx_content: str) -> dict:
+        """Returns the match_route response of a gpx document
+
+        :param str gpx_content: gpx document
+
+        :returns: rme_response_dict: match_route response
+
+        :rtype: dict
+        """
+        return await _getOrFetchAsync(self._cache, 'match_route', _getRmeCacheParams(gpx_content),
+                                      lambda: self.match_route(gpx_content, pde_layers=RME_PDE_LAYERS))
+
+    async def getRouteReport(self,
+                             gpx_file: Union[str, IO, pd.DataFrame],
+                             return_GPS_trace: bool = False,
+                             distance_method: str = 'geodesic',
+                             window_size: int = None,
+                             window_duration: float = None,
+                             overlap: int = 20,
+                             max_workers: int = 4,
+                             compact: bool = False,
+                             local_matcher: extLocalMatcher = None,
+                             min_confidence: float = 0.5) -> pd.DataFrame:
+        """Returns a Route Match report (see extRmeApi.getRouteReport)
+
+        :param gpx_file: path to .gpx file, file-like object or dataframe of track points
+        :param bool return_GPS_trace: return GPS trace
+        :param str distance_method: distance method 'geodesic', 'haversine' or 'equirectangular' (see extDistance)
+        :param int window_size: maximum number of points matched per request (None for a single request)
+        :param float window_duration: maximum duration of the trace matched per request [s] (None for a single request)
+        :param int overlap: number of points shared by consecutive windows
+        :param int max_workers: maximum number of concurrent window requests
+        :param bool compact: return compact dtypes (see extStorage.compactDataFrame)
+        :param extLocalMatcher local_matcher: optional offline matcher tried before match_route
+        :param float min_confidence: minimum confidence of the local match (0 to 1)
+
+        :returns: route_profile_df: Route Profile Info
+
+        :rtype: pandas.DataFrame
+        """
+        gpx_file = _getGpxInput(gpx_file)
+        route_profile = None
+        if local_matcher is not None:
+            gpx_file = io.StringIO(_getGpxContent(gpx_file))
+            route_profile = _getLocalRmeColumns(local_matcher, gpx_file.getvalue(), min_confidence)
+        if route_profile is None and (window_size or window_duration):
+            route_profile = await self._getWindowedRmeProfile(gpx_file, window_size, window_duration, overlap, max_workers)
+        elif route_profile is None:
+            route_profile = _getRmeColumns(await self._getRmeResponse(_getGpxContent(gpx_file)))
+
+        route_profile_df = await _runInExecutor(_getRmeReport, route_profile, return_GPS_trace, distance_method)
+        return extStorage.compactDataFrame(route_profile_df) if compact else route_profile_df
+
+    async def _getWindowedRmeProfile(self,
+                                     gpx_file: Union[str, IO],
+                                     window_size: int = None,
+                                     window_duration: float = None,
+                                     overlap: int = 20,
+                                     max_workers: int = 4) -> pd.DataFrame:
+        """Returns the trace point profile of a gpx file matched in overlapping windows (see extRmeApi._getWindowedRmeProfile)
+
+        :param gpx_file: path to .gpx file or file-like object
+        :param int window_size: maximum number of points matched per request
+        :param float window_duration: maximum duration of the trace matched per request [s]
+        :param int overlap: number of points shared by consecutive windows
+        :param int max_workers: maximum number of concurrent window requests
+
+        :returns: route_profile_df: trace point profile
+
+        :rtype: pandas.DataFrame
+        """
+        in_flight = asyncio.Semaphore(max_workers)
+
+        async def match(points):
+            try:
+                return _getWindowProfile(await callWithRetryAsync(lambda: self._getRmeResponse(extGpx.getGpxContent(points))))
+            finally:
+                in_flight.release()
+
+        cuts = [-np.inf]
+        stitcher = _extWindowStitcher(cuts)
+        route_profiles = []
+        matches = deque()
+
+        async def stitchOldest():
+            route_profile_df = stitcher.stitch(*(await matches.popleft()))
+            if route_profile_df is not None:
+                route_profiles.append(route_profile_df)
+
+        try:
+            for points, window_overlap in extGpx.iterGpxWindows(gpx_file, window_size, window_duration, overlap):
+                if matches:
+                    cuts.append(_getWindowCut(points, window_overlap))
+                # a window is stitched once the cut of the next window is known, at most 2*max_workers windows are held in memory
+                if len(matches) >= 2*max_workers:
+                    await stitchOldest()
+                await in_flight.acquire()
+                matches.append(asyncio.ensure_future(match(points)))
+            cuts.append(np.inf)
+            while matches:
+                await stitchOldest()
+        except BaseException:
+            for future in matches:
+                future.cancel()
+            raise
+        return pd.concat(route_profiles, ignore_index=True)
+
+class extAsyncGeocoderApi(_extAsyncApi):
+    '''
+    Async counterpart of extGeocoderApi.
+    '''
+    _builder_cls = _extGeocoderRequestBuilder
+    _herepy_cls = GeocoderApi
+
+    async def free_form(self, searchtext: str, lang: str = 'en-US'):
+        '''This method geocodes a search text (see herepy.GeocoderApi.free_form)
+
+        :returns: GeocoderResponse
+        '''
+        return await self._client.request(self._builder.free_form(searchtext, lang), self._timeout)
+
+    async def _getGeocode(self, place: str) -> dict:
+        '''This method returns the free_form geocoding response of a place
+
+        :param string place: place
+
+        :returns: geocoder_response_dict: geocoding response
+
+        :rtype: dict
+        '''
+        return await _getOrFetchAsync(self._cache, 'free_form', {'searchtext': _normalizePlace(place)},
+                                      lambda: self.free_form(searchtext=place), cacheable=_hasLocation)
+
+    async def getCoordinates(self, place: str) -> tuple:
+        '''This method returns a latitude/longitude touple
+
+        :param string place: place
+
+        :returns: coordinates: geographical coordinates of the place (latitude, longitude)
+
+        :rtype: tuple
+        '''
+        geocoder_response_dict = await self._getGeocode(place)
+        return geocoder_response_dict['items'][0]['position']['lat'], geocoder_response_dict['items'][0]['position']['lng']
+
+    async def getCoordinatesBatch(self, places: List[str]) -> pd.DataFrame:
+        '''This method geocodes a list of places concurrently (see extGeocoderApi.getCoordinatesBatch)
+
+        The concurrency and the rate are bounded by the client.
+
+        :param List[str] places: places
+
+        :returns: coordinates_df: place, latitude[deg], longitude[deg], candidates (all the geocoding items) and error, in input order
+
+        :rtype: pandas.DataFrame
+        '''
+        unique_places = _getUniquePlaces(places)
+
+        async def geocode(place):
+            try:
+                return await self._getGeocode(place), None
+            except Exception as error:
+                return None, error
+
+        responses = await asyncio.gather(*[geocode(place) for place in unique_places.values()])
+        return _getCoordinatesDataFrame(places, unique_places, responses)
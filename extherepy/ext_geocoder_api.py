@@ -1,6 +1,13 @@
 #!/usr/bin/env python
 
 from herepy import GeocoderApi
+from typing import List
+import pandas as pd
+import numpy as np
+from extherepy.extConcurrency import mapConcurrent
+from extherepy.extCache import extResponseCache
+from extherepy import extInstrumentation
+from extherepy.extHttp import extSession, sendRequest, getGeocoderRequest, checkHerePyRequests
 
 class extGeocoderApi(GeocoderApi):
     '''
@@ -8,14 +15,58 @@ class extGeocoderApi(GeocoderApi):
     Find the original HerePy at https://github.com/abdullahselek/HerePy
     '''
 
-    def __init__(self, api_key: str = None, timeout: int = None):
+    def __init__(self, api_key: str = None, timeout: int = None, cache: extResponseCache = None, session: extSession = None):
         """Returns a RoutingApi instance.
         
         :param str api_key: HERE Api Key
         :param int timeout: Timeout limit for requests
+        :param extResponseCache cache: optional response cache
+        :param extSession session: optional pooled session, shared between APIs
         """
 
         super(extGeocoderApi, self).__init__(api_key, timeout)
+        if session is not None or cache is not None:
+            checkHerePyRequests(GeocoderApi)
+        self._cache = cache
+        self._session = session
+
+    def _GeocoderApi__get(self, data):
+        extInstrumentation.count('here.requests', api='free_form')
+        # HerePy sends the requests unless a session or a cache is configured
+        if self._session is None and self._cache is None:
+            return super(extGeocoderApi, self)._GeocoderApi__get(data)
+        if self._session is None:
+            return sendRequest(getGeocoderRequest(self._base_url, data), self._timeout)
+        return self._session.request(getGeocoderRequest(self._base_url, data), self._timeout)
+
+    def _getGeocode(self, place: str) -> dict:
+        '''This method returns the free_form geocoding response of a place
+
+        :param string place: place 
+
+        :returns: geocoder_response_dict: geocoding response
+
+        :rtype: dict 
+        '''
+        if self._cache is not None:
+            geocoder_params={'searchtext': _normalizePlace(place)}
+            # empty results are not cached, the place can be found later
+            return self._cache.getOrFetch('free_form', geocoder_params, lambda: self._fetchGeocode(place), cacheable=_hasLocation)
+        return self._fetchGeocode(place)
+
+    def _fetchGeocode(self, place: str) -> dict:
+        '''This method requests the free_form geocoding of a place and converts it to dict
+
+        :param string place: place 
+
+        :returns: geocoder_response_dict: geocoding response
+
+        :rtype: dict 
+        '''
+        with extInstrumentation.stage('geocoder.request'):
+            geocoder_response = self.free_form(searchtext=place)
+        with extInstrumentation.stage('geocoder.as_dict'):
+            return geocoder_response.as_dict()
 
     def getCoordinates(self, 
                         place: str) -> tuple:
@@ -27,10 +78,103 @@ class extGeocoderApi(GeocoderApi):
 
         :rtype: tuple 
         '''
-        geocoder_response=self.free_form(searchtext=place)
-        geocoder_response_dict=geocoder_response.as_dict()
+        geocoder_response_dict=self._getGeocode(place)
         latitude=geocoder_response_dict['items'][0]['position']['lat']
         longitude=geocoder_response_dict['items'][0]['position']['lng']
 
         coordinates=(latitude, longitude)
         return coordinates
+
+    def getCoordinatesBatch(self,
+                            places: List[str],
+                            max_workers: int = 8,
+                            rate_limit: float = None) -> pd.DataFrame:
+        '''This method geocodes a list of places concurrently
+
+        Places are normalized (case and whitespaces) and deduplicated, so each distinct place is requested once.
+        A failing place (including a place that is not a string, e.g. NaN) does not abort the batch, 
+        its error is reported in the 'error' column.
+
+        :param List[str] places: places 
+        :param int max_workers: maximum number of concurrent requests
+        :param float rate_limit: maximum number of requests per second (None for no limit)
+
+        :returns: coordinates_df: place, latitude[deg], longitude[deg], candidates (all the geocoding items) and error, in input order
+
+        :rtype: pandas.DataFrame 
+        '''
+        unique_places=_getUniquePlaces(places)
+
+        responses=mapConcurrent(self._getGeocode, list(unique_places.values()), max_workers=max_workers, rate_limit=rate_limit)
+
+        return _getCoordinatesDataFrame(places, unique_places, responses)
+
+def _getUniquePlaces(places: List[str]) -> dict:
+    '''This method deduplicates the places on the normalized place, the places that are not strings are skipped
+
+    :param List[str] places: places 
+
+    :returns: unique_places: first place of each normalized place
+
+    :rtype: dict 
+    '''
+    unique_places={}
+    for place in places:
+        if isinstance(place, str):
+            unique_places.setdefault(_normalizePlace(place), place)
+    return unique_places
+
+def _getCoordinatesDataFrame(places: List[str], unique_places: dict, responses: list) -> pd.DataFrame:
+    '''This method gathers the geocoding responses of the distinct places in input order
+
+    :param List[str] places: places 
+    :param dict unique_places: first place of each normalized place
+    :param list responses: (geocoder_response_dict, error) of each distinct place
+
+    :returns: coordinates_df: place, latitude[deg], longitude[deg], candidates (all the geocoding items) and error, in input order
+
+    :rtype: pandas.DataFrame 
+    '''
+    geocodes={}
+    for normalized_place, (geocoder_response_dict, error) in zip(unique_places.keys(), responses):
+        if error is None and not geocoder_response_dict.get('items'):
+            error=Exception(f"[ERROR] no location found for {unique_places[normalized_place]}")
+        if error is None:
+            candidates=geocoder_response_dict['items']
+            geocodes[normalized_place]=(candidates[0]['position']['lat'], candidates[0]['position']['lng'], candidates, None)
+        else:
+            geocodes[normalized_place]=(np.nan, np.nan, [], str(error))
+
+    coordinates=[]
+    for place in places:
+        try:
+            coordinates.append(geocodes[_normalizePlace(place)])
+        except ValueError as error:
+            coordinates.append((np.nan, np.nan, [], str(error)))
+    coordinates_df=pd.DataFrame(coordinates, columns=['latitude[deg]', 'longitude[deg]', 'candidates', 'error'])
+    coordinates_df.insert(0, 'place', list(places))
+    return coordinates_df
+
+def _normalizePlace(place: str) -> str:
+    '''This method normalizes a place name (case and whitespaces)
+
+    :param string place: place 
+
+    :returns: normalized place
+
+    :rtype: str 
+    '''
+    if not isinstance(place, str):
+        raise ValueError(f"[ERROR] place must be a string, got {place!r}")
+    return ' '.join(place.split()).lower()
+
+def _hasLocation(geocoder_response_dict: dict) -> bool:
+    '''This method tells if a geocoding response found a location (only those are cached)
+
+    :param dict geocoder_response_dict: geocoding response
+
+    :returns: True if the response has items
+
+    :rtype: bool 
+    '''
+    return bool(geocoder_response_dict.get('items'))
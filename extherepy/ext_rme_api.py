@@ -1,118 +1,652 @@
 #!/usr/bin/env python
 
 from herepy import RmeApi
-from datetime import datetime
 from extherepy import extUtils
 import io
+import operator
+import hashlib
 import pandas as pd
 import numpy as np
-from geopy import distance
+from extherepy import extDistance
+from extherepy.extCache import extResponseCache
+from extherepy.extHttp import extSession, sendRequest, getRmeRequest, checkHerePyRequests
+from extherepy.extMatch import extLocalMatcher
+from extherepy.extConcurrency import callWithRetry
+from extherepy import extGpx
+from extherepy import extStorage
+from extherepy import extInstrumentation
+from extherepy.extStream import extAccumulator, iterColumnBlocks, getNextDelta, getBlockOutput, concatColumn
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union, IO, List, Tuple, Iterable, Iterator, Dict
+
+RME_PDE_LAYERS = ['SPEED_LIMITS_FCn(*)']
 
 class extRmeApi(RmeApi):
     '''
     An extension of RoutingApi from HerePy.
     Find the original HerePy at https://github.com/abdullahselek/HerePy
     '''
-    def __init__(self, api_key: str = None, timeout: int = None):
+    def __init__(self, api_key: str = None, timeout: int = None, cache: extResponseCache = None, session: extSession = None):
         """Returns a RoutingApi instance.
         
         :param str api_key: HERE Api Key
         :param int timeout: Timeout limit for requests
+        :param extResponseCache cache: optional response cache
+        :param extSession session: optional pooled session, shared between APIs
         """
         super(extRmeApi, self).__init__(api_key, timeout)
+        if session is not None or cache is not None:
+            checkHerePyRequests(RmeApi)
+        self._cache = cache
+        self._session = session
+
+    def _RmeApi__get(self, data):
+        extInstrumentation.count('here.requests', api='match_route')
+        # HerePy sends the requests unless a session or a cache is configured
+        if self._session is None and self._cache is None:
+            return super(extRmeApi, self)._RmeApi__get(data)
+        if self._session is None:
+            return sendRequest(getRmeRequest(self._base_url, data), self._timeout)
+        return self._session.request(getRmeRequest(self._base_url, data, compress=self._session.compress_requests), self._timeout)
 
     def getRouteReport(self,
-                       gpx_file: str,
-                       return_GPS_trace: bool =False):
+                       gpx_file: Union[str, IO, pd.DataFrame],
+                       return_GPS_trace: bool =False,
+                       distance_method: str ='geodesic',
+                       window_size: int =None,
+                       window_duration: float =None,
+                       overlap: int =20,
+                       max_workers: int =4,
+                       compact: bool =False,
+                       local_matcher: extLocalMatcher =None,
+                       min_confidence: float =0.5):
         """Returns a Route Match report
+
+        With a local_matcher the trace is first matched offline on the geometry of previous reports, match_route is 
+        only requested when the local confidence is below min_confidence.
+
+        Long traces can be matched in overlapping windows (window_size and/or window_duration): the gpx file is parsed 
+        incrementally, the windows are matched concurrently and stitched in one report, keeping each overlapping point once 
+        and numbering span/routelink consistently across the windows.
         
-        :param str gpx_file: path to .gpx file
+        :param gpx_file: path to .gpx file, file-like object or dataframe of track points with 'latitude', 'longitude', 
+                         'time' (unixtime [s] or datetime) and optionally 'altitude' columns (see extUtils.gpx2dataframe)
         :param bool return_polyline: return spans 
+        :param str distance_method: distance method 'geodesic', 'haversine' or 'equirectangular' (see extDistance)
+        :param int window_size: maximum number of points matched per request (None for a single request)
+        :param float window_duration: maximum duration of the trace matched per request [s] (None for a single request)
+        :param int overlap: number of points shared by consecutive windows
+        :param int max_workers: maximum number of concurrent requests
+        :param bool compact: return compact dtypes (see extStorage.compactDataFrame)
+        :param extLocalMatcher local_matcher: optional offline matcher tried before match_route
+        :param float min_confidence: minimum confidence of the local match (0 to 1)
 
         :returns: route_profile_df: Route Profile Info
 
         :rtype: pandas.DataFrame 
         """
-        with io.open(gpx_file, encoding="utf-8") as gpx_file:
-                gpx_content = gpx_file.read()
+        with extInstrumentation.stage('rme.getRouteReport', return_GPS_trace=return_GPS_trace, windowed=bool(window_size or window_duration)):
+            gpx_file=_getGpxInput(gpx_file)
+            route_profile=None
+            if local_matcher is not None:
+                gpx_file=io.StringIO(_getGpxContent(gpx_file))      # read once, matched locally and possibly remotely
+                route_profile=_getLocalRmeColumns(local_matcher, gpx_file.getvalue(), min_confidence)
+            if route_profile is None and (window_size or window_duration):
+                route_profile=self._getWindowedRmeProfile(gpx_file, window_size, window_duration, overlap, max_workers)
+            elif route_profile is None:
+                route_profile=_getRmeColumns(self._getRmeResponse(_getGpxContent(gpx_file)))
+
+            route_profile_df=_getRmeReport(route_profile, return_GPS_trace, distance_method)
+            return extStorage.compactDataFrame(route_profile_df) if compact else route_profile_df
+
+    def iterRouteReport(self,
+                        gpx_file: Union[str, IO, pd.DataFrame],
+                        return_GPS_trace: bool =False,
+                        distance_method: str ='geodesic',
+                        window_size: int =None,
+                        window_duration: float =None,
+                        overlap: int =20,
+                        max_workers: int =4,
+                        block_size: int =100000,
+                        output: str ='dataframe',
+                        local_matcher: extLocalMatcher =None,
+                        min_confidence: float =0.5) -> Iterator:
+        """Yields a Route Match report in blocks of block_size rows
+
+        The blocks hold the same rows and values as getRouteReport, the cumulative distance and time being carried 
+        across the blocks: they can be written to a Parquet file or a database as they come. With windows 
+        (window_size and/or window_duration) the trace point report is built window by window, the memory being 
+        bounded by the windows in flight whatever the trace length. The span report (return_GPS_trace=False) 
+        groups the trace points of the whole trace before being yielded in blocks.
         
-        rme_response = self.match_route(gpx_content, pde_layers=['SPEED_LIMITS_FCn(*)'])
-        rme_response_dict=rme_response.as_dict()
-
-        route_profile=[]
-
-        # parsing dictionary entries
-        RouteLinks=rme_response_dict['RouteLinks']
-        TracePoints=rme_response_dict['TracePoints']
-
-        for id in range(len(TracePoints)):
-            TracePoint=TracePoints[id]
-            RouteLink=RouteLinks[TracePoint['routeLinkSeqNrMatched']]
-            route_profile.append({  'span': TracePoint['routeLinkSeqNrMatched'],
-                                    'routelink': TracePoint['routeLinkSeqNrMatched'], 
-                                    'tracepoint': id,
-                                    'timestamp': str(datetime.fromtimestamp(TracePoint['timestamp']/1000)),
-                                    'GPS_latitude[deg]': TracePoint['lat'],
-                                    'GPS_longitude[deg]': TracePoint['lon'],
-                                    'latitude[deg]': TracePoint['latMatched'],              # matched by here
-                                    'longitude[deg]': TracePoint['lonMatched'],             # matched by here
-                                    'GPS_altitude[m]': TracePoint['elevation'],
-                                    'confidenceValue[-]': TracePoint['confidenceValue'],
-                                    'confidence[-]': RouteLink['confidence'],
-                                    'functionalClass': RouteLink['functionalClass'],
-                                    'GPS_vehicleSpeed[km/h]': extUtils.mps2kmph(np.round(np.array(TracePoint['speedMps']), 1)),
-                                    #'speedLimit[km/h]': float(RouteLink['attributes']['SPEED_LIMITS_FCN'][0]['FROM_REF_SPEED_LIMIT'])        # FROM_REF_SPEEED_LIMIT from A to B
-                                                                                                                                            # TO_REF_SPEED_LIMIT from B to A
-        })
-        route_profile_df = pd.DataFrame(route_profile)  # make pandas dataframe
+        :param gpx_file: path to .gpx file, file-like object or dataframe of track points (see getRouteReport)
+        :param bool return_GPS_trace: return the GPS trace points, the spans with their statistics otherwise
+        :param str distance_method: distance method 'geodesic', 'haversine' or 'equirectangular' (see extDistance)
+        :param int window_size: maximum number of points matched per request (None for a single request)
+        :param float window_duration: maximum duration of the trace matched per request [s] (None for a single request)
+        :param int overlap: number of points shared by consecutive windows
+        :param int max_workers: maximum number of concurrent requests
+        :param int block_size: number of rows per block
+        :param str output: 'dataframe' or 'arrow' (pyarrow.RecordBatch, see extStream.getBlockOutput)
+        :param extLocalMatcher local_matcher: optional offline matcher tried before match_route
+        :param float min_confidence: minimum confidence of the local match (0 to 1)
+
+        :returns: iterator of report blocks
+
+        :rtype: Iterator[Union[pandas.DataFrame, pyarrow.RecordBatch]]
+        """
+        if block_size < 1:
+            raise ValueError("[ERROR] block_size must be positive")
+        gpx_file=_getGpxInput(gpx_file)
+        route_profile=None
+        if local_matcher is not None:
+            gpx_file=io.StringIO(_getGpxContent(gpx_file))      # read once, matched locally and possibly remotely
+            route_profile=_getLocalRmeColumns(local_matcher, gpx_file.getvalue(), min_confidence)
+        if route_profile is not None:
+            chunks=[route_profile]
+        elif window_size or window_duration:
+            chunks=({key: _getColumnValues(route_profile_df[key]) for key in route_profile_df.columns} 
+                    for route_profile_df in self._iterWindowedRmeProfiles(gpx_file, window_size, window_duration, overlap, max_workers))
+        else:
+            chunks=[_getRmeColumns(self._getRmeResponse(_getGpxContent(gpx_file)))]
 
         if return_GPS_trace==False:
-            route_profile_df.drop(['tracepoint', 'GPS_latitude[deg]', 'GPS_longitude[deg]', 'confidenceValue[-]', 'GPS_vehicleSpeed[km/h]'], axis=1, inplace=True)
-            route_profile_df=route_profile_df.drop_duplicates(subset='span', keep='first') # get only the spans 
-            waypoints = list(route_profile_df[['latitude[deg]', 'longitude[deg]']].to_records(index=False))
+            # spans can gather trace points of the whole trace
+            route_profile_df=_getRmeSpanProfile(_concatColumns(chunks))
+            chunks=[dict({key: _getColumnValues(route_profile_df[key]) for key in route_profile_df.columns}, index=route_profile_df.index.values)]
         else:
-            waypoints = list(route_profile_df[['GPS_latitude[deg]', 'GPS_longitude[deg]']].to_records(index=False))
+            chunks=_indexColumns(chunks)
+
+        accumulator=extAccumulator()
+        for block, next_row in iterColumnBlocks(chunks, block_size):
+            index=block.pop('index')
+            with extInstrumentation.stage('rme.block', rows=len(index)):
+                route_profile_df=_addRmeDerivedColumns(pd.DataFrame(block, index=index), next_row, accumulator, return_GPS_trace, distance_method)
+            yield getBlockOutput(route_profile_df, output)
+
+    def _getRmeResponse(self, gpx_content: str) -> dict:
+        """Returns the match_route response of a gpx document
         
-        delta_distance=[distance.geodesic(waypoints[i], waypoints[i + 1]).m for i in
-                                range(0, len(waypoints) - 1)]  # compute geodesic distance based on geographic coordinates
-        delta_distance.append(0)
-        route_profile_df['length[m]']=delta_distance
-
-        # compute derived information
-        # compute distance
-        delta_distance=np.round(delta_distance, 1).tolist() # round to 0.1 meter precision
-        distance_f = np.cumsum(delta_distance)
-        distance_i = np.insert(distance_f[:-1], 0, 0)
+        :param str gpx_content: gpx document
+
+        :returns: rme_response_dict: match_route response
+
+        :rtype: dict 
+        """
+        if self._cache is not None:
+            return self._cache.getOrFetch('match_route', _getRmeCacheParams(gpx_content), lambda: self._fetchRme(gpx_content))
+        return self._fetchRme(gpx_content)
+
+    def _fetchRme(self, gpx_content: str) -> dict:
+        """Requests the match_route response of a gpx document and converts it to dict
+        
+        :param str gpx_content: gpx document
+
+        :returns: rme_response_dict: match_route response
+
+        :rtype: dict 
+        """
+        with extInstrumentation.stage('rme.request', gpx_size=len(gpx_content)):
+            rme_response = self.match_route(gpx_content, pde_layers=RME_PDE_LAYERS)
+        with extInstrumentation.stage('rme.as_dict'):
+            return rme_response.as_dict()
+
+    def _getWindowedRmeProfile(self,
+                               gpx_file: Union[str, IO],
+                               window_size: int =None,
+                               window_duration: float =None,
+                               overlap: int =20,
+                               max_workers: int =4) -> pd.DataFrame:
+        """Returns the trace point profile of a gpx file matched in overlapping windows
         
-        # compute time 
-        timestamps=route_profile_df['timestamp'].tolist()
-        delta_time = [(datetime.strptime(timestamps[i+1], '%Y-%m-%d %H:%M:%S')-datetime.strptime(timestamps[i], '%Y-%m-%d %H:%M:%S')).total_seconds()
-                    for i in range(0, len(timestamps) - 1)]
-        delta_time.append(0)
-        time_f = np.cumsum(delta_time)
-        time_i = np.insert(time_f[:-1], 0, 0)
-
-        # compute altitude
-        delta_altitude = -route_profile_df['GPS_altitude[m]'].diff(periods=-1).fillna(0).values
-        altitude_i = route_profile_df['GPS_altitude[m]'].values
-        altitude_f = altitude_i + delta_altitude
-
-        # compute speed
-        vehicleSpeed=np.divide(np.array(delta_distance), np.array(delta_time), where=np.array(delta_time)!=0)
-
-        # integrate in dataframe
-        route_profile_df['distance_i[m]'] = distance_i
-        route_profile_df['distance_f[m]'] = distance_f
-        route_profile_df['delta_distance[m]'] = delta_distance
-
-        route_profile_df['time_i[s]'] = time_i
-        route_profile_df['time_f[s]'] = time_f
-        route_profile_df['delta_time[s]'] = delta_time
-
-        route_profile_df['altitude_i[m]'] = altitude_i
-        route_profile_df['altitude_f[m]'] = altitude_f
-        route_profile_df['delta_altitude[m]'] = delta_altitude        
-
-        route_profile_df['vehicleSpeed[km/h]']=extUtils.mps2kmph(np.round(vehicleSpeed, 1))
-
-        return route_profile_df
\ No newline at end of file
+        :param gpx_file: path to .gpx file or file-like object
+        :param int window_size: maximum number of points matched per request
+        :param float window_duration: maximum duration of the trace matched per request [s]
+        :param int overlap: number of points shared by consecutive windows
+        :param int max_workers: maximum number of concurrent requests
+
+        :returns: route_profile_df: trace point profile
+
+        :rtype: pandas.DataFrame 
+        """
+        return pd.concat(list(self._iterWindowedRmeProfiles(gpx_file, window_size, window_duration, overlap, max_workers)), ignore_index=True)
+
+    def _iterWindowedRmeProfiles(self,
+                                 gpx_file: Union[str, IO],
+                                 window_size: int =None,
+                                 window_duration: float =None,
+                                 overlap: int =20,
+                                 max_workers: int =4) -> Iterator[pd.DataFrame]:
+        """Yields the stitched trace point profile of each window of a gpx file, in order (see _getWindowedRmeProfile)
+        
+        :param gpx_file: path to .gpx file or file-like object
+        :param int window_size: maximum number of points matched per request
+        :param float window_duration: maximum duration of the trace matched per request [s]
+        :param int overlap: number of points shared by consecutive windows
+        :param int max_workers: maximum number of concurrent requests
+
+        :returns: iterator of trace point profiles
+
+        :rtype: Iterator[pandas.DataFrame] 
+        """
+        def match(points):
+            fetch=lambda: self._getRmeResponse(extGpx.getGpxContent(points))
+            # the session retries the transient errors itself, the calls are not retried twice
+            return _getWindowProfile(fetch() if self._session is not None else callWithRetry(fetch))
+
+        def iterMatches(executor):
+            # a window is stitched once the cut of the next window is known, at most 2*max_workers windows are held in memory
+            matches=[]
+            for points, window_overlap in extGpx.iterGpxWindows(gpx_file, window_size, window_duration, overlap):
+                if matches:
+                    cuts.append(_getWindowCut(points, window_overlap))
+                if len(matches)>=2*max_workers:
+                    yield matches.pop(0).result()
+                matches.append(executor.submit(match, points))
+            cuts.append(np.inf)
+            for future in matches:
+                yield future.result()
+
+        # match the windows concurrently
+        cuts=[-np.inf]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            yield from _iterStitchedWindowProfiles(iterMatches(executor), cuts)
+
+
+def _getGpxContent(gpx_file: Union[str, IO]) -> str:
+    """Returns the content of a gpx file
+
+    :param gpx_file: path to .gpx file or file-like object
+
+    :returns: gpx_content: gpx document
+
+    :rtype: str 
+    """
+    if hasattr(gpx_file, 'read'):
+        gpx_content = gpx_file.read()
+    else:
+        with io.open(gpx_file, encoding="utf-8") as gpx_file:
+                gpx_content = gpx_file.read()
+    if isinstance(gpx_content, bytes):
+        gpx_content = gpx_content.decode('utf-8')
+    return gpx_content
+
+def _getGpxInput(gpx_file: Union[str, IO, pd.DataFrame]) -> Union[str, IO]:
+    """Returns a gpx file or file-like object from the accepted route report inputs
+
+    :param gpx_file: path to .gpx file, file-like object or dataframe of track points
+
+    :returns: gpx_file: path to .gpx file or file-like object
+
+    :rtype: Union[str, IO] 
+    """
+    if isinstance(gpx_file, pd.DataFrame):
+        return io.StringIO(extGpx.writeGpxDataFrame(io.StringIO(), 
+                                                    gpx_file, 
+                                                    times_colname='time', 
+                                                    alts_colname='altitude' if 'altitude' in gpx_file.columns else None, 
+                                                    return_xml=True))
+    return gpx_file
+
+def _getLocalRmeColumns(local_matcher: extLocalMatcher, gpx_content: str, min_confidence: float) -> Dict[str, np.array]:
+    """Returns the trace point profile columns of a gpx document matched offline
+
+    :param extLocalMatcher local_matcher: offline matcher
+    :param str gpx_content: gpx document
+    :param float min_confidence: minimum confidence of the match (0 to 1)
+
+    :returns: route_profile: columns of the trace point profile (see _getRmeColumns), None below min_confidence
+
+    :rtype: Dict[str, numpy.array] 
+    """
+    with extInstrumentation.stage('rme.localMatch'):
+        blocks=list(extGpx.iterGpxBlocks(io.StringIO(gpx_content)))
+        trace={key: np.concatenate([block[key] for block in blocks]) for key in blocks[0]} if blocks else None
+        route_profile, confidence=local_matcher.match(trace) if trace is not None else (None, 0.0)
+    if route_profile is None or confidence<min_confidence:
+        extInstrumentation.count('rme.local_fallbacks')
+        return None
+    extInstrumentation.count('rme.local_matches')
+    return route_profile
+
+def _getRmeCacheParams(gpx_content: str) -> dict:
+    """Returns the cache key parameters of a match_route request
+
+    :param str gpx_content: gpx document
+
+    :returns: rme_params: hash of the gpx document and pde layers
+
+    :rtype: dict 
+    """
+    return {'gpx_file_content': hashlib.sha256(gpx_content.encode('utf-8')).hexdigest(), 
+            'pde_layers': RME_PDE_LAYERS}
+
+def _getWindowCut(points: List[tuple], window_overlap: int) -> float:
+    """Returns the time splitting a window from the previous one
+
+    Overlapping points are kept from the window in which they are the farthest from the edge.
+
+    :param List[tuple] points: track points of the window (see extGpx.iterGpxWindows)
+    :param int window_overlap: number of points shared with the previous window
+
+    :returns: cut: unixtime [ms] of the first point kept from the window
+
+    :rtype: float 
+    """
+    cut_time=points[window_overlap//2][3]
+    if cut_time is None:
+        # the windows are stitched on the trace point timestamps
+        raise ValueError("[ERROR] windowed matching requires timestamped track points (<time>), "
+                         "please add the timestamps or match the trace without window_size/window_duration")
+    return pd.Timestamp(cut_time).value//10**6
+
+def _getWindowProfile(rme_response_dict: dict) -> Tuple[pd.DataFrame, list]:
+    """Returns the trace point profile of a window and the matched link of each trace point
+
+    :param dict rme_response_dict: match_route response
+
+    :returns: route_profile_df: trace point profile, link_ids: link id of each trace point
+
+    :rtype: Tuple[pandas.DataFrame, list] 
+    """
+    RouteLinks=rme_response_dict['RouteLinks']
+    TracePoints=rme_response_dict['TracePoints']
+    link_ids=[RouteLinks[TracePoint['routeLinkSeqNrMatched']].get('linkId') for TracePoint in TracePoints]
+    return _getRmeProfile(rme_response_dict), link_ids
+
+def _iterStitchedWindowProfiles(window_profiles: Iterable[Tuple[pd.DataFrame, list]], cuts: List[float]) -> Iterator[pd.DataFrame]:
+    """Yields the stitched trace point profile of each overlapping window
+
+    Each overlapping point is kept once and span/routelink are numbered consistently across the windows.
+    The cuts are read when a window is stitched: the cut following a window can be appended while the previous 
+    windows are consumed.
+
+    :param Iterable window_profiles: (route_profile_df, link_ids) of each window in order (see _getWindowProfile)
+    :param List[float] cuts: window cuts (see _getWindowCut), -inf before the first window and inf after the last one
+
+    :returns: iterator of trace point profiles, numbered across the windows
+
+    :rtype: Iterator[pandas.DataFrame] 
+    """
+    stitcher=_extWindowStitcher(cuts)
+    for route_profile_df, link_ids in window_profiles:
+        route_profile_df=stitcher.stitch(route_profile_df, link_ids)
+        if route_profile_df is not None:
+            yield route_profile_df
+
+class _extWindowStitcher(object):
+    '''
+    Stitches the trace point profiles of overlapping windows one window at a time, in order.
+    The span/routelink/tracepoint numbering is carried across the windows (see _iterStitchedWindowProfiles).
+    '''
+
+    def __init__(self, cuts: List[float]):
+        """Returns a _extWindowStitcher instance.
+
+        :param List[float] cuts: window cuts (see _getWindowCut), -inf before the first window and inf after the last one,
+                                 the cut following a window can be appended until the window is stitched
+        """
+        self._cuts=cuts
+        self._window=0
+        self._last_span=self._last_link_id=None
+        self._n_points=0
+
+    def stitch(self, route_profile_df: pd.DataFrame, link_ids: list) -> pd.DataFrame:
+        """Returns the stitched trace point profile of the next window
+
+        :param pandas.DataFrame route_profile_df: trace point profile of the window (see _getWindowProfile)
+        :param list link_ids: route link of each trace point of the window
+
+        :returns: route_profile_df: trace point profile numbered across the windows, None if no point is kept
+
+        :rtype: pandas.DataFrame 
+        """
+        window=self._window
+        self._window+=1
+        timestamps=extUtils.getEpochMilliseconds(route_profile_df['timestamp'])
+        keep=(timestamps>=self._cuts[window]) & (timestamps<self._cuts[window+1])
+        route_profile_df=route_profile_df[keep]
+        link_ids=[link_id for link_id, kept in zip(link_ids, keep) if kept]
+        if len(route_profile_df)==0:
+            return None
+
+        span=route_profile_df['span'].values
+        if self._last_span is None:
+            first_span=span[0]
+        elif link_ids[0] is not None and link_ids[0]==self._last_link_id:
+            first_span=self._last_span        # same route link across the windows
+        else:
+            first_span=self._last_span+1
+        span=span-span[0]+first_span
+        route_profile_df=route_profile_df.assign(span=span, routelink=span, tracepoint=np.arange(self._n_points, self._n_points+len(span)))
+        self._last_span, self._last_link_id=span[-1], link_ids[-1]
+        self._n_points+=len(span)
+        return route_profile_df
+
+def _concatColumns(chunks: Iterable[Dict[str, np.array]]) -> Dict[str, np.array]:
+    """Concatenates chunks of trace point profile columns
+
+    :param Iterable chunks: chunks of columns (see _getRmeColumns)
+
+    :returns: route_profile: columns of the trace point profile
+
+    :rtype: Dict[str, numpy.array] 
+    """
+    chunks=list(chunks)
+    if not chunks:
+        raise ValueError("[ERROR] the gpx file has no track point")
+    return {key: concatColumn([chunk[key] for chunk in chunks]) for key in chunks[0]}
+
+def _indexColumns(chunks: Iterable[Dict[str, np.array]]) -> Iterator[Dict[str, np.array]]:
+    """Adds the row index to chunks of trace point profile columns
+
+    :param Iterable chunks: chunks of columns (see _getRmeColumns)
+
+    :returns: iterator of chunks with an index column
+
+    :rtype: Iterator[Dict[str, numpy.array]] 
+    """
+    n_points=0
+    for chunk in chunks:
+        n_rows=len(next(iter(chunk.values())))
+        yield dict(chunk, index=np.arange(n_points, n_points+n_rows))
+        n_points+=n_rows
+
+def _getColumnValues(column: Union[pd.Series, np.array]) -> np.array:
+    """Returns the values of a trace point profile column, the tz-aware timestamps being kept as a pandas array
+
+    :param column: dataframe column or array
+
+    :returns: values
+
+    :rtype: Union[numpy.array, pandas.arrays.DatetimeArray] 
+    """
+    if not isinstance(column, pd.Series):
+        return column
+    return column.array if isinstance(column.dtype, pd.DatetimeTZDtype) else column.values
+
+def _getRecordColumn(records: List[dict], key: str, dtype: type = np.float64) -> np.array:
+    """Returns a field of the records of a match_route response as an array, filled in one pass
+
+    :param List[dict] records: TracePoints or RouteLinks
+    :param str key: field
+    :param type dtype: dtype of the array
+
+    :returns: column: field of each record
+
+    :rtype: numpy.array 
+    """
+    return np.fromiter(map(operator.itemgetter(key), records), dtype=dtype, count=len(records))
+
+def _getRmeProfile(rme_response_dict: dict) -> pd.DataFrame:
+    """Returns the trace point profile of a match_route response
+    
+    :param dict rme_response_dict: match_route response
+
+    :returns: route_profile_df: trace point profile
+
+    :rtype: pandas.DataFrame 
+    """
+    route_profile=_getRmeColumns(rme_response_dict)
+    with extInstrumentation.stage('rme.dataframe'):
+        return pd.DataFrame(route_profile)  # make pandas dataframe
+
+def _getRmeColumns(rme_response_dict: dict) -> Dict[str, np.array]:
+    """Returns the trace point profile columns of a match_route response
+    
+    :param dict rme_response_dict: match_route response
+
+    :returns: route_profile: column of the trace point profile, the timestamps being tz-aware (datetime64[ms, UTC])
+
+    :rtype: Dict[str, numpy.array] 
+    """
+    # parsing dictionary entries
+    RouteLinks=rme_response_dict['RouteLinks']
+    TracePoints=rme_response_dict['TracePoints']
+    extInstrumentation.count('rme.tracepoints', len(TracePoints))
+    extInstrumentation.count('rme.routelinks', len(RouteLinks))
+    with extInstrumentation.stage('rme.rows'):
+        # trace point fields are extracted straight into arrays, route link fields once per link
+        routelink=_getRecordColumn(TracePoints, 'routeLinkSeqNrMatched', np.int64)
+        route_profile={ 'span': routelink,
+                        'routelink': routelink, 
+                        'tracepoint': np.arange(len(TracePoints)),
+                        'timestamp': extUtils.getUtcTimestamps(_getRecordColumn(TracePoints, 'timestamp', np.int64)),   # epoch milliseconds (UTC)
+                        'GPS_latitude[deg]': _getRecordColumn(TracePoints, 'lat'),
+                        'GPS_longitude[deg]': _getRecordColumn(TracePoints, 'lon'),
+                        'latitude[deg]': _getRecordColumn(TracePoints, 'latMatched'),              # matched by here
+                        'longitude[deg]': _getRecordColumn(TracePoints, 'lonMatched'),             # matched by here
+                        'GPS_altitude[m]': _getRecordColumn(TracePoints, 'elevation'),
+                        'confidenceValue[-]': _getRecordColumn(TracePoints, 'confidenceValue'),
+                        'confidence[-]': _getRecordColumn(RouteLinks, 'confidence')[routelink],
+                        'functionalClass': _getRecordColumn(RouteLinks, 'functionalClass', np.int64)[routelink],
+                        'GPS_vehicleSpeed[km/h]': extUtils.mps2kmph(np.round(_getRecordColumn(TracePoints, 'speedMps'), 1)),
+                        #'speedLimit[km/h]': float(RouteLink['attributes']['SPEED_LIMITS_FCN'][0]['FROM_REF_SPEED_LIMIT'])        # FROM_REF_SPEEED_LIMIT from A to B
+                                                                                                                                # TO_REF_SPEED_LIMIT from B to A
+        }
+    return route_profile
+
+def _getRmeSpanProfile(route_profile: Union[Dict[str, np.array], pd.DataFrame]) -> pd.DataFrame:
+    """Returns the span profile of a trace point profile, without building the trace point rows
+
+    Each span takes the matched coordinates, timestamp and altitude of its first trace point and the statistics 
+    (altitude, GPS speed, confidence) of its trace points. The rows are indexed as in the trace point profile 
+    (index of the first trace point of the span).
+    
+    :param route_profile: trace point profile columns (see _getRmeColumns) or dataframe
+
+    :returns: route_profile_df: span profile
+
+    :rtype: pandas.DataFrame 
+    """
+    with extInstrumentation.stage('rme.spans'):
+        first, order, starts, points=extUtils.getSpanGroups(np.asarray(route_profile['span']))
+        def reduce(ufunc, key):
+            return ufunc.reduceat(np.asarray(route_profile[key])[order], starts)
+
+        span_profile={key: _getColumnValues(route_profile[key])[first] for key in ['span', 'routelink', 'timestamp', 'latitude[deg]', 'longitude[deg]', 
+                                                                             'GPS_altitude[m]', 'confidence[-]', 'functionalClass']}
+        span_profile.update({'points': points,
+                             'GPS_altitude_min[m]': reduce(np.minimum, 'GPS_altitude[m]'),
+                             'GPS_altitude_mean[m]': reduce(np.add, 'GPS_altitude[m]')/points,
+                             'GPS_altitude_max[m]': reduce(np.maximum, 'GPS_altitude[m]'),
+                             'GPS_vehicleSpeed_min[km/h]': reduce(np.minimum, 'GPS_vehicleSpeed[km/h]'),
+                             'GPS_vehicleSpeed_mean[km/h]': reduce(np.add, 'GPS_vehicleSpeed[km/h]')/points,
+                             'GPS_vehicleSpeed_max[km/h]': reduce(np.maximum, 'GPS_vehicleSpeed[km/h]'),
+                             'confidenceValue_min[-]': reduce(np.minimum, 'confidenceValue[-]'),
+                             'confidenceValue_mean[-]': reduce(np.add, 'confidenceValue[-]')/points})
+    with extInstrumentation.stage('rme.dataframe'):
+        index=route_profile.index[first] if isinstance(route_profile, pd.DataFrame) else first
+        return pd.DataFrame(span_profile, index=index)
+
+def _getRmeReport(route_profile: Union[Dict[str, np.array], pd.DataFrame],
+                  return_GPS_trace: bool =False,
+                  distance_method: str ='geodesic') -> pd.DataFrame:
+    """Returns a Route Match report from the trace point profile
+    
+    :param route_profile: trace point profile columns (see _getRmeColumns) or dataframe
+    :param bool return_GPS_trace: return the GPS trace points, the spans with their statistics otherwise
+    :param str distance_method: distance method 'geodesic', 'haversine' or 'equirectangular' (see extDistance)
+
+    :returns: route_profile_df: Route Profile Info
+
+    :rtype: pandas.DataFrame 
+    """
+    if return_GPS_trace==False:
+        route_profile_df = _getRmeSpanProfile(route_profile) # get only the spans 
+    elif isinstance(route_profile, pd.DataFrame):
+        route_profile_df = route_profile
+    else:
+        with extInstrumentation.stage('rme.dataframe'):
+            route_profile_df = pd.DataFrame(route_profile)  # make pandas dataframe
+    return _addRmeDerivedColumns(route_profile_df, None, extAccumulator(), return_GPS_trace, distance_method)
+
+def _addRmeDerivedColumns(route_profile_df: pd.DataFrame,
+                          next_row: Dict[str, np.array],
+                          accumulator: extAccumulator,
+                          return_GPS_trace: bool =False,
+                          distance_method: str ='geodesic') -> pd.DataFrame:
+    """Adds the derived columns (distance, time, altitude, speed) to a block of a Route Match report
+    
+    :param pandas.DataFrame route_profile_df: block of the trace point or span profile
+    :param dict next_row: first row of the next block (None for the last block, see extStream.iterColumnBlocks)
+    :param extAccumulator accumulator: cumulative distance and time of the previous blocks
+    :param bool return_GPS_trace: trace point profile, span profile otherwise
+    :param str distance_method: distance method 'geodesic', 'haversine' or 'equirectangular' (see extDistance)
+
+    :returns: route_profile_df: Route Profile Info
+
+    :rtype: pandas.DataFrame 
+    """
+    # the trace points are measured on the GPS coordinates, the spans on the matched ones
+    latitude_key, longitude_key = ('GPS_latitude[deg]', 'GPS_longitude[deg]') if return_GPS_trace else ('latitude[deg]', 'longitude[deg]')
+    latitudes = route_profile_df[latitude_key].values
+    longitudes = route_profile_df[longitude_key].values
+    if next_row is not None:
+        latitudes = np.concatenate([latitudes, next_row[latitude_key]])
+        longitudes = np.concatenate([longitudes, next_row[longitude_key]])
+    
+    with extInstrumentation.stage('rme.distances', method=distance_method, points=len(route_profile_df)):
+        delta_distance=extDistance.getSegmentLengths(latitudes, longitudes, method=distance_method) # compute geodesic distance based on geographic coordinates
+    if next_row is None:
+        delta_distance=np.append(delta_distance, 0)
+    route_profile_df['length[m]']=delta_distance
+
+    # compute derived information
+    # compute distance
+    delta_distance=np.round(delta_distance, 1) # round to 0.1 meter precision
+    distance_i, distance_f = accumulator.accumulate('distance', delta_distance)
+    
+    # compute time 
+    timestamps=extUtils.getEpochMilliseconds(route_profile_df['timestamp'])
+    delta_time = getNextDelta(timestamps, None if next_row is None else extUtils.getEpochMilliseconds(next_row['timestamp']))/1000
+    time_i, time_f = accumulator.accumulate('time', delta_time)
+
+    # compute altitude
+    altitude_i = route_profile_df['GPS_altitude[m]'].values
+    delta_altitude = getNextDelta(altitude_i, None if next_row is None else next_row['GPS_altitude[m]'])
+    altitude_f = altitude_i + delta_altitude
+
+    # compute speed
+    vehicleSpeed=np.divide(delta_distance, delta_time, out=np.zeros(len(delta_time)), where=delta_time!=0)
+
+    # integrate in dataframe
+    route_profile_df['distance_i[m]'] = distance_i
+    route_profile_df['distance_f[m]'] = distance_f
+    route_profile_df['delta_distance[m]'] = delta_distance
+
+    route_profile_df['time_i[s]'] = time_i
+    route_profile_df['time_f[s]'] = time_f
+    route_profile_df['delta_time[s]'] = delta_time
+
+    route_profile_df['altitude_i[m]'] = altitude_i
+    route_profile_df['altitude_f[m]'] = altitude_f
+    route_profile_df['delta_altitude[m]'] = delta_altitude        
+
+    route_profile_df['vehicleSpeed[km/h]']=extUtils.mps2kmph(np.round(vehicleSpeed, 1))
+
+    if return_GPS_trace==False:
+        # grade of the span from its first trace point to the first trace point of the next span
+        route_profile_df['grade[%]']=np.divide(100*delta_altitude, delta_distance, out=np.zeros(len(delta_distance)), where=delta_distance!=0)
+
+    return route_profile_df
@@ -3,166 +3,513 @@
 from herepy import RoutingApi
 import pandas as pd 
 from datetime import datetime
-import flexpolyline
-from typing import List, Dict, Union, Optional, Tuple
-from geopy import distance
+from typing import List, Dict, Union, Optional, Tuple, Iterator, Iterable
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
 import numpy as np
 from extherepy import extUtils 
+from extherepy import extDistance
+from extherepy import extStorage
+from extherepy import extInstrumentation
+from extherepy import extParse
+from extherepy.extStream import extAccumulator, iterColumnBlocks, getNextDelta, getBlockOutput
+from extherepy.extCache import extResponseCache
+from extherepy.extHttp import extSession, sendRequest, getRoutingRequest, checkHerePyRequests
+from extherepy.extConcurrency import extRateLimiter, callWithRetry, mapConcurrent
+
+ROUTE_RETURN_FIELDS = ['polyline', 'elevation']
+ROUTE_SPAN_FIELDS = ['speedLimit',
+                     'maxSpeed',
+                     'dynamicSpeedInfo',
+                     'segmentId',
+                     'segmentRef',
+                     'routeNumbers',
+                     'length',
+                     'duration',
+                     'baseDuration',
+                     'names',
+                     'countryCode',
+                     'functionalClass',
+                     'streetAttributes']
+
+# time dependent span data used to re-cost a route (spans require the polyline)
+TIMING_RETURN_FIELDS = ['polyline']
+TIMING_SPAN_FIELDS = ['dynamicSpeedInfo', 'length', 'duration', 'baseDuration']
 
 class extRoutingApi(RoutingApi):
     '''
     An extension of RoutingApi from HerePy.
     Find the original HerePy at https://github.com/abdullahselek/HerePy
     '''
-    def __init__(self, api_key: str = None, timeout: int = None):
+    def __init__(self, api_key: str = None, timeout: int = None, cache: extResponseCache = None, session: extSession = None):
         """Returns a RoutingApi instance.
         
         :param str api_key: HERE Api Key
         :param int timeout: Timeout limit for requests
+        :param extResponseCache cache: optional response cache
+        :param extSession session: optional pooled session, shared between APIs
         """
         super(extRoutingApi, self).__init__(api_key, timeout)
+        if session is not None or cache is not None:
+            checkHerePyRequests(RoutingApi)
+        self._cache = cache
+        self._session = session
+
+    def _RoutingApi__get(self, base_url, data, key, response_cls, manipulation_key=None, keys_for_manipulation=None, headers=None):
+        extInstrumentation.count('here.requests', api='route_v8')
+        # HerePy sends the requests unless a session or a cache is configured
+        if self._session is None and self._cache is None:
+            return super(extRoutingApi, self)._RoutingApi__get(base_url, data, key, response_cls, manipulation_key, keys_for_manipulation, headers)
+        if self._session is None:
+            return sendRequest(getRoutingRequest(base_url, data, response_cls, manipulation_key, keys_for_manipulation, headers), self._timeout)
+        return self._session.request(getRoutingRequest(base_url, data, response_cls, manipulation_key, keys_for_manipulation, headers), self._timeout)
 
     def getRouteReport(self,
                         waypoints: List[tuple], 
                         departure_time: datetime =datetime.now().strftime('%Y-%m-%dT%H:%M:%S'), 
-                        return_polyline: bool =False) -> pd.DataFrame:
+                        return_polyline: bool =False,
+                        distance_method: str ='geodesic',
+                        compact: bool =False) -> pd.DataFrame:
         '''This method returns a route report
 
         :param List[Tuple(float)] waypoints: route waypoints
         :param datetime departure_time: time of departure
         :param bool return_polyline: return polyline 
+        :param str distance_method: polyline distance method 'geodesic', 'haversine' or 'equirectangular' (see extDistance)
+        :param bool compact: return compact dtypes (see extStorage.compactDataFrame)
 
         :returns: route_profile_df: Route Profile Info
 
         :rtype: pandas.DataFrame 
         '''
+        with extInstrumentation.stage('routing.getRouteReport', return_polyline=return_polyline):
+            routing_response_dict = self._getRouteResponse(waypoints, departure_time)
+
+            # extract data from the API response
+            route_profile_df = _getRouteReport(routing_response_dict, return_polyline, distance_method)
+            return extStorage.compactDataFrame(route_profile_df) if compact else route_profile_df
+
+    def iterRouteReport(self,
+                        waypoints: List[tuple], 
+                        departure_time: datetime =datetime.now().strftime('%Y-%m-%dT%H:%M:%S'), 
+                        return_polyline: bool =False,
+                        distance_method: str ='geodesic',
+                        block_size: int =100000,
+                        output: str ='dataframe') -> Iterator:
+        '''This method yields a route report in blocks of block_size rows
+
+        The blocks hold the same rows and values as getRouteReport, the cumulative distance and time being carried 
+        across the blocks: they can be written to a Parquet file or a database as they come. The polyline is decoded 
+        section by section and the span attributes are broadcast to block_size points at a time.
+
+        :param List[Tuple(float)] waypoints: route waypoints
+        :param datetime departure_time: time of departure
+        :param bool return_polyline: return polyline 
+        :param str distance_method: polyline distance method 'geodesic', 'haversine' or 'equirectangular' (see extDistance)
+        :param int block_size: number of rows per block
+        :param str output: 'dataframe' or 'arrow' (pyarrow.RecordBatch, see extStream.getBlockOutput)
+
+        :returns: iterator of report blocks
+
+        :rtype: Iterator[Union[pandas.DataFrame, pyarrow.RecordBatch]]
+        '''
+        if block_size < 1:
+            raise ValueError("[ERROR] block_size must be positive")
+        routing_response_dict = self._getRouteResponse(waypoints, departure_time)
+        departure_time = _getDepartureTime(routing_response_dict)
+        chunks = _iterRouteProfile(routing_response_dict, block_size) if return_polyline else _iterRouteSpanProfile(routing_response_dict)
+
+        accumulator = extAccumulator()
+        for block, next_row in iterColumnBlocks(chunks, block_size):
+            index = block.pop('index')
+            with extInstrumentation.stage('routing.block', rows=len(index)):
+                route_profile_df = _addRouteDerivedColumns(pd.DataFrame(block, index=index), next_row, accumulator, departure_time, return_polyline, distance_method)
+            yield getBlockOutput(route_profile_df, output)
+
+    def _getRouteResponse(self,
+                          waypoints: List[tuple], 
+                          departure_time: str,
+                          return_fields: List[str] = ROUTE_RETURN_FIELDS,
+                          span_fields: List[str] = ROUTE_SPAN_FIELDS) -> dict:
+        '''This method requests a route_v8 route with the span information used by the route report
+
+        :param List[Tuple(float)] waypoints: route waypoints
+        :param str departure_time: time of departure
+        :param List[str] return_fields: route_v8 return fields
+        :param List[str] span_fields: route_v8 span fields
+
+        :returns: routing_response_dict: route_v8 response
+
+        :rtype: dict 
+        '''
+        routing_params=_getRoutingParams(waypoints, departure_time, return_fields, span_fields)
 
-        # input parsing
-        # define origin and destination
-        origin=waypoints[0]
-        destination=waypoints[-1]
-        # in case waypoints is more than two intermidiate routes are computed
-        if len(waypoints)>2:
-            via=waypoints[1:-1]
-        else:
-            via=None
-
-        routing_response=self.route_v8(transport_mode='car', 
-                                                origin=origin, 
-                                                destination=destination,
-                                                via=via,
-                                                departure_time=departure_time,
-                                                return_fields=['polyline', 'elevation'],
-                                                span_fields=['speedLimit',
-                                                                'maxSpeed',
-                                                                'dynamicSpeedInfo',
-                                                                'segmentId',
-                                                                'segmentRef',
-                                                                'routeNumbers',
-                                                                'length',
-                                                                'duration',
-                                                                'baseDuration',
-                                                                'names',
-                                                                'countryCode',
-                                                                'functionalClass',
-                                                                'streetAttributes'])
-        
-        # extract data from the API response
         # convert response to dict
-        routing_response_dict = routing_response.as_dict()
-        
-        route_profile = []
-        for route in range(len(routing_response_dict['routes'])):
-            route_data = routing_response_dict['routes'][route]  # loop through routes
-            for section in range(len(routing_response_dict['routes'][route]['sections'])):  # loop through sections
-                section_data = route_data['sections'][section]
-                departure_time=section_data['departure']['time']
-                polyline = section_data['polyline']
-                polyline_decoded = flexpolyline.decode(polyline)  # decode polyline
-                offsets = [section_data['spans'][span]['offset'] for span in range(len(section_data['spans']))]
-                for polyline_element in range(len(polyline_decoded)):  # loop through polyline elements
-                    span = sum((offset <= polyline_element for offset in offsets)) - 1  # get the span
-                    span_data = section_data['spans'][span]
-
-                    # treat missing data
-                    if 'speedLimit' in span_data.keys():
-                        speedLimit = span_data['speedLimit']
-                    else:
-                        speedLimit = 0
+        if self._cache is not None:
+            return self._cache.getOrFetch('route_v8', routing_params, lambda: self._fetchRoute(routing_params))
+        return self._fetchRoute(routing_params)
 
-                    if 'names' in span_data.keys():
-                        place = span_data['names'][0]['value']
-                    else:
-                        place = ''
+    def _fetchRoute(self, routing_params: dict) -> dict:
+        '''This method requests a route_v8 route and converts it to dict
+
+        :param dict routing_params: route_v8 keyword arguments
+
+        :returns: routing_response_dict: route_v8 response
+
+        :rtype: dict 
+        '''
+        with extInstrumentation.stage('routing.request'):
+            routing_response = self.route_v8(**routing_params)
+        with extInstrumentation.stage('routing.as_dict'):
+            return routing_response.as_dict()
+
+    def recostRouteReport(self,
+                          route_profile_df: pd.DataFrame,
+                          waypoints: List[tuple],
+                          departure_time: str) -> pd.DataFrame:
+        '''This method re-costs a route report for a new departure time
+
+        Only the time dependent span data (durations, traffic and base speed) is requested, the geometry, the places and the 
+        distances of the previous report are kept and the time columns are recomputed.
+
+        :param pandas.DataFrame route_profile_df: route report of the same waypoints (see getRouteReport)
+        :param List[Tuple(float)] waypoints: route waypoints
+        :param str departure_time: new time of departure
+
+        :returns: route_profile_df: Route Profile Info at the new departure time
+
+        :rtype: pandas.DataFrame 
+        '''
+        span_timing, response_departure_time = _getSpanTiming(self._getRouteResponse(waypoints, 
+                                                                                     departure_time, 
+                                                                                     return_fields=TIMING_RETURN_FIELDS, 
+                                                                                     span_fields=TIMING_SPAN_FIELDS))
+        index = _getTimingIndex(route_profile_df, span_timing)
 
-                    if 'maxSpeed' in span_data.keys():
-                        maxSpeed = span_data['maxSpeed']
+        route_profile_df = route_profile_df.copy()
+        for column in ['duration[s]', 'baseDuration[s]', 'trafficSpeed[km/h]', 'baseSpeed[km/h]']:
+            route_profile_df[column] = span_timing[column][index]
+        delta_time, time_i, time_f = _getTimeColumns(route_profile_df['delta_distance[m]'].values, 
+                                                     route_profile_df['trafficSpeed[km/h]'].values)
+        route_profile_df['time_i[s]'] = time_i
+        route_profile_df['time_f[s]'] = time_f
+        route_profile_df['delta_time[s]'] = delta_time
+        route_profile_df['timestamp'] = pd.Timestamp(response_departure_time)+pd.to_timedelta(time_i, unit='s')
+        return route_profile_df
+
+    def getDepartureTimeMatrix(self,
+                               route_profile_df: pd.DataFrame,
+                               waypoints: List[tuple],
+                               departure_times: List[str],
+                               channel: str = 'delta_time[s]',
+                               max_workers: int = 8,
+                               rate_limit: float = None,
+                               max_retries: int = 3,
+                               backoff: float = 1.0) -> pd.DataFrame:
+        '''This method re-costs a route report for many departure times (see recostRouteReport)
+
+        The time dependent span data of the departure times is requested concurrently and the time columns of all the 
+        departure times are computed at once. The departure times for which HERE returns a different route (or fails) 
+        get a row of NaN and are reported in matrix_df.attrs['rerouted'] (matrix_df.attrs['errors']).
+
+        :param pandas.DataFrame route_profile_df: route report of the same waypoints (see getRouteReport)
+        :param List[Tuple(float)] waypoints: route waypoints
+        :param List[str] departure_times: times of departure
+        :param str channel: 'delta_time[s]', 'time_i[s]', 'time_f[s]', 'trafficSpeed[km/h]', 'baseSpeed[km/h]',
+                            'duration[s]' or 'baseDuration[s]'
+        :param int max_workers: maximum number of concurrent requests
+        :param float rate_limit: maximum number of requests per second (None for no limit)
+        :param int max_retries: maximum number of retries of a failing request (ignored with a session, which retries them itself)
+        :param float backoff: initial retry delay [s], doubled at each retry
+
+        :returns: matrix_df: channel for each departure time (rows) and segment of route_profile_df (columns)
+
+        :rtype: pandas.DataFrame 
+        '''
+        span_columns = ['duration[s]', 'baseDuration[s]', 'trafficSpeed[km/h]', 'baseSpeed[km/h]']
+        if channel not in span_columns+['delta_time[s]', 'time_i[s]', 'time_f[s]']:
+            raise ValueError(f"[ERROR] channel must be one of {span_columns+['delta_time[s]', 'time_i[s]', 'time_f[s]']}")
+
+        # the session retries the transient errors itself, the calls are not retried twice
+        if self._session is not None:
+            max_retries = 0
+        responses = mapConcurrent(lambda departure_time: callWithRetry(lambda: self._getRouteResponse(waypoints, 
+                                                                                                     departure_time, 
+                                                                                                     return_fields=TIMING_RETURN_FIELDS, 
+                                                                                                     span_fields=TIMING_SPAN_FIELDS),
+                                                                       max_retries=max_retries,
+                                                                       backoff=backoff),
+                                  departure_times,
+                                  max_workers=max_workers,
+                                  rate_limit=rate_limit)
+
+        values = np.full((len(departure_times), len(route_profile_df)), np.nan)
+        rerouted = []
+        errors = {}
+        for row, (response, error) in enumerate(responses):
+            if error is not None:
+                errors[departure_times[row]] = str(error)
+                continue
+            span_timing, _ = _getSpanTiming(response)
+            try:
+                index = _getTimingIndex(route_profile_df, span_timing)
+            except ValueError:
+                rerouted.append(departure_times[row])
+                continue
+            column = 'trafficSpeed[km/h]' if channel in ['delta_time[s]', 'time_i[s]', 'time_f[s]'] else channel
+            values[row] = span_timing[column][index]
+
+        if channel in ['delta_time[s]', 'time_i[s]', 'time_f[s]']:
+            # all the departure times at once, the distances are shared
+            delta_time, time_i, time_f = _getTimeColumns(route_profile_df['delta_distance[m]'].values, values)
+            values = {'delta_time[s]': delta_time, 'time_i[s]': time_i, 'time_f[s]': time_f}[channel]
+
+        matrix_df = pd.DataFrame(values, index=pd.Index(departure_times, name='departure_time'), columns=route_profile_df.index)
+        matrix_df.attrs['rerouted'] = rerouted
+        matrix_df.attrs['errors'] = errors
+        return matrix_df
+
+    def iterRouteReportBatch(self,
+                             itineraries: List[List[tuple]],
+                             departure_times: List[str] = None,
+                             return_polyline: bool = False,
+                             distance_method: str = 'geodesic',
+                             max_workers: int = 8,
+                             processes: int = None,
+                             rate_limit: float = None,
+                             max_retries: int = 3,
+                             backoff: float = 1.0) -> Iterator[Tuple[int, pd.DataFrame, Exception]]:
+        '''This method computes the route reports of many itineraries, yielding them as they are completed
+
+        The route_v8 requests are issued through a thread pool, retrying transient errors (429/5xx, connection errors)
+        with exponential backoff (by the session if the API has one), while the responses are parsed in a process pool.
+
+        :param List[List[Tuple(float)]] itineraries: waypoints of each itinerary
+        :param List[str] departure_times: time of departure of each itinerary (None for now)
+        :param bool return_polyline: return polyline 
+        :param str distance_method: polyline distance method 'geodesic', 'haversine' or 'equirectangular' (see extDistance)
+        :param int max_workers: maximum number of concurrent requests
+        :param int processes: number of parsing processes (None for the number of CPUs, 0 to parse in the calling thread)
+        :param float rate_limit: maximum number of requests per second (None for no limit)
+        :param int max_retries: maximum number of retries of a failing request (ignored with a session, which retries them itself)
+        :param float backoff: initial retry delay [s], doubled at each retry
+
+        :returns: iterator of (itinerary, route_profile_df, error), route_profile_df is None if the itinerary failed
+
+        :rtype: Iterator[Tuple[int, pandas.DataFrame, Exception]]
+        '''
+        if departure_times is None:
+            departure_times=[datetime.now().strftime('%Y-%m-%dT%H:%M:%S')]*len(itineraries)
+        if len(departure_times)!=len(itineraries):
+            raise ValueError("[ERROR] departure_times must have the same length of itineraries")
+
+        # the session retries the transient errors itself, the calls are not retried twice
+        if self._session is not None:
+            max_retries=0
+        rate_limiter=extRateLimiter(rate_limit)
+        def fetch(itinerary):
+            rate_limiter.wait()
+            return callWithRetry(lambda: self._getRouteResponse(itineraries[itinerary], departure_times[itinerary]),
+                                 max_retries=max_retries,
+                                 backoff=backoff)
+
+        parse_executor=ProcessPoolExecutor(processes) if processes!=0 else ThreadPoolExecutor(1)
+        with ThreadPoolExecutor(max_workers=max_workers) as fetch_executor, parse_executor:
+            fetches={fetch_executor.submit(fetch, itinerary): itinerary for itinerary in range(len(itineraries))}
+            parses={}
+            pending=set(fetches)
+            while pending:
+                done, pending=wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in fetches:
+                        itinerary=fetches.pop(future)
+                        if future.exception() is not None:
+                            yield itinerary, None, future.exception()
+                            continue
+                        # parse the response as soon as it is received
+                        parse=parse_executor.submit(_getRouteReport, future.result(), return_polyline, distance_method)
+                        parses[parse]=itinerary
+                        pending.add(parse)
                     else:
-                        maxSpeed = 0
-                    
-                    latitude=polyline_decoded[polyline_element][0]
-                    longitude=polyline_decoded[polyline_element][1]
-                    altitude=polyline_decoded[polyline_element][2]
-
-                    #try:
-                    #    weather_response=destination_weather_api.weather_for_coordinates(latitude, longitude, product=WeatherProductType.observation)
-                    #    weather_rensponse_dict=weather_response.as_dict()
-                    #    amb_temperature=float(weather_rensponse_dict['observations']['location'][0]['observation'][0]['temperature'])
-                    #    amb_humidity=float(weather_rensponse_dict['observations']['location'][0]['observation'][0]['humidity'])
-                    #except:
-                    #    amb_temperature=float('nan')
-                    #    amb_humidity=float('nan')
-
-                    route_profile.append({'route':                  route,
-                                        'section':                  section,
-                                        'span':                     span+section*1000,        # give unique span ID with section*1000
-                                        'latitude[deg]':            latitude,
-                                        'longitude[deg]':           longitude,
-                                        'altitude[m]':              altitude,
-                                        'place':                    place,
-                                        'countrycode':              span_data['countryCode'],
-                                        'functionalClass':          span_data['functionalClass'],
-                                        'length[m]':                span_data['length'],
-                                        'duration[s]':              span_data['duration'],
-                                        'baseDuration[s]':          span_data['baseDuration'],
-                                        #'speedLimit[m/s]':          speedLimit,
-                                        #'maxSpeed[m/s]':            maxSpeed,
-                                        #'trafficSpeed[m/s]':        span_data['dynamicSpeedInfo']['trafficSpeed'],
-                                        #'baseSpeed[m/s]':           span_data['dynamicSpeedInfo']['baseSpeed'],
-                                        'speedLimit[km/h]':          np.round(extUtils.mps2kmph(np.array(speedLimit)), 1), 
-                                        'maxSpeed[km/h]':            np.round(extUtils.mps2kmph(np.array(maxSpeed)), 1), 
-                                        'trafficSpeed[km/h]':        np.round(extUtils.mps2kmph(np.array(span_data['dynamicSpeedInfo']['trafficSpeed'])), 1), 
-                                        'baseSpeed[km/h]':           np.round(extUtils.mps2kmph(np.array(span_data['dynamicSpeedInfo']['baseSpeed'])), 1), 
-                                        #'ambTemperature[degC]':     amb_temperature,
-                                        #'ambHumidity[Perc]':        amb_humidity
-                                        })
-            route_profile_df = pd.DataFrame(route_profile)  # make pandas dataframe
+                        itinerary=parses.pop(future)
+                        if future.exception() is not None:
+                            yield itinerary, None, future.exception()
+                        else:
+                            yield itinerary, future.result(), None
 
-        # in case the full polyline is not desired remove duplicates 
-        if return_polyline==False:
-            route_profile_df=route_profile_df.drop_duplicates(subset='span', keep='first')
-            delta_distance=route_profile_df['length[m]'].tolist()
+    def getRouteReportBatch(self,
+                            itineraries: List[List[tuple]],
+                            departure_times: List[str] = None,
+                            return_polyline: bool = False,
+                            distance_method: str = 'geodesic',
+                            max_workers: int = 8,
+                            processes: int = None,
+                            rate_limit: float = None,
+                            max_retries: int = 3,
+                            backoff: float = 1.0,
+                            stream: bool = False,
+                            compact: bool = False) -> Union[pd.DataFrame, Iterator[Tuple[int, pd.DataFrame, Exception]]]:
+        '''This method computes the route reports of many itineraries in parallel (see iterRouteReportBatch)
+
+        :param List[List[Tuple(float)]] itineraries: waypoints of each itinerary
+        :param List[str] departure_times: time of departure of each itinerary (None for now)
+        :param bool return_polyline: return polyline 
+        :param str distance_method: polyline distance method 'geodesic', 'haversine' or 'equirectangular' (see extDistance)
+        :param int max_workers: maximum number of concurrent requests
+        :param int processes: number of parsing processes (None for the number of CPUs, 0 to parse in the calling thread)
+        :param float rate_limit: maximum number of requests per second (None for no limit)
+        :param int max_retries: maximum number of retries of a failing request (ignored with a session, which retries them itself)
+        :param float backoff: initial retry delay [s], doubled at each retry
+        :param bool stream: return an iterator of (itinerary, route_profile_df, error) as the reports are completed
+        :param bool compact: return compact dtypes (see extStorage.compactDataFrame), ignored if stream
+
+        :returns: route_profiles_df: Route Profile Info of all the itineraries with an itinerary key, 
+                  the errors of the failed itineraries are reported in route_profiles_df.attrs['errors']
+
+        :rtype: pandas.DataFrame 
+        '''
+        route_reports=self.iterRouteReportBatch(itineraries, 
+                                                departure_times=departure_times, 
+                                                return_polyline=return_polyline, 
+                                                distance_method=distance_method,
+                                                max_workers=max_workers,
+                                                processes=processes,
+                                                rate_limit=rate_limit,
+                                                max_retries=max_retries,
+                                                backoff=backoff)
+        if stream:
+            return route_reports
+
+        return _concatRouteReports(route_reports, compact)
+
+
+def _concatRouteReports(route_reports: Iterable[Tuple[int, pd.DataFrame, Exception]], compact: bool = False) -> pd.DataFrame:
+    '''This method concatenates the route reports of many itineraries
+
+    :param Iterable route_reports: (itinerary, route_profile_df, error) of each itinerary
+    :param bool compact: return compact dtypes (see extStorage.compactDataFrame)
+
+    :returns: route_profiles_df: Route Profile Info of all the itineraries with an itinerary key, 
+              the errors of the failed itineraries are reported in route_profiles_df.attrs['errors']
+
+    :rtype: pandas.DataFrame 
+    '''
+    route_profiles={}
+    errors={}
+    for itinerary, route_profile_df, error in route_reports:
+        if error is not None:
+            errors[itinerary]=str(error)
         else:
-            waypoints = list(route_profile_df[['latitude[deg]', 'longitude[deg]']].to_records(index=False))
-            delta_distance = [distance.geodesic(waypoints[i], waypoints[i + 1]).m for i in
-                              range(0, len(waypoints) - 1)]  # compute geodesic distance based on geographic coordinates
-            delta_distance.append(0)
+            route_profiles[itinerary]=route_profile_df
+
+    if route_profiles:
+        route_profiles_df=pd.concat([route_profiles[itinerary].assign(itinerary=itinerary) for itinerary in sorted(route_profiles)], ignore_index=True)
+        route_profiles_df=route_profiles_df[['itinerary']+[column for column in route_profiles_df.columns if column!='itinerary']]
+    else:
+        route_profiles_df=pd.DataFrame(columns=['itinerary'])
+    if compact:
+        route_profiles_df=extStorage.compactDataFrame(route_profiles_df)
+    route_profiles_df.attrs['errors']=errors
+    return route_profiles_df
+
+def _getRoutingParams(waypoints: List[tuple], 
+                      departure_time: str,
+                      return_fields: List[str] = ROUTE_RETURN_FIELDS,
+                      span_fields: List[str] = ROUTE_SPAN_FIELDS) -> dict:
+    '''This method builds the route_v8 parameters of a route report request
+
+    :param List[Tuple(float)] waypoints: route waypoints
+    :param str departure_time: time of departure
+    :param List[str] return_fields: route_v8 return fields
+    :param List[str] span_fields: route_v8 span fields
+
+    :returns: routing_params: route_v8 keyword arguments
+
+    :rtype: dict 
+    '''
+    # input parsing
+    # define origin and destination
+    origin=waypoints[0]
+    destination=waypoints[-1]
+    # in case waypoints is more than two intermidiate routes are computed
+    if len(waypoints)>2:
+        via=waypoints[1:-1]
+    else:
+        via=None
+
+    return {'transport_mode':  'car', 
+            'origin':          origin, 
+            'destination':     destination,
+            'via':             via,
+            'departure_time':  departure_time,
+            'return_fields':   return_fields,
+            'span_fields':     span_fields}
+
+def _getRouteReport(routing_response_dict: dict,
+                    return_polyline: bool =False,
+                    distance_method: str ='geodesic') -> pd.DataFrame:
+    '''This method builds the route report from a route_v8 response
+
+    :param dict routing_response_dict: route_v8 response
+    :param bool return_polyline: return polyline 
+    :param str distance_method: polyline distance method 'geodesic', 'haversine' or 'equirectangular' (see extDistance)
 
-        # compute derived information
+    :returns: route_profile_df: Route Profile Info
+
+    :rtype: pandas.DataFrame 
+    '''
+    # in case the full polyline is not desired the report is built per span
+    if return_polyline==False:
+        route_profile_df, departure_time = _getRouteSpanProfile(routing_response_dict)
+    else:
+        route_profile_df, departure_time = _getRouteProfile(routing_response_dict)
+    return _addRouteDerivedColumns(route_profile_df, None, extAccumulator(), departure_time, return_polyline, distance_method)
+
+def _addRouteDerivedColumns(route_profile_df: pd.DataFrame,
+                            next_row: Dict[str, np.array],
+                            accumulator: extAccumulator,
+                            departure_time: str,
+                            return_polyline: bool =False,
+                            distance_method: str ='geodesic') -> pd.DataFrame:
+    '''This method adds the derived columns (distance, time, altitude) to a block of a route report
+
+    :param pandas.DataFrame route_profile_df: block of the per polyline point or per span route profile
+    :param dict next_row: first row of the next block (None for the last block, see extStream.iterColumnBlocks)
+    :param extAccumulator accumulator: cumulative distance and time of the previous blocks
+    :param str departure_time: departure time of the route
+    :param bool return_polyline: per polyline point profile, per span profile otherwise
+    :param str distance_method: polyline distance method 'geodesic', 'haversine' or 'equirectangular' (see extDistance)
+
+    :returns: route_profile_df: Route Profile Info
+
+    :rtype: pandas.DataFrame 
+    '''
+    if return_polyline==False:
+        delta_distance=route_profile_df['length[m]'].values
+    else:
+        latitudes = route_profile_df['latitude[deg]'].values
+        longitudes = route_profile_df['longitude[deg]'].values
+        if next_row is not None:
+            latitudes = np.concatenate([latitudes, next_row['latitude[deg]']])
+            longitudes = np.concatenate([longitudes, next_row['longitude[deg]']])
+        with extInstrumentation.stage('routing.distances', method=distance_method, points=len(route_profile_df)):
+            delta_distance = extDistance.getSegmentLengths(latitudes, longitudes, method=distance_method)  # compute geodesic distance based on geographic coordinates
+        if next_row is None:
+            delta_distance = np.append(delta_distance, 0)
+
+    # compute derived information
+    with extInstrumentation.stage('routing.derived', rows=len(route_profile_df)):
         # compute distance
-        delta_distance=np.round(delta_distance, 1).tolist() # round to 0.1 meter precision
-        distance_f = np.cumsum(delta_distance)
-        distance_i = np.insert(distance_f[:-1], 0, 0)
+        delta_distance=np.round(delta_distance, 1) # round to 0.1 meter precision
+        distance_i, distance_f = accumulator.accumulate('distance', delta_distance)
 
         # compute time based on traffic speed
-        delta_time = np.round(delta_distance / extUtils.kmph2mps(route_profile_df['trafficSpeed[km/h]'].values), 2)
-        time_f = np.cumsum(delta_time)
-        time_i = np.insert(time_f[:-1], 0, 0)
-        timestamp=[pd.Timestamp(departure_time)+pd.Timedelta(time_i[i], 'sec') for i in range(len(time_i))]
+        delta_time = _getTimeColumns(delta_distance, route_profile_df['trafficSpeed[km/h]'].values)[0]
+        time_i, time_f = accumulator.accumulate('time', delta_time)
+        timestamp=pd.Timestamp(departure_time)+pd.to_timedelta(time_i, unit='s')
 
         # compute altitude
-        delta_altitude = -route_profile_df['altitude[m]'].diff(periods=-1).fillna(0).values
         altitude_i = route_profile_df['altitude[m]'].values
+        delta_altitude = getNextDelta(altitude_i, None if next_row is None else next_row['altitude[m]'])
         altitude_f = altitude_i + delta_altitude
 
         route_profile_df['distance_i[m]'] = distance_i
@@ -178,6 +525,266 @@ class extRoutingApi(RoutingApi):
         route_profile_df['altitude_f[m]'] = altitude_f
         route_profile_df['delta_altitude[m]'] = delta_altitude
 
-        return route_profile_df 
+        if return_polyline==False:
+            # grade of the span from its first point to the first point of the next span
+            route_profile_df['grade[%]'] = np.divide(100*delta_altitude, delta_distance, out=np.zeros(len(delta_distance)), where=delta_distance!=0)
+
+    return route_profile_df
 
+def _getTimeColumns(delta_distance: np.array, trafficSpeed: np.array) -> Tuple[np.array, np.array, np.array]:
+    '''This method computes the travel time of the segments based on the traffic speed
 
+    :param numpy.array delta_distance: length of the segments [m]
+    :param numpy.array trafficSpeed: traffic speed of the segments [km/h], one row per departure time if 2D
+
+    :returns: delta_time, time_i, time_f [s]
+
+    :rtype: Tuple[numpy.array, numpy.array, numpy.array]
+    '''
+    delta_time = np.round(np.asarray(delta_distance, dtype=float) / extUtils.kmph2mps(np.asarray(trafficSpeed, dtype=float)), 2)
+    time_f = np.cumsum(delta_time, axis=-1)
+    time_i = np.concatenate([np.zeros(time_f.shape[:-1]+(1,)), time_f[..., :-1]], axis=-1)
+    return delta_time, time_i, time_f
+
+def _getSpanTiming(routing_response_dict: dict) -> Tuple[Dict[str, np.array], str]:
+    '''This method gathers the time dependent span data of a route_v8 response
+
+    :param dict routing_response_dict: route_v8 response
+
+    :returns: span_timing: route, section, span and time dependent columns for each span, departure_time: departure time of the last section
+
+    :rtype: Tuple[Dict[str, numpy.array], str]
+    '''
+    span_timing = {}
+    departure_time = None
+    for route, route_data in enumerate(routing_response_dict['routes']):
+        for section, section_data in enumerate(route_data['sections']):
+            departure_time = section_data['departure']['time']
+            spans = section_data['spans']
+            section_timing = {'route':              np.full(len(spans), route),
+                              'section':            np.full(len(spans), section),
+                              'span':               np.arange(len(spans))+section*1000,
+                              'length[m]':          _getSpanColumn(spans, 'length'),
+                              'duration[s]':        _getSpanColumn(spans, 'duration'),
+                              'baseDuration[s]':    _getSpanColumn(spans, 'baseDuration'),
+                              'trafficSpeed[km/h]': np.round(extUtils.mps2kmph(np.array([span_data['dynamicSpeedInfo']['trafficSpeed'] for span_data in spans], dtype=float)), 1),
+                              'baseSpeed[km/h]':    np.round(extUtils.mps2kmph(np.array([span_data['dynamicSpeedInfo']['baseSpeed'] for span_data in spans], dtype=float)), 1)}
+            for key, column in section_timing.items():
+                span_timing.setdefault(key, []).append(column)
+    return {key: np.concatenate(columns) for key, columns in span_timing.items()}, departure_time
+
+def _getTimingIndex(route_profile_df: pd.DataFrame, span_timing: Dict[str, np.array]) -> np.array:
+    '''This method maps the rows of a route report to the spans of a timing response, checking that the route is unchanged
+
+    :param pandas.DataFrame route_profile_df: route report
+    :param Dict[str, numpy.array] span_timing: time dependent span data (see _getSpanTiming)
+
+    :returns: index: span of the timing response of each row
+
+    :rtype: numpy.array
+    '''
+    # span already contains section*1000
+    timing_keys = span_timing['route'].astype(np.int64)*10**6+span_timing['span']
+    row_keys = route_profile_df['route'].values.astype(np.int64)*10**6+route_profile_df['span'].values
+
+    order = np.argsort(timing_keys, kind='stable')
+    position = np.clip(np.searchsorted(timing_keys, row_keys, sorter=order), 0, max(len(order)-1, 0))
+    index = order[position] if len(order) else position
+    # same spans (number, order and length) as the route report
+    if len(timing_keys) != len(np.unique(row_keys)) \
+       or (timing_keys[index] != row_keys).any() \
+       or (span_timing['length[m]'][index] != route_profile_df['length[m]'].values).any():
+        raise ValueError("[ERROR] the route of the new departure time differs from the route report")
+    return index
+
+def _getSpanColumn(spans: List[dict], key: str, default=None) -> np.array:
+    '''This method gathers a span attribute once per span
+
+    :param List[dict] spans: spans of a route section
+    :param str key: span attribute
+    :param default: value used when the attribute is missing
+
+    :returns: column: span attribute for each span
+
+    :rtype: numpy.array
+    '''
+    values = [span_data.get(key, default) for span_data in spans]
+    if any(isinstance(value, str) for value in values):
+        column = np.empty(len(values), dtype=object)
+        column[:] = values
+        return column
+    return np.array(values)
+
+def _getSpanColumns(spans: List[dict], n_points: int) -> Tuple[np.array, Dict[str, np.array]]:
+    '''This method gathers the span attributes of a route section once per span
+
+    :param List[dict] spans: spans of a route section
+    :param int n_points: number of polyline points of the section
+
+    :returns: span: span of each polyline point, span_columns: attributes of each span
+
+    :rtype: Tuple[numpy.array, Dict[str, numpy.array]]
+    '''
+    offsets = np.array([span_data['offset'] for span_data in spans])
+
+    # span of each polyline element (index of the last span starting before or at the element)
+    span = np.searchsorted(offsets, np.arange(n_points), side='right') - 1
+
+    # treat missing data
+    place = np.empty(len(spans), dtype=object)
+    place[:] = [span_data['names'][0]['value'] if 'names' in span_data else '' for span_data in spans]
+    trafficSpeed = np.array([span_data['dynamicSpeedInfo']['trafficSpeed'] for span_data in spans])
+    baseSpeed = np.array([span_data['dynamicSpeedInfo']['baseSpeed'] for span_data in spans])
+
+    span_columns = {'place':                    place,
+                    'countrycode':              _getSpanColumn(spans, 'countryCode'),
+                    'functionalClass':          _getSpanColumn(spans, 'functionalClass'),
+                    'length[m]':                _getSpanColumn(spans, 'length'),
+                    'duration[s]':              _getSpanColumn(spans, 'duration'),
+                    'baseDuration[s]':          _getSpanColumn(spans, 'baseDuration'),
+                    'speedLimit[km/h]':         np.round(extUtils.mps2kmph(_getSpanColumn(spans, 'speedLimit', 0)), 1),
+                    'maxSpeed[km/h]':           np.round(extUtils.mps2kmph(_getSpanColumn(spans, 'maxSpeed', 0)), 1),
+                    'trafficSpeed[km/h]':       np.round(extUtils.mps2kmph(trafficSpeed), 1),
+                    'baseSpeed[km/h]':          np.round(extUtils.mps2kmph(baseSpeed), 1),
+                    }
+    return span, span_columns
+
+def _getDepartureTime(routing_response_dict: dict) -> str:
+    '''This method returns the departure time of the last section of a route_v8 response (time origin of the route report)
+
+    :param dict routing_response_dict: route_v8 response
+
+    :returns: departure_time: departure time of the last section
+
+    :rtype: str
+    '''
+    departure_time = None
+    for route_data in routing_response_dict['routes']:
+        for section_data in route_data['sections']:
+            departure_time = section_data['departure']['time']
+    return departure_time
+
+def _getRouteProfile(routing_response_dict: dict) -> Tuple[pd.DataFrame, str]:
+    '''This method builds the per polyline point route profile from a route_v8 response
+
+    :param dict routing_response_dict: route_v8 response
+
+    :returns: route_profile_df: Route Profile Info, departure_time: departure time of the last section
+
+    :rtype: Tuple[pandas.DataFrame, str]
+    '''
+    route_profile = {}
+    for section_profile in _iterRouteProfile(routing_response_dict):
+        section_profile.pop('index')
+        for key, column in section_profile.items():
+            route_profile.setdefault(key, []).append(column)
+
+    with extInstrumentation.stage('routing.dataframe'):
+        route_profile_df = pd.DataFrame({key: np.concatenate(columns) for key, columns in route_profile.items()})  # make pandas dataframe
+    return route_profile_df, _getDepartureTime(routing_response_dict)
+
+def _iterRouteProfile(routing_response_dict: dict, chunk_size: int = None) -> Iterator[Dict[str, np.array]]:
+    '''This method yields the per polyline point route profile columns of a route_v8 response, section by section
+
+    :param dict routing_response_dict: route_v8 response
+    :param int chunk_size: maximum number of points per chunk (None for one chunk per section), the span
+                           attributes being broadcast to the points of one chunk at a time
+
+    :returns: iterator of route profile columns, with the row index ('index')
+
+    :rtype: Iterator[Dict[str, numpy.array]]
+    '''
+    n_points = 0
+    for route in range(len(routing_response_dict['routes'])):
+        route_data = routing_response_dict['routes'][route]  # loop through routes
+        for section in range(len(route_data['sections'])):  # loop through sections
+            section_data = route_data['sections'][section]
+            spans = section_data['spans']
+            with extInstrumentation.stage('routing.decode', polyline_size=len(section_data['polyline'])):
+                polyline_decoded = extParse.decodePolyline(section_data['polyline'])  # decode polyline (latitude, longitude, elevation)
+            extInstrumentation.count('routing.points', len(polyline_decoded))
+            extInstrumentation.count('routing.spans', len(spans))
+            with extInstrumentation.stage('routing.spans'):
+                # span attributes are gathered once per span and broadcast to the polyline elements
+                span, span_columns = _getSpanColumns(spans, len(polyline_decoded))
+            for start in range(0, len(span), chunk_size or max(len(span), 1)):
+                end = start+chunk_size if chunk_size else len(span)
+                with extInstrumentation.stage('routing.spans'):
+                    section_profile = { 'route':                    np.full(len(span[start:end]), route),
+                                        'section':                  np.full(len(span[start:end]), section),
+                                        'span':                     span[start:end]+section*1000,       # give unique span ID with section*1000
+                                        'latitude[deg]':            polyline_decoded[start:end, 0],
+                                        'longitude[deg]':           polyline_decoded[start:end, 1],
+                                        'altitude[m]':              polyline_decoded[start:end, 2],
+                                        }
+                    section_profile.update({key: column[span[start:end]] for key, column in span_columns.items()})
+                    section_profile['index'] = np.arange(n_points+start, n_points+start+len(span[start:end]))
+                yield section_profile
+            n_points += len(span)
+
+def _getRouteSpanProfile(routing_response_dict: dict) -> Tuple[pd.DataFrame, str]:
+    '''This method builds the per span route profile from a route_v8 response, without per polyline point rows
+
+    Each span takes the coordinates and altitude of its first polyline point and the altitude statistics of its points.
+    The rows are indexed as in the per point profile (index of the first point of the span).
+
+    :param dict routing_response_dict: route_v8 response
+
+    :returns: route_profile_df: Route Profile Info, departure_time: departure time of the last section
+
+    :rtype: Tuple[pandas.DataFrame, str]
+    '''
+    route_profile = {}
+    for section_profile in _iterRouteSpanProfile(routing_response_dict):
+        for key, column in section_profile.items():
+            route_profile.setdefault(key, []).append(column)
+
+    with extInstrumentation.stage('routing.dataframe'):
+        index = np.concatenate(route_profile.pop('index'))
+        route_profile_df = pd.DataFrame({key: np.concatenate(columns) for key, columns in route_profile.items()}, 
+                                        index=index)  # make pandas dataframe
+    return route_profile_df, _getDepartureTime(routing_response_dict)
+
+def _iterRouteSpanProfile(routing_response_dict: dict) -> Iterator[Dict[str, np.array]]:
+    '''This method yields the per span route profile columns of a route_v8 response, section by section (see _getRouteSpanProfile)
+
+    :param dict routing_response_dict: route_v8 response
+
+    :returns: iterator of route profile columns, with the row index ('index', first point of the span)
+
+    :rtype: Iterator[Dict[str, numpy.array]]
+    '''
+    n_points = 0
+    for route in range(len(routing_response_dict['routes'])):
+        route_data = routing_response_dict['routes'][route]  # loop through routes
+        for section in range(len(route_data['sections'])):  # loop through sections
+            section_data = route_data['sections'][section]
+            spans = section_data['spans']
+            with extInstrumentation.stage('routing.decode', polyline_size=len(section_data['polyline'])):
+                polyline_decoded = extParse.decodePolyline(section_data['polyline'])  # decode polyline (latitude, longitude, elevation)
+            extInstrumentation.count('routing.points', len(polyline_decoded))
+            extInstrumentation.count('routing.spans', len(spans))
+            with extInstrumentation.stage('routing.spans'):
+                span, span_columns = _getSpanColumns(spans, len(polyline_decoded))
+
+                # the points of a span are contiguous, spans without points are skipped
+                starts = np.flatnonzero(np.diff(span, prepend=-2))
+                span_ids = span[starts]
+                points = np.diff(np.r_[starts, len(span)])
+                altitude = polyline_decoded[:, 2]
+                section_profile = { 'route':                    np.full(len(starts), route),
+                                    'section':                  np.full(len(starts), section),
+                                    'span':                     span_ids+section*1000,      # give unique span ID with section*1000
+                                    'latitude[deg]':            polyline_decoded[starts, 0],
+                                    'longitude[deg]':           polyline_decoded[starts, 1],
+                                    'altitude[m]':              altitude[starts],
+                                    }
+                section_profile.update({key: column[span_ids] for key, column in span_columns.items()})
+                section_profile.update({'points':               points,
+                                        'altitude_min[m]':      np.minimum.reduceat(altitude, starts),
+                                        'altitude_mean[m]':     np.add.reduceat(altitude, starts)/points,
+                                        'altitude_max[m]':      np.maximum.reduceat(altitude, starts),
+                                        'index':                starts+n_points,
+                                        })
+            yield section_profile
+            n_points += len(span)
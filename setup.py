@@ -43,6 +43,14 @@ setup(
     platforms=['Any'],
     python_requires=">=3.5",
     install_requires=requirements,
+    # optional dependencies, imported on first use
+    extras_require={
+        'async':    ['aiohttp>=3.8.0'],
+        'storage':  ['pyarrow>=8.0.0'],
+        'fast':     ['orjson>=3.6.0'],
+        'otel':     ['opentelemetry-api>=1.12.0'],
+        'test':     ['pytest>=7.0.0', 'aiohttp>=3.8.0', 'opentelemetry-sdk>=1.12.0'],
+    },
     keywords='here api, here technologies, here python api clients, rest api clients',
     classifiers=[
         'Intended Audience :: Developers',
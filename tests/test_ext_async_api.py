@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+
+"""Tests of the async APIs against an aiohttp test server standing in for the HERE endpoints"""
+
+import os
+import json
+import asyncio
+import pytest
+
+aiohttp = pytest.importorskip('aiohttp')
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from extherepy import extAsyncClient, extAsyncRoutingApi, extAsyncGeocoderApi, extResponseCache
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+WAYPOINTS = [(45, 9), (45.1, 9.1)]
+
+class FakeHere(object):
+    '''
+    Fake HERE endpoints answering the route_v8 and geocoding requests after the queued error statuses,
+    recording the requested paths and the maximum number of requests in flight.
+    '''
+    def __init__(self, statuses: list = ()):
+        self.statuses = list(statuses)
+        self.paths = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        with open(os.path.join(DATA_DIR, 'route_v8_response.json')) as response_file:
+            self.route_response = json.load(response_file)
+
+    async def handle(self, request):
+        self.paths.append(request.path)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if self.statuses:
+                return web.json_response({'error': 'retry'}, status=self.statuses.pop(0))
+            if request.path.startswith('/v8/routes'):
+                return web.json_response(self.route_response)
+            return web.json_response({'items': [{'position': {'lat': 45.0, 'lng': 9.0}}]})
+        finally:
+            self.in_flight -= 1
+
+def serve(fake_here: FakeHere, test):
+    '''This method runs test(base_url) against a test server of the fake HERE endpoints
+    '''
+    async def main():
+        app = web.Application()
+        app.router.add_route('*', '/{path:.*}', fake_here.handle)
+        async with TestServer(app) as server:
+            return await test(str(server.make_url('')))
+    return asyncio.run(main())
+
+def test_concurrency_is_limited():
+    fake_here = FakeHere()
+
+    async def test(base_url):
+        async with extAsyncClient(max_concurrency=2, base_url=base_url) as client:
+            return await extAsyncRoutingApi('key', client=client).getRouteReportBatch([WAYPOINTS]*6, departure_times=['2022-06-01T08:00:00']*6)
+
+    route_profiles_df = serve(fake_here, test)
+    assert len(fake_here.paths) == 6
+    assert fake_here.max_in_flight == 2
+    assert route_profiles_df.attrs['errors'] == {}
+
+@pytest.mark.parametrize('statuses', [[429], [500, 503]])
+def test_transient_status_is_retried(statuses):
+    fake_here = FakeHere(statuses)
+
+    async def test(base_url):
+        async with extAsyncClient(base_url=base_url) as client:
+            return await extAsyncRoutingApi('key', client=client).getRouteReportBatch([WAYPOINTS], departure_times=['2022-06-01T08:00:00'], backoff=0.001)
+
+    route_profiles_df = serve(fake_here, test)
+    assert len(fake_here.paths) == len(statuses)+1
+    assert route_profiles_df.attrs['errors'] == {}
+    assert list(route_profiles_df['itinerary'].unique()) == [0]
+
+def test_exhausted_retries_are_reported():
+    fake_here = FakeHere([503]*3)
+
+    async def test(base_url):
+        async with extAsyncClient(base_url=base_url) as client:
+            return await extAsyncRoutingApi('key', client=client).getRouteReportBatch([WAYPOINTS], departure_times=['2022-06-01T08:00:00'], max_retries=2, backoff=0.001)
+
+    route_profiles_df = serve(fake_here, test)
+    assert len(fake_here.paths) == 3
+    assert list(route_profiles_df.attrs['errors']) == [0]
+
+def test_report_building_and_cache():
+    fake_here = FakeHere()
+    cache = extResponseCache()
+
+    async def test(base_url):
+        async with extAsyncClient(base_url=base_url) as client:
+            routing_api = extAsyncRoutingApi('key', cache=cache, client=client)
+            route_profile_df = await routing_api.getRouteReport(WAYPOINTS, departure_time='2022-06-01T08:00:00', return_polyline=True)
+            cached_df = await routing_api.getRouteReport(WAYPOINTS, departure_time='2022-06-01T08:00:00', return_polyline=True)
+            coordinates = await extAsyncGeocoderApi('key', cache=cache, client=client).getCoordinates('Milano')
+            return route_profile_df, cached_df, coordinates
+
+    route_profile_df, cached_df, coordinates = serve(fake_here, test)
+    assert len(fake_here.paths) == 2
+    assert len(route_profile_df) > 0
+    assert {'latitude[deg]', 'longitude[deg]', 'distance_i[m]', 'span'} <= set(route_profile_df.columns)
+    assert route_profile_df.equals(cached_df)
+    assert coordinates == (45.0, 9.0)
+    assert cache.getStats() == {'hits': 1, 'misses': 2, 'entries': 2}
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+
+"""Tests of extResponseCache through the APIs, the HERE endpoints being replaced by a fake HTTP stand-in"""
+
+import os
+import json
+import time
+import pytest
+import requests
+
+from extherepy import extGeocoderApi, extRoutingApi, extResponseCache
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+class FakeResponse(object):
+    '''
+    requests.Response stand-in (status code and raw content).
+    '''
+    def __init__(self, status_code: int, payload: dict):
+        self.status_code = status_code
+        self.content = json.dumps(payload).encode('utf-8')
+
+class FakeHere(object):
+    '''
+    Fake HERE endpoints answering geocoding and route_v8 requests and recording the requested urls.
+    '''
+    def __init__(self):
+        self.urls = []
+        with open(os.path.join(DATA_DIR, 'route_v8_response.json')) as response_file:
+            self.route_response = json.load(response_file)
+
+    def request(self, method, url, **kwargs):
+        self.urls.append(url)
+        if '/v8/routes' in url:
+            return FakeResponse(200, self.route_response)
+        if 'q=Nowhere' in url:
+            return FakeResponse(200, {'items': []})
+        return FakeResponse(200, {'items': [{'position': {'lat': 45.0+len(self.urls), 'lng': 9.0}}]})
+
+    def count(self, endpoint: str) -> int:
+        return sum(endpoint in url for url in self.urls)
+
+@pytest.fixture
+def here(monkeypatch):
+    fake_here = FakeHere()
+    monkeypatch.setattr(requests, 'request', fake_here.request)
+    return fake_here
+
+def test_hit_does_not_request(here):
+    cache = extResponseCache()
+    geocoder_api = extGeocoderApi('key', cache=cache)
+
+    coordinates = geocoder_api.getCoordinates('Milano')
+    assert geocoder_api.getCoordinates('Milano') == coordinates
+    assert geocoder_api.getCoordinates(' milano ') == coordinates     # same normalized place
+    assert here.count('geocode') == 1
+    assert cache.getStats() == {'hits': 2, 'misses': 1, 'entries': 1}
+
+def test_expired_ttl_requests_again(here):
+    cache = extResponseCache(ttl={'free_form': 0.05})
+    geocoder_api = extGeocoderApi('key', cache=cache)
+
+    geocoder_api.getCoordinates('Milano')
+    geocoder_api.getCoordinates('Milano')
+    assert here.count('geocode') == 1
+    time.sleep(0.1)
+    geocoder_api.getCoordinates('Milano')
+    assert here.count('geocode') == 2
+
+def test_lru_eviction_respects_max_entries(here):
+    cache = extResponseCache(max_entries=2)
+    geocoder_api = extGeocoderApi('key', cache=cache)
+
+    geocoder_api.getCoordinates('Milano')
+    geocoder_api.getCoordinates('Roma')
+    geocoder_api.getCoordinates('Milano')       # Roma becomes the least recently used
+    geocoder_api.getCoordinates('Torino')       # evicts Roma
+    assert cache.getStats()['entries'] == 2
+    assert here.count('geocode') == 3
+
+    geocoder_api.getCoordinates('Milano')
+    geocoder_api.getCoordinates('Torino')
+    assert here.count('geocode') == 3
+    geocoder_api.getCoordinates('Roma')
+    assert here.count('geocode') == 4
+    assert cache.getStats()['entries'] == 2
+
+def test_keys_per_api(here):
+    cache = extResponseCache()
+    params = {'searchtext': 'milano'}
+    assert cache.getKey('free_form', params) != cache.getKey('route_v8', params)
+
+    cache.set('free_form', params, {'items': []})
+    assert cache.get('route_v8', params) is None
+    assert cache.get('free_form', params) == {'items': []}
+
+    # one shared cache, one entry per API and request
+    cache = extResponseCache()
+    geocoder_api = extGeocoderApi('key', cache=cache)
+    routing_api = extRoutingApi('key', cache=cache)
+    geocoder_api.getCoordinates('Milano')
+    routing_api.getRouteReport([(45, 9), (45.1, 9.1)], departure_time='2022-06-01T08:00:00')
+    routing_api.getRouteReport([(45, 9), (45.1, 9.1)], departure_time='2022-06-01T08:00:00')
+    routing_api.getRouteReport([(45, 9), (45.1, 9.1)], departure_time='2022-06-01T09:00:00')
+    assert here.count('geocode') == 1
+    assert here.count('/v8/routes') == 2
+    assert cache.getStats()['entries'] == 3
+
+def test_empty_result_not_cached(here):
+    cache = extResponseCache()
+    geocoder_api = extGeocoderApi('key', cache=cache)
+
+    assert geocoder_api.getCoordinatesBatch(['Nowhere'])['error'][0] is not None
+    assert geocoder_api.getCoordinatesBatch(['Nowhere'])['error'][0] is not None
+    assert here.count('geocode') == 2
+    assert cache.getStats()['entries'] == 0
+
+def test_batch_reports_invalid_places(here):
+    geocoder_api = extGeocoderApi('key', cache=extResponseCache())
+
+    coordinates_df = geocoder_api.getCoordinatesBatch(['Milano', float('nan'), None, ' milano'])
+    assert here.count('geocode') == 1
+    assert coordinates_df['error'].isna().tolist() == [True, False, False, True]
+    assert coordinates_df['error'][1].startswith('[ERROR] place must be a string')
+    assert coordinates_df['latitude[deg]'][0] == coordinates_df['latitude[deg]'][3]
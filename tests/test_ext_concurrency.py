@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+"""Tests of the retry policy of extConcurrency, the HERE endpoints being replaced by a fake HTTP stand-in"""
+
+import pytest
+import requests
+from herepy.error import HEREError
+
+from extherepy import extGeocoderApi, extRoutingApi, extResponseCache, extSession, extHttpError
+from extherepy.extConcurrency import isRetryable, callWithRetry
+
+class FakeResponse(object):
+    '''
+    requests.Response stand-in (status code and raw content).
+    '''
+    def __init__(self, status_code: int, content: bytes):
+        self.status_code = status_code
+        self.content = content
+
+def replay(monkeypatch, status_code: int, content: bytes) -> list:
+    '''This method answers every request with the same response and returns the list of requested urls
+
+    The APIs are given a cache so that their requests go through extHttp.sendRequest instead of HerePy.
+    '''
+    urls = []
+    def request(method, url, **kwargs):
+        urls.append(url)
+        return FakeResponse(status_code, content)
+    monkeypatch.setattr(requests, 'request', request)
+    return urls
+
+@pytest.mark.parametrize('status_code, content', [(429, b'{"error": "Too Many Requests"}'), (503, b'<html>Service Unavailable</html>')])
+def test_transient_status_is_retried(monkeypatch, status_code, content):
+    urls = replay(monkeypatch, status_code, content)
+    with pytest.raises(extHttpError) as error:
+        callWithRetry(lambda: extGeocoderApi('key', cache=extResponseCache()).getCoordinates('Milano'), max_retries=2, backoff=0.001)
+    assert error.value.status_code == status_code
+    assert len(urls) == 3
+
+@pytest.mark.parametrize('status_code, content', [(400, b'{"error": "Bad Request"}'), (200, b'not json')])
+def test_client_and_parsing_errors_are_not_retried(monkeypatch, status_code, content):
+    urls = replay(monkeypatch, status_code, content)
+    with pytest.raises(HEREError) as error:
+        callWithRetry(lambda: extGeocoderApi('key', cache=extResponseCache()).getCoordinates('Milano'), max_retries=2, backoff=0.001)
+    assert not isinstance(error.value, extHttpError)
+    assert len(urls) == 1
+
+def test_isRetryable():
+    assert isRetryable(requests.ConnectionError())
+    assert isRetryable(requests.Timeout())
+    assert not isRetryable(ValueError("[ERROR] invalid parameter"))
+    assert not isRetryable(requests.HTTPError())
+    assert not isRetryable(extHttpError(501, "[ERROR] HTTP 501"))
+
+def test_session_requests_are_not_retried_twice(monkeypatch):
+    session = extSession(max_retries=2)
+    urls = []
+    def request(method, url, **kwargs):
+        urls.append(url)
+        return FakeResponse(503, b'<html>Service Unavailable</html>')
+    # the session (urllib3) retries are bypassed, only the retries of the batch would remain
+    monkeypatch.setattr(session._session, 'request', request)
+
+    route_profiles_df = extRoutingApi('key', session=session).getRouteReportBatch([[(45, 9), (45.1, 9.1)]], departure_times=['2022-06-01T08:00:00'],
+                                                                                  processes=0, max_retries=3, backoff=0.001)
+    assert len(urls) == 1
+    assert list(route_profiles_df.attrs['errors']) == [0]
@@ -0,0 +1,17 @@
+#!/usr/bin/env python
+
+"""Tests of the gpx documents written by extGpx.getGpxContent"""
+
+import io
+import pytest
+
+from extherepy.extGpx import getGpxContent, iterGpxPoints
+
+def test_points_round_trip():
+    points = [('45.1', '9.25', '120.5', '2022-06-01T08:00:00Z'), ('45.2', '-9', None, None)]
+    assert list(iterGpxPoints(io.StringIO(getGpxContent(points)))) == [('45.1', '9.25', '120.5', '2022-06-01T08:00:00Z'), ('45.2', '-9.0', None, None)]
+
+@pytest.mark.parametrize('latitude, longitude', [('45.1" ele="0', '9.2'), ('45.1', '9.2"><ele>0</ele'), (None, '9.2')])
+def test_invalid_coordinates_are_refused(latitude, longitude):
+    with pytest.raises(ValueError, match=r'\[ERROR\] invalid track point coordinates'):
+        getGpxContent([(latitude, longitude, None, None)])
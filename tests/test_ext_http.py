@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+
+"""Tests of the HerePy request seam: HerePy sends the requests of the APIs without session nor cache"""
+
+import json
+import pytest
+import requests
+from herepy import GeocoderApi
+
+from extherepy import extGeocoderApi, extResponseCache
+from extherepy.extHttp import checkHerePyRequests, HEREPY_REQUEST_METHODS
+
+class FakeResponse(object):
+    '''
+    requests.Response stand-in (status code and raw content).
+    '''
+    def __init__(self, payload: dict):
+        self.status_code = 200
+        self.content = json.dumps(payload).encode('utf-8')
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+    def request(method, url, **kwargs):
+        calls.append(method.lower())
+        return FakeResponse({'items': [{'position': {'lat': 45.0, 'lng': 9.0}}]})
+    monkeypatch.setattr(requests, 'request', request)
+    monkeypatch.setattr(requests, 'get', lambda url, **kwargs: request('herepy', url, **kwargs))
+    return calls
+
+def test_default_requests_are_sent_by_herepy(calls):
+    assert extGeocoderApi('key').getCoordinates('Milano') == (45.0, 9.0)
+    assert calls == ['herepy']
+
+def test_cached_requests_are_sent_by_extherepy(calls):
+    assert extGeocoderApi('key', cache=extResponseCache()).getCoordinates('Milano') == (45.0, 9.0)
+    assert calls == ['get']
+
+def test_changed_herepy_requests_are_refused(monkeypatch):
+    checkHerePyRequests(GeocoderApi)
+    checkHerePyRequests.cache_clear()
+    monkeypatch.setitem(HEREPY_REQUEST_METHODS, GeocoderApi, ('_GeocoderApi__send', ['self', 'data']))
+    try:
+        with pytest.raises(ImportError):
+            extGeocoderApi('key', cache=extResponseCache())
+        extGeocoderApi('key')
+    finally:
+        checkHerePyRequests.cache_clear()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+
+"""Tests of the OpenTelemetry handler of extInstrumentation
+
+The span parenting is tested with a fake tracing API (always run), the spans recorded by the
+OpenTelemetry SDK are tested when opentelemetry-sdk is installed.
+"""
+
+import sys
+import types
+import asyncio
+import contextvars
+import pytest
+
+from extherepy import extInstrumentation
+
+class FakeSpan(object):
+    '''
+    opentelemetry Span stand-in recording its parent, attributes, events and status.
+    '''
+    def __init__(self, name: str, parent, attributes: dict = None):
+        self.name = name
+        self.parent = parent
+        self.attributes = dict(attributes or {})
+        self.events = []
+        self.status = None
+        self.ended = False
+
+    def add_event(self, name, attributes=None, timestamp=None):
+        self.events.append(name)
+
+    def set_attributes(self, attributes):
+        self.attributes.update(attributes)
+
+    def set_status(self, status):
+        self.status = status
+
+    def end(self, end_time=None):
+        self.ended = True
+
+class FakeTracer(object):
+    '''
+    opentelemetry Tracer stand-in starting the spans as children of the current span.
+    '''
+    def __init__(self, current: contextvars.ContextVar):
+        self.current = current
+        self.spans = {}
+
+    def start_span(self, name, start_time=None, attributes=None):
+        self.spans[name] = FakeSpan(name, self.current.get(), attributes)
+        return self.spans[name]
+
+@pytest.fixture
+def fake_tracer(monkeypatch):
+    # opentelemetry.trace and opentelemetry.context stand-ins, the context being the current span
+    current = contextvars.ContextVar('fake_current_span', default=None)
+    trace = types.ModuleType('opentelemetry.trace')
+    trace.set_span_in_context = lambda span: span
+    trace.get_current_span = lambda: current.get() or FakeSpan('invalid', None)
+    trace.StatusCode = types.SimpleNamespace(ERROR='ERROR')
+    trace.Status = lambda status_code, description: (status_code, description)
+    context = types.ModuleType('opentelemetry.context')
+    context.attach = current.set
+    context.detach = current.reset
+    opentelemetry = types.ModuleType('opentelemetry')
+    opentelemetry.trace, opentelemetry.context = trace, context
+    for name, module in [('opentelemetry', opentelemetry), ('opentelemetry.trace', trace), ('opentelemetry.context', context)]:
+        monkeypatch.setitem(sys.modules, name, module)
+    return FakeTracer(current)
+
+def test_stages_are_nested_spans_fake(fake_tracer):
+    with extInstrumentation.instrumented(extInstrumentation.getOpenTelemetryHandler(fake_tracer)):
+        with extInstrumentation.stage('outer', api='route_v8'):
+            with extInstrumentation.stage('inner'):
+                extInstrumentation.count('points', 10)
+        with pytest.raises(KeyError):
+            with extInstrumentation.stage('failing'):
+                raise KeyError('span')
+
+    spans = fake_tracer.spans
+    assert spans['inner'].parent is spans['outer']
+    assert spans['outer'].parent is None and spans['failing'].parent is None
+    assert spans['outer'].attributes['api'] == 'route_v8'
+    assert spans['inner'].events == ['points']
+    assert spans['failing'].status == ('ERROR', 'KeyError')
+    assert all(span.ended for span in spans.values())
+    assert fake_tracer.current.get() is None
+
+def test_concurrent_tasks_keep_their_parent(fake_tracer):
+    async def report(name):
+        with extInstrumentation.stage(name):
+            await asyncio.sleep(0.01)
+            with extInstrumentation.stage(name+'.request'):
+                await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(report('first'), report('second'))
+
+    with extInstrumentation.instrumented(extInstrumentation.getOpenTelemetryHandler(fake_tracer)):
+        asyncio.run(main())
+
+    spans = fake_tracer.spans
+    assert spans['first.request'].parent is spans['first']
+    assert spans['second.request'].parent is spans['second']
+    assert spans['first'].parent is None and spans['second'].parent is None
+
+@pytest.fixture
+def tracing():
+    pytest.importorskip('opentelemetry.sdk')
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    return provider.get_tracer('extherepy'), exporter
+
+def test_stages_are_nested_spans(tracing):
+    from opentelemetry import trace
+    tracer, exporter = tracing
+    with extInstrumentation.instrumented(extInstrumentation.getOpenTelemetryHandler(tracer)):
+        with tracer.start_as_current_span('caller'):
+            with extInstrumentation.stage('outer', api='route_v8'):
+                with extInstrumentation.stage('inner'):
+                    extInstrumentation.count('points', 10)
+
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    assert spans['inner'].parent.span_id == spans['outer'].context.span_id
+    assert spans['outer'].parent.span_id == spans['caller'].context.span_id
+    assert spans['outer'].start_time <= spans['inner'].start_time <= spans['inner'].end_time <= spans['outer'].end_time
+    assert spans['outer'].attributes['api'] == 'route_v8'
+    assert [event.name for event in spans['inner'].events] == ['points']
+    assert not trace.get_current_span().get_span_context().is_valid
+
+def test_failed_stage_span_status(tracing):
+    from opentelemetry import trace
+    tracer, exporter = tracing
+    with extInstrumentation.instrumented(extInstrumentation.getOpenTelemetryHandler(tracer)):
+        with pytest.raises(KeyError):
+            with extInstrumentation.stage('failing'):
+                raise KeyError('span')
+
+    span, = exporter.get_finished_spans()
+    assert span.status.status_code == trace.StatusCode.ERROR
+    assert span.attributes['error'] == 'KeyError'
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+
+"""Tests of the timestamps of extRmeApi reports on a synthetic match_route response"""
+
+import io
+import pandas as pd
+import pytest
+
+from extherepy import extRmeApi
+from extherepy.extGpx import getGpxContent
+
+N_POINTS = 30
+START = 1654070400000       # 2022-06-01T08:00:00Z [ms]
+
+class ReplayRmeApi(extRmeApi):
+    '''
+    extRmeApi answering a synthetic match_route response (3 trace points per route link, 1 s apart) instead of calling HERE.
+    '''
+    def _getRmeResponse(self, gpx_content: str) -> dict:
+        return {'RouteLinks':   [{'confidence': 0.9, 'functionalClass': 3, 'linkId': link} for link in range(N_POINTS//3)],
+                'TracePoints':  [{'routeLinkSeqNrMatched': point//3, 'timestamp': START+point*1000, 'lat': 45+point*1e-4, 'lon': 9.0,
+                                  'latMatched': 45+point*1e-4, 'lonMatched': 9.0, 'elevation': 100.0, 'confidenceValue': 0.8, 'speedMps': 10.0}
+                                 for point in range(N_POINTS)]}
+
+def getGpx() -> io.StringIO:
+    return io.StringIO(getGpxContent([(str(45+point*1e-4), '9.0', '100', pd.Timestamp(START+point*1000, unit='ms').strftime('%Y-%m-%dT%H:%M:%SZ'))
+                                      for point in range(N_POINTS)]))
+
+@pytest.mark.parametrize('return_GPS_trace', [True, False])
+def test_timestamps_are_utc(return_GPS_trace):
+    route_profile_df = ReplayRmeApi('key').getRouteReport(getGpx(), return_GPS_trace=return_GPS_trace)
+    assert route_profile_df['timestamp'].dtype == pd.DatetimeTZDtype('ms', 'UTC')
+    assert route_profile_df['timestamp'].iloc[0] == pd.Timestamp('2022-06-01T08:00:00Z')
+    assert route_profile_df['delta_time[s]'].sum() == route_profile_df['time_f[s]'].iloc[-1]
+
+@pytest.mark.parametrize('return_GPS_trace', [True, False])
+@pytest.mark.parametrize('window_size', [None, 10])
+def test_blocks_and_windows_keep_utc_timestamps(return_GPS_trace, window_size):
+    rme_api = ReplayRmeApi('key')
+    route_profile_df = rme_api.getRouteReport(getGpx(), return_GPS_trace=return_GPS_trace, window_size=window_size, overlap=4)
+    blocks_df = pd.concat(list(rme_api.iterRouteReport(getGpx(), return_GPS_trace=return_GPS_trace, window_size=window_size, overlap=4, block_size=7)))
+    assert blocks_df['timestamp'].dtype == pd.DatetimeTZDtype('ms', 'UTC')
+    pd.testing.assert_frame_equal(blocks_df, route_profile_df)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+
+"""Regression tests of extRoutingApi.getRouteReport on a route_v8 response
+
+data/route_v8_response.json is a route_v8 response (as_dict) with two sections and spans missing the optional
+fields (speedLimit, maxSpeed, names). data/route_report_<span|polyline>.csv are the reports of the original
+per point implementation of getRouteReport on this response: the columns it returned must stay identical,
+the columns added since then are not checked.
+"""
+
+import os
+import json
+import pandas as pd
+import pytest
+
+from extherepy import extRoutingApi
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+class ReplayResponse(object):
+    '''
+    Stand-in of a HerePy response replaying the recorded route_v8 response.
+    '''
+    def as_dict(self) -> dict:
+        with open(os.path.join(DATA_DIR, 'route_v8_response.json')) as response_file:
+            return json.load(response_file)
+
+class ReplayRoutingApi(extRoutingApi):
+    '''
+    extRoutingApi replaying the recorded route_v8 response instead of calling HERE.
+    '''
+    def route_v8(self, *args, **kwargs):
+        return ReplayResponse()
+
+def readExpectedReport(name: str) -> pd.DataFrame:
+    '''This method reads the report of the original implementation
+    '''
+    expected_df = pd.read_csv(os.path.join(DATA_DIR, f'route_report_{name}.csv'), index_col=0, keep_default_na=False, float_precision='round_trip')
+    expected_df['timestamp'] = pd.to_datetime(expected_df['timestamp'], format='ISO8601')
+    return expected_df
+
+@pytest.mark.parametrize('return_polyline, name', [(False, 'span'), (True, 'polyline')])
+def test_getRouteReport_matches_original(return_polyline, name):
+    expected_df = readExpectedReport(name)
+    route_profile_df = ReplayRoutingApi('replay').getRouteReport([(45, 9), (45.1, 9.1)],
+                                                                 departure_time='2022-06-01T08:00:00',
+                                                                 return_polyline=return_polyline)
+
+    assert list(route_profile_df.index) == list(expected_df.index)
+    assert [column for column in route_profile_df.columns if column in expected_df.columns] == list(expected_df.columns)
+    for column in expected_df.columns:
+        pd.testing.assert_series_equal(route_profile_df[column], expected_df[column],
+                                       check_dtype=False, check_index_type=False, check_exact=True, obj=column)
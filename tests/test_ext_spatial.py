@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+
+"""Tests of the spatial index over routes far apart (the projection of the index is only used to prune the candidates)"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from extherepy import extSpatialIndex
+from extherepy.extDistance import getDistances, getSegmentLengths
+
+# north-south routes near Madrid, Milano and Oslo (more than 1000 km apart)
+ROUTES = {'madrid': (40.4, -3.7), 'milano': (45.5, 9.2), 'oslo': (59.9, 10.7)}
+
+def getRouteProfile(latitude: float, longitude: float, n_rows: int = 50) -> pd.DataFrame:
+    latitudes = latitude+np.linspace(0, 0.05, n_rows)
+    longitudes = np.full(n_rows, longitude)
+    return pd.DataFrame({'latitude[deg]':   latitudes,
+                         'longitude[deg]':  longitudes,
+                         'span':            np.arange(n_rows)//10,
+                         'distance_i[m]':   np.r_[0, np.cumsum(getSegmentLengths(latitudes, longitudes, method='haversine'))]})
+
+@pytest.fixture
+def spatial_index():
+    return extSpatialIndex([getRouteProfile(*origin) for origin in ROUTES.values()])
+
+def getQueries(offset: float = 0.002) -> tuple:
+    # one query point east of the middle of each route
+    latitudes = np.array([latitude+0.025 for latitude, _ in ROUTES.values()])
+    longitudes = np.array([longitude+offset for _, longitude in ROUTES.values()])
+    expected = getDistances(latitudes, longitudes, latitudes, longitudes-offset, method='haversine')
+    return latitudes, longitudes, expected
+
+def test_nearest_distances_of_routes_far_apart(spatial_index):
+    latitudes, longitudes, expected = getQueries()
+    nearest_df = spatial_index.queryNearest(latitudes, longitudes)
+    assert list(nearest_df['route']) == [0, 1, 2]
+    np.testing.assert_allclose(nearest_df['distance[m]'], expected, rtol=1e-3)
+    np.testing.assert_allclose(nearest_df['latitude[deg]'], latitudes, atol=1e-6)
+
+def test_radius_of_routes_far_apart(spatial_index):
+    latitudes, longitudes, expected = getQueries()
+    # the radius keeps the route of the query, whatever its latitude
+    radius_df = spatial_index.queryRadius(latitudes, longitudes, radius=expected.max()*1.01)
+    assert list(radius_df['query']) == [0, 1, 2]
+    assert list(radius_df['route']) == [0, 1, 2]
+    np.testing.assert_allclose(radius_df['distance[m]'], expected, rtol=1e-3)
+
+    # and drops the routes farther than the radius
+    assert spatial_index.queryRadius(latitudes, longitudes, radius=expected.min()*0.99).empty
+
+def test_nearest_max_distance(spatial_index):
+    latitudes, longitudes, expected = getQueries()
+    nearest_df = spatial_index.queryNearest(latitudes, longitudes, max_distance=expected[1]*1.01)
+    assert list(nearest_df['query']) == list(np.flatnonzero(expected <= expected[1]*1.01))